@@ -9,24 +9,21 @@ import re
 import sys
 import uuid
 import zipfile
-from collections import namedtuple
 from typing import List
 
 import click
 import math
-import requests
 import timeflake
 from flask import request, g
 from marshmallow.exceptions import ValidationError
 from sqlalchemy import inspect, Table, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql.expression import and_, text
 
 from neo4japp.blueprints.auth import auth
 from neo4japp.constants import (
     ANNOTATION_STYLES_DICT,
-    FILE_MIME_TYPE_ENRICHMENT_TABLE,
     FILE_MIME_TYPE_MAP,
-    FILE_MIME_TYPE_PDF,
     LogEventType,
     FILE_MIME_TYPE_DIRECTORY,
     SEED_FILE_KEY_FILE_CONTENT,
@@ -38,6 +35,7 @@ from neo4japp.database import (
     get_account_service,
     get_elastic_service,
     get_file_type_service,
+    get_redis_connection,
 )
 from neo4japp.exceptions import OutdatedVersionException, ServerWarning
 from neo4japp.factory import create_app
@@ -46,13 +44,38 @@ from neo4japp.models import AppUser
 from neo4japp.models.common import generate_hash_id
 from neo4japp.models.files import FileContent, Files
 from neo4japp.schemas.formats.drawing_tool import validate_map
-from neo4japp.services.annotations.constants import EntityType
-from neo4japp.services.annotations.initializer import get_lmdb_service
+from neo4japp.services.annotations.bulk_reannotation import (
+    ReannotationProgress,
+    enqueue_reannotation,
+    get_reannotation_file_ids,
+    run_reannotation_worker,
+)
+from neo4japp.services.annotations.constants import (
+    ANNOTATION_OCCURRENCE_BATCH_SIZE,
+    EntityType,
+    REANNOTATION_BATCH_SIZE,
+    REANNOTATION_QUEUE,
+)
+from neo4japp.services.annotations.initializer import (
+    get_lmdb_service,
+    get_manual_annotation_service,
+)
+from neo4japp.services.annotations.lmdb_connection import (
+    lmdb_environment_pool,
+    lmdb_value_cache,
+)
+from neo4japp.services.elastic.constants import ELASTIC_REINDEX_CHUNK_BYTES
+from neo4japp.services.elastic.reindex import (
+    ReindexProgress,
+    get_reindex_partitions,
+    run_reindex_partition,
+)
 from neo4japp.services.redis.redis_queue_service import RedisQueueService
 from neo4japp.utils import EventLog
 from neo4japp.utils.file_content_buffer import FileContentBuffer
 from neo4japp.utils.globals import config
 from neo4japp.utils.globals import warn
+from neo4japp.utils.processes import report_progress, start_forked_workers
 
 app_config = os.environ.get('FLASK_APP_CONFIG', 'Development')
 app = create_app(config_package=f'config.{app_config}')
@@ -437,10 +460,101 @@ def reset_elastic():
 
 
 @app.cli.command('reindex-files')
-def reindex_files():
-    """Re-indexes all documents used by this environment without recreating indexes."""
+@click.option(
+    '--workers',
+    type=click.IntRange(min=1),
+    default=os.cpu_count(),
+    show_default=True,
+    help='Number of worker processes, each indexing a range of the files.',
+)
+@click.option(
+    '--new-index',
+    is_flag=True,
+    help='Index the files in a new index, which replaces the file index once all '
+    'of them are indexed. Searches keep using the current index meanwhile.',
+)
+@click.option(
+    '--resume',
+    is_flag=True,
+    help='Continue the last run where each of its workers stopped, and index the '
+    'files it failed to again. Its number of workers and index are reused.',
+)
+@click.option(
+    '--chunk-bytes',
+    default=ELASTIC_REINDEX_CHUNK_BYTES,
+    show_default=True,
+    help='Maximum size of a bulk request.',
+)
+@click.option(
+    '--interval',
+    default=30,
+    show_default=True,
+    help='Seconds between progress reports.',
+)
+def reindex_files(workers, new_index, resume, chunk_bytes, interval):
+    """Re-indexes all documents used by this environment, in parallel. Progress is
+    checkpointed so that an interrupted run can be resumed."""
     elastic_service = get_elastic_service()
-    elastic_service.reindex_all_documents()
+    progress = ReindexProgress(get_redis_connection())
+
+    if resume:
+        if not progress.total:
+            raise click.ClickException('There is no reindex run to resume.')
+        index_id = progress.index_id
+        failed_ids = progress.pop_failed_ids()
+        if failed_ids:
+            print(f'Indexing again {len(failed_ids)} files which failed')
+            elastic_service.apply_file_changes(
+                [
+                    hash_id
+                    for hash_id, in db.session.query(Files.hash_id).filter(
+                        Files.id.in_(list(failed_ids))
+                    )
+                ],
+                {},
+                [],
+                index_id=index_id,
+            )
+    else:
+        index_id = config.get('ELASTIC_FILE_INDEX_ID')
+        stale_index_id = progress.building_index_id
+        # built by an interrupted run, unless it was interrupted right after the swap
+        if (
+            stale_index_id is not None
+            and not elastic_service.elastic_client.indices.exists_alias(
+                name=index_id, index=stale_index_id
+            )
+        ):
+            elastic_service.delete_index(stale_index_id)
+        if new_index:
+            index_id = elastic_service.get_new_file_index_id()
+            elastic_service.create_file_index(index_id)
+        progress.reset(index_id, get_reindex_partitions(workers), new_index)
+
+    partitions = progress.get_partitions()
+    total = progress.total
+    print(f'Total files: {total}, indexed in {index_id} by {len(partitions)} workers')
+
+    processes = start_forked_workers(
+        [(run_reindex_partition, (partition, chunk_bytes)) for partition in partitions]
+    )
+    report_progress(
+        progress.get_counts,
+        total,
+        interval,
+        lambda: not any(p.is_alive() for p in processes),
+    )
+
+    for p in processes:
+        p.join()
+
+    _, failed = progress.get_counts()
+    if failed or any(p.exitcode for p in processes):
+        print('Run again with --resume to continue and retry the failed files.')
+    elif progress.building_index_id is not None:
+        elastic_service.swap_file_index(index_id)
+        progress.finish_building()
+        print(f'{index_id} is now the file index')
 
 
 @app.cli.command('recreate-elastic-index')
@@ -448,9 +562,16 @@ def reindex_files():
 @click.argument('index_mapping_file', nargs=1)
 def update_or_create_index(index_id, index_mapping_file):
     """Given an index id and mapping file, creates a new elastic index. If the index already exists,
-    we recreate it and re-index all documents."""
+    we recreate it and re-index all documents. The documents of the file index are copied to
+    the new index instead, only the files whose document is out of date are indexed again.
+    """
     elastic_service = get_elastic_service()
-    elastic_service.update_or_create_index(index_id, index_mapping_file)
+    is_file_index = index_id == config.get('ELASTIC_FILE_INDEX_ID')
+    if is_file_index and elastic_service.elastic_client.indices.exists(index_id):
+        elastic_service.copy_file_index(index_mapping_file)
+        elastic_service.reindex_all_documents()
+    else:
+        elastic_service.update_or_create_index(index_id, index_mapping_file)
 
 
 @app.cli.command('load-lmdb')
@@ -460,6 +581,9 @@ def load_lmdb():
     lmdb_dir_path = os.path.join(app.root_path, 'services/annotations/lmdb')
     manager.download_all(lmdb_dir_path)
     manager.update_all_dates(lmdb_dir_path)
+    # drop environments mapped to the previous files
+    lmdb_environment_pool.clear()
+    lmdb_value_cache.clear()
 
 
 @app.cli.command('upload-lmdb')
@@ -546,7 +670,13 @@ def test_prepublish(email, password):
 
 @app.cli.command('create-lmdb')
 @click.option('--file-type', type=str)
-def create_lmdb_files(file_type):
+@click.option(
+    '--value-format',
+    type=click.Choice(['json', 'binary']),
+    default='json',
+    help='Encoding of the stored entity records, binary decodes faster.',
+)
+def create_lmdb_files(file_type, value_format):
     valid_values = {
         EntityType.ANATOMY.value,
         EntityType.CHEMICAL.value,
@@ -562,148 +692,115 @@ def create_lmdb_files(file_type):
     if file_type is not None and file_type not in valid_values:
         raise ValueError(f'Only these valid values are accepted: {valid_values}')
     service = get_lmdb_service()
-    service.create_lmdb_files(file_type)
+    service.create_lmdb_files(file_type, value_format)
 
 
-Fallback = namedtuple('Fallback', ['organism_name', 'organism_synonym', 'organism_id'])
+@app.cli.command('reannotate')
+@click.argument('user')  # the email of the user recorded as author of the new versions
+@click.option(
+    '--batch-size',
+    default=REANNOTATION_BATCH_SIZE,
+    show_default=True,
+    help='Number of files annotated per job.',
+)
+@click.option(
+    '--workers',
+    default=os.cpu_count(),
+    show_default=True,
+    help='Number of worker processes to spawn, 0 to rely on already running '
+    f'`rq worker {REANNOTATION_QUEUE}` processes.',
+)
+@click.option(
+    '--resume',
+    is_flag=True,
+    help='Continue the last run, only the files it has not annotated yet '
+    '(or failed to) are enqueued.',
+)
+@click.option(
+    '--interval',
+    default=30,
+    show_default=True,
+    help='Seconds between progress reports.',
+)
+def reannotate_files(user, batch_size, workers, resume, interval):
+    """Reannotates every annotated file with its own configs and organism,
+    e.g after the LMDB files were refreshed."""
+    user_id = AppUser.query.filter_by(email=user).one().id
+    rq_service = RedisQueueService()
+    progress = ReannotationProgress(get_redis_connection())
+    file_ids = get_reannotation_file_ids()
 
+    # jobs left over by an interrupted run are enqueued again below
+    rq_service.empty_queue(REANNOTATION_QUEUE)
 
-@app.cli.command('reannotate')
-@click.argument('user')  # the user email
-@click.argument('password')
-def reannotate_files(user, password):
-    from neo4japp.models import FileContent
-
-    # from neo4japp.exceptions import AnnotationError
-    from neo4japp.schemas.annotations import AnnotationConfigurations
-    from multiprocessing import Queue
-    import time
-
-    def get_token():
-        req = requests.post(
-            'http://localhost:5000/auth/login',
-            data=json.dumps({'email': user, 'password': password}),
-            headers={'Content-type': 'application/json'},
-        )
-        return json.loads(req.text)['accessToken']['token']
-
-    def do_work(token, hash_ids, configs, organism: Fallback):
-        resp = requests.post(
-            'http://localhost:5000/filesystem/annotations/generate',
-            data=json.dumps(
-                {
-                    'hashIds': hash_ids,
-                    'organism': {
-                        'organism_name': organism.organism_name,
-                        'synonym': organism.organism_synonym,
-                        'tax_id': organism.organism_id,
-                    },
-                    'annotationConfigs': configs,
-                }
-            ),
-            headers={
-                'Content-type': 'application/json',
-                'Authorization': f'Bearer {token}',
-            },
-        )
-        print(
-            f'Got response back for files {hash_ids}, status code is {resp.status_code}'
-        )
-        # if resp.status_code != HTTPStatus.OK:
-        #     raise AnnotationError(resp.text)
-        resp.close()
+    if resume:
+        if not progress.total:
+            raise click.ClickException('There is no reannotation run to resume.')
+        done = progress.get_done_ids().difference(progress.get_failures())
+        pending = [file_id for file_id in file_ids if file_id not in done]
+    else:
+        progress.reset(len(file_ids))
+        pending = file_ids
+
+    total = progress.total
+    batches = enqueue_reannotation(pending, user_id, batch_size)
+    print(f'Total files: {total}, enqueued {len(pending)} in {batches} batches')
+
+    processes = start_forked_workers(
+        [
+            (run_reannotation_worker, (f'reannotation-{os.getpid()}-{i}',))
+            for i in range(workers)
+        ]
+    )
 
-    print('Running reannotate command')
+    queue = rq_service.get_queue(REANNOTATION_QUEUE)
+    started_jobs = rq_service.get_started_job_registry(REANNOTATION_QUEUE)
+    report_progress(
+        progress.get_counts,
+        total,
+        interval,
+        lambda: (
+            not queue.count
+            and not started_jobs.count
+            and not any(p.is_alive() for p in processes)
+        ),
+    )
 
-    token = get_token()
-    curr_time = time.time()
+    for p in processes:
+        p.join()
 
-    # NUM_PROCESSES = 2
-    task_queue = Queue()
+    failures = progress.get_failures()
+    for file_id, error in failures.items():
+        print(f'Failed to reannotate file {file_id}: {error}')
+    failed_jobs = rq_service.get_failed_job_registry(REANNOTATION_QUEUE).count
+    if failed_jobs:
+        print(f'{failed_jobs} batches failed after retrying, see `rq info`.')
+    if failures or failed_jobs:
+        print('Run again with --resume to retry the failed files.')
 
-    files = (
-        db.session.query(
-            Files.id,
-            Files.hash_id,
-            Files.annotation_configs,
-            Files.organism_name,
-            Files.organism_synonym,
-            Files.organism_taxonomy_id,
-        )
-        .join(FileContent, FileContent.id == Files.content_id)
-        .filter(
-            and_(
-                Files.mime_type.in_(
-                    [FILE_MIME_TYPE_PDF, FILE_MIME_TYPE_ENRICHMENT_TABLE]
-                ),
-                Files.deletion_date.is_(None),
-                and_(Files.annotations.isnot(None), Files.annotations != '[]'),
-            )
-        )
-    )
 
-    print(f'Total files: {files.count()}')
+@app.cli.command('index-annotation-occurrences')
+def index_annotation_occurrences():
+    """Indexes the annotation occurrences of the PDFs annotated before they
+    were recorded, which the annotation counts and sorted exports are read from."""
+    manual_annotation_service = get_manual_annotation_service()
+    file_ids = manual_annotation_service.get_unindexed_file_ids()
+    print(f'Total files: {len(file_ids)}')
 
-    for fid, hash, configs, organism, organism_synonym, organism_id in files:
-        task_queue.put(
-            (
-                fid,
-                hash,
-                json.loads(AnnotationConfigurations().dumps(configs)),
-                Fallback(organism, organism_synonym, organism_id),
+    for i in range(0, len(file_ids), ANNOTATION_OCCURRENCE_BATCH_SIZE):
+        try:
+            manual_annotation_service.index_file_annotations(
+                file_ids[i : i + ANNOTATION_OCCURRENCE_BATCH_SIZE]
             )
+            db.session.commit()
+        except IntegrityError:
+            # indexed concurrently, e.g. annotated again meanwhile
+            db.session.rollback()
+        print(
+            f'{min(i + ANNOTATION_OCCURRENCE_BATCH_SIZE, len(file_ids))}'
+            f'/{len(file_ids)} files indexed'
         )
 
-    print(f'Total tasks to do: {task_queue.qsize()}')
-
-    while task_queue.qsize() > 0:
-        if time.time() - curr_time > 180:
-            token = get_token()
-            curr_time = time.time()
-
-        file_id, hashes, configs, organism = task_queue.get()
-        do_work(token, [hashes], configs, organism)
-
-    # while True:
-    #     if time.time() - curr_time > 180:
-    #         token = get_token()
-    #         curr_time = time.time()
-
-    #     file_id, hashes, configs, organism = task_queue.get()
-    #     # this is preferred over multiprocessing.pool(...)
-    #     # because it is guaranteed to be in a different process
-    #     p = Process(target=do_work, args=(token, [hashes], configs, organism,))
-    #     p.daemon = True
-    #     p.start()
-    #     # print(f'Process {p.pid} started...')
-    #     running[p.pid] = (hashes, p)
-
-    #     if len(running) == 3:
-    #         while True:
-    #             for k in list(running):
-    #                 v = running[k]
-    #                 if not v[1].is_alive():
-    #                     # if v[1].exitcode:
-    #                     #     raise AnnotationError(f'File with hash_id {v[0]} failed to annotate.')  # noqa
-    #                     running.pop(k)
-
-    #             if len(running) == 0:
-    #                 break
-
-    #     if task_queue.qsize() == 0:
-    #         break
-
-    # while True:
-    #     for k in list(running):
-    #         v = running[k]
-    #         if not v[1].is_alive():
-    #             # if v[1].exitcode:
-    #             #     raise AnnotationError(f'File with hash_id {v[0]} failed to annotate.')
-    #             running.pop(k)
-
-    #     if len(running) == 0:
-    #         break
-
 
 def add_file(
     filename: str, description: str, user_id: int, parent_id: int, file_bstr: bytes
@@ -68,6 +68,11 @@ class Base:
     ELASTIC_INDEX_SEED_PAIRS = [
         (ELASTIC_FILE_INDEX_ID, FILE_INDEX_DEFINITION_PATH),
     ]
+    # index the text of files, extracted by the appserver (or reused from the parser results
+    # of annotation), instead of sending the files through the attachment ingest pipeline
+    ELASTIC_INDEX_PLAIN_TEXT = (
+        os.environ.get('ELASTIC_INDEX_PLAIN_TEXT', 'false').lower() == 'true'
+    )
 
     # Set to 'True' for dev mode to have
     # the same format as staging.
@@ -86,6 +91,21 @@ class Base:
     PARSER_RESOURCE_PULL_ENDPOINT = 'http://appserver:5000/annotations/files'
     PARSER_PDF_ENDPOINT = 'http://pdfparser:7600/token/rect/json/'
     PARSER_TEXT_ENDPOINT = 'http://pdfparser:7600/token/rect/text/json'
+    PARSER_STREAM_RESPONSE = (
+        os.environ.get('PARSER_STREAM_RESPONSE', 'true').lower() == 'true'
+    )
+    # reuse parser and NLP results of identical content, opt-in as the results
+    # share the redis cache server: the least recently used are evicted past
+    # these sizes (compressed bytes)
+    ANNOTATION_CONTENT_CACHE = (
+        os.environ.get('ANNOTATION_CONTENT_CACHE', 'false').lower() == 'true'
+    )
+    ANNOTATION_PARSE_CACHE_MAX_SIZE = int(
+        os.environ.get('ANNOTATION_PARSE_CACHE_MAX_SIZE', 256 * 1024**2)
+    )
+    ANNOTATION_NLP_CACHE_MAX_SIZE = int(
+        os.environ.get('ANNOTATION_NLP_CACHE_MAX_SIZE', 64 * 1024**2)
+    )
 
     LMDB_HOME_FOLDER = os.environ.get('LMDB_HOME_FOLDER')
 
@@ -176,6 +196,8 @@ class Testing(Base):
 
     RQ_CONNECTION_CLASS = 'fakeredis.FakeStrictRedis'
 
+    ANNOTATION_CONTENT_CACHE = False
+
     ARANGO_HOST = os.environ.get('ARANGO_HOST', 'http://localhost:8529')
     ARANGO_DB_NAME = 'test_arango'
 
@@ -0,0 +1,182 @@
+"""Add table of the annotation occurrences of each file
+
+The annotation occurrences of the files annotated before this revision
+are backfilled with `-x data_migrate`, or later by
+`flask index-annotation-occurrences`.
+
+Revision ID: 9b29b061a85c
+Revises: 0f510c3ffec4
+Create Date: 2026-10-17 10:12:41.318204
+
+"""
+import sqlalchemy as sa
+
+from alembic import context
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+from migrations.utils import window_chunk
+
+# revision identifiers, used by Alembic.
+revision = '9b29b061a85c'
+down_revision = '0f510c3ffec4'
+branch_labels = None
+depends_on = None
+
+
+t_files = sa.Table(
+    'files',
+    sa.MetaData(),
+    sa.Column('id', sa.Integer(), primary_key=True),
+    sa.Column('mime_type', sa.String()),
+    sa.Column('annotations', JSONB),
+    sa.Column('custom_annotations', JSONB),
+    sa.Column('excluded_annotations', JSONB),
+    sa.Column('deletion_date', sa.TIMESTAMP(timezone=True)),
+)
+
+t_file_annotation_occurrence = sa.Table(
+    'file_annotation_occurrence',
+    sa.MetaData(),
+    sa.Column('id', sa.Integer(), primary_key=True),
+    sa.Column('file_id', sa.Integer()),
+    sa.Column('entity_id', sa.String()),
+    sa.Column('type', sa.String()),
+    sa.Column('keyword', sa.String()),
+    sa.Column('primary_name', sa.String()),
+    sa.Column('count', sa.Integer()),
+)
+
+BATCH_SIZE = 100
+
+
+def terms_match(term1, term2, is_case_insensitive):
+    if is_case_insensitive:
+        return term1.strip().lower() == term2.strip().lower()
+    return term1.strip() == term2.strip()
+
+
+def is_excluded(exclusions, annotation):
+    return any(
+        exclusion.get('type') == annotation['meta']['type']
+        and terms_match(
+            exclusion.get('text', 'True'),
+            annotation.get('textInDocument', 'False'),
+            exclusion['isCaseInsensitive'],
+        )
+        for exclusion in exclusions
+    )
+
+
+def get_annotation_occurrences(
+    file_id, annotations, custom_annotations, excluded_annotations
+):
+    """Same as `ManualAnnotationService.get_annotation_occurrences` at this revision."""
+    if isinstance(annotations, list):
+        annotations = annotations[0] if annotations else None
+    if annotations:
+        annotations = [
+            annotation
+            for annotation in annotations['documents'][0]['passages'][0]['annotations']
+            if not is_excluded(excluded_annotations or [], annotation)
+        ]
+    else:
+        annotations = []
+
+    occurrences = {}
+    for annotation in annotations + (custom_annotations or []):
+        meta = annotation['meta']
+        occurrence = occurrences.get(meta['id'])
+        if occurrence is not None:
+            occurrence['count'] += 1
+            continue
+        if annotation.get('keyword', None) is not None:
+            text = annotation['keyword']
+        else:
+            text = meta['allText']
+        occurrences[meta['id']] = {
+            'file_id': file_id,
+            'entity_id': meta['id'],
+            'type': meta['type'],
+            'keyword': text.strip(),
+            'primary_name': annotation.get('primaryName', '').strip(),
+            'count': 1,
+        }
+    return list(occurrences.values())
+
+
+def upgrade():
+    op.create_table(
+        'file_annotation_occurrence',
+        sa.Column('id', sa.Integer(), nullable=False, primary_key=True),
+        sa.Column(
+            'file_id',
+            sa.Integer(),
+            sa.ForeignKey('files.id', ondelete='CASCADE'),
+            nullable=False,
+        ),
+        sa.Column('entity_id', sa.String(), nullable=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('keyword', sa.String(), nullable=False),
+        sa.Column('primary_name', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.UniqueConstraint(
+            'file_id', 'entity_id', name='uq_file_annotation_occurrence_file_entity'
+        ),
+    )
+    if context.get_x_argument(as_dictionary=True).get('data_migrate', None):
+        data_upgrades()
+
+
+def downgrade():
+    op.drop_table('file_annotation_occurrence')
+
+
+def data_upgrades():
+    conn = op.get_bind()
+    session = Session(conn)
+
+    files = conn.execution_options(
+        stream_results=True, max_row_buffer=BATCH_SIZE
+    ).execute(
+        sa.select(
+            [
+                t_files.c.id,
+                t_files.c.annotations,
+                t_files.c.custom_annotations,
+                t_files.c.excluded_annotations,
+            ]
+        )
+        .where(
+            sa.and_(
+                t_files.c.mime_type == 'application/pdf',
+                t_files.c.deletion_date.is_(None),
+                t_files.c.annotations.isnot(None),
+                t_files.c.annotations != '[]',
+            )
+        )
+        .order_by(t_files.c.id)
+    )
+
+    try:
+        for chunk in window_chunk(files, BATCH_SIZE):
+            occurrences = [
+                occurrence
+                for file in chunk
+                for occurrence in get_annotation_occurrences(*file)
+            ]
+            if occurrences:
+                session.execute(t_file_annotation_occurrence.insert(), occurrences)
+            session.flush()
+        session.commit()
+    except Exception:
+        session.rollback()
+        session.close()
+        raise
+
+    session.close()
+
+
+def data_downgrades():
+    pass
@@ -0,0 +1,40 @@
+"""Add table of the state of the elastic document of each file
+
+Files indexed before this revision have their content sent to elastic
+again the next time they are indexed.
+
+Revision ID: c41d7e2a9f03
+Revises: 9b29b061a85c
+Create Date: 2026-10-17 15:36:08.502117
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c41d7e2a9f03'
+down_revision = '9b29b061a85c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'file_index_state',
+        sa.Column(
+            'file_id',
+            sa.Integer(),
+            sa.ForeignKey('files.id', ondelete='CASCADE'),
+            nullable=False,
+        ),
+        sa.Column('index_name', sa.String(), nullable=False),
+        sa.Column('content_checksum', sa.LargeBinary(), nullable=True),
+        sa.Column('content_format', sa.String(), nullable=False),
+        sa.Column('mapping_version', sa.String(length=32), nullable=False),
+        sa.Column('indexed_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('file_id', 'index_name'),
+    )
+
+
+def downgrade():
+    op.drop_table('file_index_state')
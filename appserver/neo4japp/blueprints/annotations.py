@@ -41,11 +41,13 @@ from ..database import (
 )
 from ..models import (
     AppUser,
+    FileAnnotationOccurrence,
     Files,
     GlobalList,
 )
+from ..models.annotations_queries import get_entity_occurrences_query
 from ..models.files import AnnotationChangeCause, FileAnnotationsVersion
-from ..models.files_queries import get_nondeleted_recycled_children_query
+from ..models.files_queries import get_nondeleted_recycled_children_ids_query
 from ..schemas.annotations import (
     AnnotationGenerationRequestSchema,
     GlobalAnnotationTableType,
@@ -70,6 +72,9 @@ from ..services.annotations.constants import (
     EntityType,
     ManualAnnotationType,
 )
+from ..services.annotations.global_annotations_cache import (
+    bump_global_annotations_version,
+)
 from ..services.annotations.initializer import (
     get_annotation_service,
     get_annotation_db_service,
@@ -83,6 +88,7 @@ from ..services.annotations.initializer import (
 from ..services.annotations.pipeline import Pipeline
 from ..services.annotations.sorted_annotation_service import (
     default_sorted_annotation,
+    FrequencySA,
     sorted_annotations_dict,
 )
 from ..services.annotations.utils.graph_queries import (
@@ -280,7 +286,7 @@ def get_sorted_annotation_rows(anno_dict: Dict, value_prop: str):
 
 class FileAnnotationCountsView(FilesystemBaseView):
     def get_rows(self, files):
-        manual_annotations_service = get_manual_annotation_service()
+        annotation_service = get_sorted_annotation_service(FrequencySA.id)
 
         yield [
             'entity_id',
@@ -290,18 +296,9 @@ class FileAnnotationCountsView(FilesystemBaseView):
             'count',
         ]
 
-        counts = {}
-
-        for file in files:
-            annotations = manual_annotations_service.get_file_annotations(file)
-            for annotation in annotations:
-                key = annotation['meta']['id']
-                if key not in counts:
-                    counts[key] = {'annotation': annotation, 'count': 1}
-                else:
-                    counts[key]['count'] += 1
-
-        yield from get_sorted_annotation_rows(counts, 'count')
+        yield from get_sorted_annotation_rows(
+            annotation_service.get_annotations(files), 'value'
+        )
 
     def post(self, hash_id: str):
         current_user = g.current_user
@@ -312,10 +309,9 @@ class FileAnnotationCountsView(FilesystemBaseView):
         Filesystem.check_file_permissions(
             [file], current_user, ['readable'], permit_recycled=True
         )
-        files = get_nondeleted_recycled_children_query(
+        files = get_nondeleted_recycled_children_ids_query(
             Files.id == file.id,
             children_filter=Files.mime_type == 'application/pdf',
-            lazy_load_content=True,
         ).all()
 
         buffer = io.StringIO()
@@ -382,12 +378,11 @@ class FileAnnotationSortedView(FilesystemBaseView):
             for row in self.get_rows(files, annotation_service):
                 writer.writerow(row)
         else:
-            files = get_nondeleted_recycled_children_query(
+            files = get_nondeleted_recycled_children_ids_query(
                 Files.id == file.id,
                 children_filter=and_(
                     Files.mime_type == 'application/pdf', Files.recycling_date.is_(None)
                 ),
-                lazy_load_content=True,
             ).all()
 
             annotation_service = get_sorted_annotation_service(sort)
@@ -406,9 +401,8 @@ class FileAnnotationSortedView(FilesystemBaseView):
 
 
 class FileAnnotationGeneCountsView(FileAnnotationCountsView):
-    def get_rows(self, files: List[Files]):
+    def get_rows(self, files):
         arango_client = get_or_create_arango_client()
-        manual_annotations_service = get_manual_annotation_service()
 
         yield [
             'gene_id',
@@ -418,17 +412,13 @@ class FileAnnotationGeneCountsView(FileAnnotationCountsView):
             'gene_annotation_count',
         ]
 
-        gene_ids: Dict[Any, int] = {}
-
-        for file in files:
-            combined_annotations = manual_annotations_service.get_file_annotations(file)
-            for annotation in combined_annotations:
-                if annotation['meta']['type'] == EntityType.GENE.value:
-                    gene_id = annotation['meta']['id']
-                    if gene_ids.get(gene_id, None) is not None:
-                        gene_ids[gene_id] += 1
-                    else:
-                        gene_ids[gene_id] = 1
+        file_ids = [file.id for file in files]
+        gene_ids: Dict[Any, int] = {
+            row.entity_id: row.value
+            for row in get_entity_occurrences_query(
+                file_ids, sa.func.sum(FileAnnotationOccurrence.count)
+            ).filter(FileAnnotationOccurrence.type == EntityType.GENE.value)
+        }
 
         gene_organism_pairs = get_organisms_from_gene_ids(arango_client, gene_ids)
         sorted_pairs = sorted(
@@ -600,6 +590,10 @@ class FileAnnotationsGenerationView(FilesystemBaseView):
 
         db.session.bulk_insert_mappings(FileAnnotationsVersion, versions)
         db.session.bulk_update_mappings(Files, updated_files)
+        if updated_files:
+            get_manual_annotation_service().index_file_annotations(
+                [update['id'] for update in updated_files]
+            )
         db.session.commit()
         # rollback in case of error?
 
@@ -733,20 +727,21 @@ class FileAnnotationsGenerationView(FilesystemBaseView):
             annotations_list, key=lambda x: x['loLocationOffset']
         )
 
+        start = time.time()
+        # group the annotations by the cell they are in
+        cell_annotations: List[List[dict]] = [[] for _ in enriched.text_index_map]
+        for anno in sorted_annotations_list:
+            if anno.get('hiLocationOffset', None):
+                cell_index = enriched.get_cell_index(anno['hiLocationOffset'])
+                if cell_index < len(cell_annotations):
+                    cell_annotations[cell_index].append(anno)
+
         prev_index = -1
         enriched_gene = ''
 
-        start = time.time()
-        for index, cell_text in enriched.text_index_map:
-            annotation_chunk = [
-                anno
-                for anno in sorted_annotations_list
-                if anno.get('hiLocationOffset', None)
-                and anno.get('hiLocationOffset') <= index
-            ]
-            # it's sorted so we can do this to make the list shorter every iteration
-            sorted_annotations_list = sorted_annotations_list[len(annotation_chunk) :]
-
+        for (index, cell_text), annotation_chunk in zip(
+            enriched.text_index_map, cell_annotations
+        ):
             # update JSON to have enrichment row and domain...
             for anno in annotation_chunk:
                 if prev_index != -1:
@@ -1102,6 +1097,7 @@ class GlobalAnnotationListView(MethodView):
             try:
                 db.session.execute(query)
                 db.session.commit()
+                bump_global_annotations_version()
 
                 current_app.logger.info(
                     f'Deleted {len(exclusion_pids)} global exclusions',
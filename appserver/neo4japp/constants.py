@@ -527,6 +527,27 @@ UPDATE_ELASTIC_DOC_COLUMNS = [
     'organism_taxonomy_id',
 ]
 
+# Changing the content of a file needs its document to be fully reindexed (relationships
+# are listed too, as changes are reported under the name of the changed attribute)
+ELASTIC_DOC_CONTENT_COLUMNS = ['content_id', 'content', 'mime_type']
+
+# Fields of the elastic document to partially update when a file column changes, the
+# other columns are not part of the document
+ELASTIC_DOC_FIELDS_BY_COLUMN = {
+    'filename': ['filename', 'path'],
+    'parent_id': ['path', 'project_id', 'project_hash_id', 'project_name'],
+    'parent': ['path', 'project_id', 'project_hash_id', 'project_name'],
+    'path': ['path'],
+    'description': ['description'],
+    'user_id': ['user_id', 'username'],
+    'user': ['user_id', 'username'],
+    'doi': ['doi'],
+    'public': ['public'],
+}
+
+# Fields derived from the location of a file, changing for the descendants of a moved folder
+ELASTIC_DOC_HIERARCHY_FIELDS = {'path', 'project_id', 'project_hash_id', 'project_name'}
+
 SEED_FILE_KEY_FILES = 'neo4japp.models.Files'
 SEED_FILE_KEY_USER = 'neo4japp.models.AppUser'
 SEED_FILE_KEY_FILE_CONTENT = 'neo4japp.models.FileContent'
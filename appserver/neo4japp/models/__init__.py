@@ -1,8 +1,15 @@
-from .annotations import AnnotationStopWords, GlobalList
+from .annotations import AnnotationStopWords, FileAnnotationOccurrence, GlobalList
 from .auth import AppRole, AppUser
 from .common import NEO4JBase, RDBMSBase, ModelConverter
 from .entity_resources import DomainURLsMap, AnnotationStyle
-from .files import Files, FileContent, FileVersion, FileBackup, FileCollaboratorRole
+from .files import (
+    Files,
+    FileContent,
+    FileVersion,
+    FileBackup,
+    FileCollaboratorRole,
+    FileIndexState,
+)
 from .neo4j import GraphNode, GraphRelationship
 from .projects import Projects, projects_collaborator_role
 from .reports import CopyrightInfringementRequest
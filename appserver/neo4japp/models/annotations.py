@@ -39,3 +39,29 @@ class LMDB(RDBMSBase):
     # unlikely, since we only expect to have a dozen or so rows in this table at a time, but still
     # possible.
     checksum_md5 = db.Column(db.String(32), nullable=False, index=True, unique=True)
+
+
+class FileAnnotationOccurrence(RDBMSBase):
+    """Number of occurrences of an entity in the annotations of a PDF.
+
+    Derived from the annotations, custom annotations and exclusions of the
+    file (see `ManualAnnotationService.index_file_annotations`) so that counts
+    over many files can be aggregated in SQL instead of loading every BioC blob.
+    """
+
+    __tablename__ = 'file_annotation_occurrence'
+    __table_args__ = (
+        db.UniqueConstraint(
+            'file_id', 'entity_id', name='uq_file_annotation_occurrence_file_entity'
+        ),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    file_id = db.Column(
+        db.Integer, db.ForeignKey('files.id', ondelete='CASCADE'), nullable=False
+    )
+    entity_id = db.Column(db.String, nullable=False)
+    type = db.Column(db.String, nullable=False)
+    # first annotation of the entity in the file
+    keyword = db.Column(db.String, nullable=False)
+    primary_name = db.Column(db.String, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
@@ -0,0 +1,63 @@
+from typing import List
+
+import sqlalchemy as sa
+from flask_sqlalchemy import BaseQuery
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+
+from neo4japp.database import db
+from .annotations import FileAnnotationOccurrence
+
+
+def _first_by_file(column):
+    return array_agg(aggregate_order_by(column, FileAnnotationOccurrence.file_id))[1]
+
+
+def get_entity_occurrences_query(file_ids: List[int], value) -> BaseQuery:
+    """
+    Build a query aggregating the annotation occurrences of each entity
+    over the given files.
+
+    :param file_ids: ids of the (indexed) files
+    :param value: aggregate of the per file occurrences, e.g. sum of the counts
+    :return: a query of (entity_id, type, keyword, primary_name, value) rows, the
+        type, keyword and primary name being those of the file with the lowest id
+    """
+    t_occurrence = FileAnnotationOccurrence
+    return (
+        db.session.query(
+            t_occurrence.entity_id,
+            _first_by_file(t_occurrence.type).label('type'),
+            _first_by_file(t_occurrence.keyword).label('keyword'),
+            _first_by_file(t_occurrence.primary_name).label('primary_name'),
+            value.label('value'),
+        )
+        .filter(t_occurrence.file_id.in_(file_ids))
+        .group_by(t_occurrence.entity_id)
+        .order_by(t_occurrence.entity_id)
+    )
+
+
+def copy_file_annotation_occurrences(source_file_id: int, file_id: int):
+    """
+    Give a file the annotation occurrences of another one with the same
+    annotations, e.g. the file it was cloned from.
+
+    :param source_file_id: id of the file to copy the occurrences of
+    :param file_id: id of the file receiving the occurrences
+    """
+    t_occurrence = FileAnnotationOccurrence
+    columns = [
+        t_occurrence.entity_id,
+        t_occurrence.type,
+        t_occurrence.keyword,
+        t_occurrence.primary_name,
+        t_occurrence.count,
+    ]
+    db.session.execute(
+        t_occurrence.__table__.insert().from_select(
+            ['file_id', *(column.key for column in columns)],
+            sa.select([sa.literal(file_id), *columns]).where(
+                t_occurrence.file_id == source_file_id
+            ),
+        )
+    )
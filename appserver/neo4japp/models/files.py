@@ -5,7 +5,7 @@ import os
 import re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Set
 
 import sqlalchemy
 from flask import current_app
@@ -31,16 +31,19 @@ from sqlalchemy import (
 )
 from sqlalchemy.dialects import postgresql
 from sqlalchemy.engine import Connection
-from sqlalchemy.orm import Mapper, column_property
+from sqlalchemy.orm import Mapper, Session, column_property
 from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.orm.session import SessionTransaction
 from sqlalchemy.types import TIMESTAMP
 
 from neo4japp.constants import (
+    ELASTIC_DOC_CONTENT_COLUMNS,
+    ELASTIC_DOC_FIELDS_BY_COLUMN,
     LogEventType,
     UPDATE_DATE_MODIFIED_COLUMNS,
     UPDATE_ELASTIC_DOC_COLUMNS,
 )
-from neo4japp.database import db, get_elastic_service
+from neo4japp.database import db, get_redis_connection
 from neo4japp.exceptions import ServerException
 from neo4japp.models.common import (
     RDBMSBase,
@@ -626,26 +629,75 @@ def before_file_insert(mapper: Mapper, connection: Connection, target: Files):
             target = _update_path_of_file(connection, target)
 
 
-def _after_file_insert(target: Files):
-    from app import app
+def _get_elastic_index_journal():
+    # Import what we need, when we need it (Helps to avoid circular dependencies)
+    from neo4japp.services.elastic.index_journal import ElasticIndexJournal
 
-    # This will be called by the Redis queue service outside of the normal flask app context, so
-    # here we manually ensure there is a context.
-    with app.app_context():
-        try:
-            elastic_service = get_elastic_service()
-            current_app.logger.info(
-                f'Attempting to index newly created file with hash_id: {target.hash_id}',
-                extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict(),
-            )
-            elastic_service.index_files([target.hash_id])
-        except Exception as e:
-            current_app.logger.error(
-                f'Elastic index failed for file with hash_id: {target.hash_id}',
-                exc_info=e,
-                extra=EventLog(event_type=LogEventType.ELASTIC_FAILURE.value).to_dict(),
-            )
-            raise
+    return ElasticIndexJournal(get_redis_connection())
+
+
+ELASTIC_CHANGES_SESSION_KEY = 'elastic_index_changes'
+
+
+def _get_savepoint(transaction: SessionTransaction) -> SessionTransaction:
+    """Returns the savepoint, or the outermost transaction, the transaction is part of."""
+    while transaction.parent is not None and not transaction.nested:
+        transaction = transaction.parent
+    return transaction
+
+
+def record_elastic_changes(target, index=(), updates={}, delete=()):
+    """Collects changes of the elastic documents of files in the session of the target.
+
+    They are recorded in the journal once the transaction is committed: a journal job
+    applying them before that would build the documents from the uncommitted state.
+    """
+    # Import what we need, when we need it (Helps to avoid circular dependencies)
+    from neo4japp.services.elastic.index_journal import JournalBatch
+
+    session = orm.object_session(target)
+    batch = session.info.setdefault(ELASTIC_CHANGES_SESSION_KEY, {}).setdefault(
+        _get_savepoint(session.transaction), JournalBatch(set(), {}, set())
+    )
+    batch.index.update(index)
+    for hash_id, fields in updates.items():
+        batch.updates.setdefault(hash_id, set()).update(fields)
+    batch.delete.update(delete)
+
+
+@event.listens_for(Session, 'after_commit')
+def after_session_commit(session: Session):
+    # Also dispatched when a savepoint is released, committed along with its transaction
+    if session.transaction.parent is not None:
+        return
+    changes = session.info.pop(ELASTIC_CHANGES_SESSION_KEY, None)
+    if not changes:
+        return
+    try:
+        journal = _get_elastic_index_journal()
+        for batch in changes.values():
+            journal.record(batch.index, batch.updates, batch.delete)
+    except Exception as e:
+        current_app.logger.error(
+            'Failed to record the elastic changes of the committed files.',
+            exc_info=e,
+            extra=EventLog(event_type=LogEventType.ELASTIC_FAILURE.value).to_dict(),
+        )
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def after_session_rollback(session: Session, previous_transaction: SessionTransaction):
+    """Discards the changes collected within the rolled back savepoint or transaction."""
+    changes = session.info.get(ELASTIC_CHANGES_SESSION_KEY)
+    if not changes:
+        return
+    rolled_back = _get_savepoint(previous_transaction)
+    for savepoint in list(changes):
+        transaction = savepoint
+        while transaction is not None and transaction is not rolled_back:
+            transaction = transaction.parent
+        if transaction is not None:
+            del changes[savepoint]
 
 
 @event.listens_for(Files, 'after_insert')
@@ -655,10 +707,7 @@ def after_file_insert(mapper: Mapper, connection: Connection, target: Files):
     file insert will be rolled back.
     """
     try:
-        from neo4japp.services.redis.redis_queue_service import RedisQueueService
-
-        rq_service = RedisQueueService()
-        rq_service.enqueue(_after_file_insert, target)
+        record_elastic_changes(target, index=[target.hash_id])
     except Exception as e:
         raise ServerException(
             title='Failed to Create File',
@@ -686,69 +735,14 @@ def before_file_update(mapper: Mapper, connection: Connection, target: Files):
         orm.attributes.flag_modified(target, 'modified_date')
 
 
-def _get_file_or_its_children_ids(file: Files) -> List[str]:
-    # todo: local imports are not best practice.
-    #  if we face circular deps probably things should be struc differently
-    # Import what we need, when we need it (Helps to avoid circular dependencies)
-    from neo4japp.models.files_queries import get_nondeleted_recycled_children_query
-    from neo4japp.services.file_types.providers import DirectoryTypeProvider
-
-    if file.mime_type == DirectoryTypeProvider.MIME_TYPE:
-        family = get_nondeleted_recycled_children_query(
-            Files.id == file.id,
-            children_filter=and_(Files.recycling_date.is_(None)),
-            lazy_load_content=True,
-        ).all()
-        return [member.hash_id for member in family]
-    else:
-        return [file.hash_id]
-
-
-def _after_file_update(target: Files, changes: dict):
-    # Import what we need, when we need it (Helps to avoid circular dependencies)
-    from app import app
-
-    # This will be called by the Redis queue service outside of the normal flask app context, so
-    # here we manually ensure there is a context.
-    with app.app_context():
-        try:
-            elastic_service = get_elastic_service()
-
-            files_to_update = _get_file_or_its_children_ids(target)
-
-            # Only delete a file when it changes from "not-deleted" to "deleted"
-            if (
-                'deletion_date' in changes
-                and changes['deletion_date'][0] is None
-                and changes['deletion_date'][1] is not None
-            ):
-                current_app.logger.info(
-                    f'Attempting to delete files in elastic with hash_ids: {files_to_update}',
-                    extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict(),
-                )
-                elastic_service.delete_files(files_to_update)
-                # TODO: Should we handle the case where a document's deleted state goes from
-                # "deleted" to "not deleted"? What would that mean for folders? Re-index all
-                # children as well?
-            else:
-                # File was not deleted, so update it -- and possibly its children if it has any --
-                # instead
-                current_app.logger.info(
-                    f'Attempting to update files in elastic with hash_ids: {files_to_update}',
-                    extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict(),
-                )
-                # TODO: Change this to an update operation, and only update what has changed
-                # TODO: Only need to update children if the folder name changes (is this true? any
-                # other cases where we would do this? Maybe safer to just always update file path
-                # any time the parent changes...)
-                elastic_service.index_files(files_to_update)
-        except Exception as e:
-            current_app.logger.error(
-                f'Elastic update failed for files with hash_ids: {files_to_update}',
-                exc_info=e,
-                extra=EventLog(event_type=LogEventType.ELASTIC_FAILURE.value).to_dict(),
-            )
-            raise
+def _get_changed_elastic_fields(changes: dict) -> Set[str]:
+    """Returns the fields of the elastic document affected by the column changes."""
+    return {
+        field
+        for column, fields in ELASTIC_DOC_FIELDS_BY_COLUMN.items()
+        if column in changes
+        for field in fields
+    }
 
 
 @event.listens_for(Files, 'after_update')
@@ -760,10 +754,22 @@ def after_file_update(mapper: Mapper, connection: Connection, target: Files):
     try:
         # Only do re-indexing if any of the specified columns changed
         if _did_columns_update(target, UPDATE_ELASTIC_DOC_COLUMNS):
-            from neo4japp.services.redis.redis_queue_service import RedisQueueService
-
-            rq_service = RedisQueueService()
-            rq_service.enqueue(_after_file_update, target, get_model_changes(target))
+            changes = get_model_changes(target)
+            # Only delete a file when it changes from "not-deleted" to "deleted"
+            if (
+                'deletion_date' in changes
+                and changes['deletion_date'][0] is None
+                and changes['deletion_date'][1] is not None
+            ):
+                record_elastic_changes(target, delete=[target.hash_id])
+            elif any(column in changes for column in ELASTIC_DOC_CONTENT_COLUMNS):
+                record_elastic_changes(target, index=[target.hash_id])
+            else:
+                # Descendants of a renamed or moved folder are updated along with it
+                record_elastic_changes(
+                    target,
+                    updates={target.hash_id: _get_changed_elastic_fields(changes)},
+                )
     except Exception as e:
         raise ServerException(
             title='Failed to Update File',
@@ -772,30 +778,6 @@ def after_file_update(mapper: Mapper, connection: Connection, target: Files):
         ) from e
 
 
-def _after_file_delete(target: Files):
-    # Import what we need, when we need it (Helps to avoid circular dependencies)
-    from app import app
-
-    # This will be called by the Redis queue service outside of the normal flask app context, so
-    # here we manually ensure there is a context.
-    with app.app_context():
-        try:
-            elastic_service = get_elastic_service()
-            files_to_delete = _get_file_or_its_children_ids(target)
-            current_app.logger.info(
-                f'Attempting to delete files in elastic with hash_ids: {files_to_delete}',
-                extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict(),
-            )
-            elastic_service.delete_files(files_to_delete)
-        except Exception as e:
-            current_app.logger.error(
-                f'Elastic search delete failed for file with hash_id: {target.hash_id}',
-                exc_info=e,
-                extra=EventLog(event_type=LogEventType.ELASTIC_FAILURE.value).to_dict(),
-            )
-            raise
-
-
 @event.listens_for(Files, 'after_delete')
 def after_file_delete(mapper: Mapper, connection: Connection, target: Files):
     """
@@ -805,10 +787,7 @@ def after_file_delete(mapper: Mapper, connection: Connection, target: Files):
     # NOTE: This event is rarely triggered, because we're currently flagging files for deletion
     # rather than removing them outright. See the `after_update` event for Files.
     try:
-        from neo4japp.services.redis.redis_queue_service import RedisQueueService
-
-        rq_service = RedisQueueService()
-        rq_service.enqueue(_after_file_delete, target)
+        record_elastic_changes(target, delete=[target.hash_id])
     except Exception as e:
         raise ServerException(
             title='Failed to Delete File',
@@ -895,3 +874,24 @@ class FileLock(RDBMSBase, TimestampMixin):
     acquire_date = db.Column(
         TIMESTAMP(timezone=True), default=db.func.now(), nullable=False
     )
+
+
+class FileIndexState(RDBMSBase):
+    """What the elastic document of a file in an index was built from.
+
+    Recorded once elastic acknowledged the document, so that indexing the
+    file again only sends its metadata while its content, the way it is
+    indexed and the index mapping are unchanged (see `ElasticService`).
+    """
+
+    __tablename__ = 'file_index_state'
+    file_id = db.Column(
+        db.Integer, db.ForeignKey('files.id', ondelete='CASCADE'), primary_key=True
+    )
+    # concrete index, not the alias of the file index
+    index_name = db.Column(db.String, primary_key=True)
+    content_checksum = db.Column(db.LargeBinary, nullable=True)
+    # mime type of the file and how its content is sent to elastic
+    content_format = db.Column(db.String, nullable=False)
+    mapping_version = db.Column(db.String(32), nullable=False)
+    indexed_at = db.Column(TIMESTAMP(timezone=True), nullable=False)
@@ -370,6 +370,27 @@ def get_nondeleted_recycled_children_query(
     return query
 
 
+def get_nondeleted_recycled_children_ids_query(file_filter, children_filter=None):
+    """
+    Same as :func:`get_nondeleted_recycled_children_query`, but only retrieves
+    the IDs of the files.
+
+    :param file_filter: the SQL Alchemy filter
+    :param children_filter: the SQL Alchemy filter to be applied on children
+    :return: the query of (id,) rows
+    """
+    q_hierarchy = build_file_children_cte(
+        and_(file_filter, Files.deletion_date.is_(None))
+    )
+
+    query = db.session.query(Files.id).join(q_hierarchy, q_hierarchy.c.id == Files.id)
+
+    if children_filter is not None:
+        query = query.filter(children_filter)
+
+    return query
+
+
 class FileHierarchy:
     """
     This class can be used to populate the calculated fields on the Files model (like project,
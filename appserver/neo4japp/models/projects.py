@@ -1,7 +1,7 @@
 import re
 
 from dataclasses import dataclass
-from flask import current_app, g
+from flask import g
 from marshmallow import ValidationError
 from sqlalchemy import (
     bindparam,
@@ -24,7 +24,7 @@ from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.orm.query import Query
 from typing import Dict, Optional
 
-from neo4japp.constants import LogEventType
+from neo4japp.constants import ELASTIC_DOC_HIERARCHY_FIELDS
 from neo4japp.database import db, get_projects_service
 from neo4japp.exceptions import ServerException
 from neo4japp.models.auth import (
@@ -32,7 +32,6 @@ from neo4japp.models.auth import (
     AppUser,
 )
 from neo4japp.models.common import RDBMSBase, FullTimestampMixin, HashIdMixin
-from neo4japp.utils import EventLog
 
 projects_collaborator_role = db.Table(
     'projects_collaborator_role',
@@ -286,49 +285,22 @@ def before_project_update(mapper: Mapper, connection: Connection, target: Projec
         _update_path_of_root_and_descendants(connection, deleted[0], added[0])
 
 
-def _after_project_update(target: Projects):
-    from app import app
-    from neo4japp.database import get_elastic_service
-    from neo4japp.models.files import Files
-    from neo4japp.models.files_queries import get_nondeleted_recycled_children_query
-
-    # This will be called by the Redis queue service outside of the normal flask app context, so
-    # here we manually ensure there is a context.
-    with app.app_context():
-        try:
-            family = get_nondeleted_recycled_children_query(
-                Files.id == target.root_id,
-                children_filter=and_(Files.recycling_date.is_(None)),
-                lazy_load_content=True,
-            ).all()
-            files_to_update = [member.hash_id for member in family]
-
-            current_app.logger.info(
-                f'Attempting to update files in elastic with hash_ids: '
-                + f'{files_to_update}',
-                extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict(),
-            )
-
-            elastic_service = get_elastic_service()
-            # TODO: Change this to an update operation, and only update file path
-            elastic_service.index_files(files_to_update)
-        except Exception as e:
-            current_app.logger.error(
-                f'Elastic search update failed for project with root_id: {target.root_id}',
-                exc_info=e,
-                extra=EventLog(event_type=LogEventType.ELASTIC_FAILURE.value).to_dict(),
-            )
-            raise
-
-
 @event.listens_for(Projects, 'after_update')
 def after_project_update(mapper: Mapper, connection: Connection, target: Projects):
     # Import what we need, when we need it (Helps to avoid circular dependencies)
-    from neo4japp.services.redis.redis_queue_service import RedisQueueService
+    from neo4japp.models.files import Files, record_elastic_changes
 
     try:
-        rq_service = RedisQueueService()
-        rq_service.enqueue(_after_project_update, target)
+        # The name is the only project column in the documents of its files, whose paths
+        # start with it
+        if inspect(target).attrs.get('name').history.has_changes():
+            root_hash_id = connection.execute(
+                select([Files.hash_id]).where(Files.id == target.root_id)
+            ).scalar()
+            # Updating the root folder updates all of its descendants
+            record_elastic_changes(
+                target, updates={root_hash_id: ELASTIC_DOC_HIERARCHY_FIELDS}
+            )
     except Exception as e:
         raise ServerException(
             title='Failed to Update Project',
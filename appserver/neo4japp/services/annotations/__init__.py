@@ -1,4 +1,3 @@
-from .annotation_interval_tree import AnnotationInterval, AnnotationIntervalTree
 from .annotation_db_service import AnnotationDBService
 from .annotation_service import AnnotationService
 from .bioc_service import BiocDocumentService
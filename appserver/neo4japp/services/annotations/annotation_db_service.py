@@ -7,6 +7,7 @@ from neo4japp.models import GlobalList
 
 from .constants import EntityType, ManualAnnotationType
 from .data_transfer_objects import GlobalExclusions
+from .global_annotations_cache import global_annotations_cache
 
 
 class AnnotationDBService(DBConnection):
@@ -19,9 +20,34 @@ class AnnotationDBService(DBConnection):
         """Returns set of combined global and local exclusions
         for each entity type.
 
+        The global exclusions come from `global_annotations_cache`,
+        so they are only loaded again after a global changed.
+
         :param exclusions:  excluded annotations relative to file
             - need to be filtered for local exclusions
         """
+        global_exclusions = global_annotations_cache.get(
+            'exclusions',
+            lambda: self._compile_exclusions(
+                [d.annotation for d in self.get_global_exclusions()]
+            ),
+        )
+        local_exclusions = self._compile_exclusions(
+            [
+                exc
+                for exc in exclusions
+                if not exc.get('meta', {}).get('excludeGlobally', False)
+            ]  # safe to default to False?
+        )
+        # never mutate the cached sets
+        return GlobalExclusions(
+            **{
+                name: getattr(global_exclusions, name) | getattr(local_exclusions, name)
+                for name in GlobalExclusions.__annotations__
+            }
+        )
+
+    def _compile_exclusions(self, exclusions: List[dict]) -> GlobalExclusions:
         exclusion_sets: Dict[EntityType, set] = {
             EntityType.ANATOMY: set(),
             EntityType.CHEMICAL: set(),
@@ -44,14 +70,7 @@ class AnnotationDBService(DBConnection):
             EntityType.PROTEIN: set(),
         }
 
-        global_exclusions = [d.annotation for d in self.get_global_exclusions()]
-        local_exclusions = [
-            exc
-            for exc in exclusions
-            if not exc.get('meta', {}).get('excludeGlobally', False)
-        ]  # safe to default to False?
-
-        for exclude in global_exclusions + local_exclusions:
+        for exclude in exclusions:
             try:
                 excluded_text = exclude['text']
                 entity_type = EntityType.get(exclude['type'])
@@ -1,6 +1,6 @@
 from arango.client import ArangoClient
 from collections import defaultdict
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
 from flask import current_app
 
@@ -12,13 +12,15 @@ from neo4japp.utils.string import normalize_str
 
 from .constants import EntityType
 from .data_transfer_objects import GlobalInclusions, GeneOrProteinToOrganism
+from .global_annotations_cache import global_annotations_cache
+from .organism_match_cache import organism_match_cache
 from .utils.graph_queries import (
     collection_labels,
-    get_gene_to_organism_query,
+    get_gene_to_organism_levels_query,
     get_global_inclusions_by_type_query,
     get_lifelike_global_inclusions_by_type_query,
     get_organisms_from_gene_ids_query,
-    get_protein_to_organism_query,
+    get_protein_to_organism_levels_query,
 )
 from .utils.lmdb import (
     create_ner_type_anatomy,
@@ -112,13 +114,8 @@ def _create_entity_inclusion(
         inclusion_dict[normalized_synonym].append(entity)
 
 
-def get_entity_inclusions(arango_client, inclusions: List[dict]) -> GlobalInclusions:
-    """Returns global inclusions for each entity type.
-    For species (taxonomy), also return the local inclusions.
-
-    :param inclusions:  custom annotations relative to file
-        - need to be filtered for local inclusions
-    """
+def get_global_inclusions(arango_client) -> Dict[str, dict]:
+    """Returns the compiled global inclusions of each entity type."""
     inclusion_dicts: Dict[str, dict] = {
         EntityType.ANATOMY.value: defaultdict(list),
         EntityType.CHEMICAL.value: defaultdict(list),
@@ -136,13 +133,29 @@ def get_entity_inclusions(arango_client, inclusions: List[dict]) -> GlobalInclus
         EntityType.LAB_STRAIN.value: defaultdict(list),
     }
 
+    for k, v in inclusion_dicts.items():
+        _create_entity_inclusion(arango_client, k, v)
+    return inclusion_dicts
+
+
+def get_entity_inclusions(arango_client, inclusions: List[dict]) -> GlobalInclusions:
+    """Returns global inclusions for each entity type.
+    For species (taxonomy), also return the local inclusions.
+
+    The global inclusions come from `global_annotations_cache`,
+    so they are only queried again after a global changed.
+
+    :param inclusions:  custom annotations relative to file
+        - need to be filtered for local inclusions
+    """
+    inclusion_dicts = global_annotations_cache.get(
+        'inclusions', lambda: get_global_inclusions(arango_client)
+    )
+
     local_inclusion_dicts: Dict[str, dict] = {
         EntityType.SPECIES.value: defaultdict(list)
     }
 
-    for k, v in inclusion_dicts.items():
-        _create_entity_inclusion(arango_client, k, v)
-
     local_species_inclusions = [
         local
         for local in inclusions
@@ -213,6 +226,65 @@ def get_organisms_from_gene_ids(arango_client: ArangoClient, gene_ids: Dict[Any,
     )
 
 
+def _get_organism_matches(
+    arango_client: ArangoClient,
+    entity_type: str,
+    query: str,
+    synonyms_arg: str,
+    synonym_field: str,
+    synonyms: List[str],
+    organisms: List[str],
+) -> List[dict]:
+    """Returns the rows of a gene/protein to organism levels query for every
+    synonym/organism pair; pairs looked up before (by any process) are served
+    from `organism_match_cache`, only the others are queried.
+    """
+    version = organism_match_cache.get_kg_version(arango_client)
+    pairs = list(
+        dict.fromkeys(
+            (synonym, organism) for synonym in synonyms for organism in organisms
+        )
+    )
+    matches = organism_match_cache.get_many(version, entity_type, pairs)
+
+    missing = [pair for pair in pairs if pair not in matches]
+    if missing:
+        missing_synonyms = sorted({synonym for synonym, _ in missing})
+        missing_organisms = sorted({organism for _, organism in missing})
+        queried: Dict[Tuple[str, str], List[dict]] = {
+            (synonym, organism): []
+            for synonym in missing_synonyms
+            for organism in missing_organisms
+        }
+        result = execute_arango_query(
+            db=get_db(arango_client),
+            query=query,
+            **{synonyms_arg: missing_synonyms, 'organisms': missing_organisms},
+        )
+        for row in result:
+            queried[(row[synonym_field], row['organism_id'])].append(row)
+
+        organism_match_cache.set_many(version, entity_type, queried)
+        matches.update(queried)
+
+    return [row for pair in pairs for row in matches[pair]]
+
+
+def _closest_organism_rows(
+    rows: List[dict], synonym_field: str, id_field: str
+) -> List[dict]:
+    """Keeps the row of the organism closest in the taxonomy of each
+    synonym and gene/protein pair (its own organism over its parent,
+    over its grandparent).
+    """
+    closest: Dict[Tuple[str, str], dict] = {}
+    for row in rows:
+        key = (row[synonym_field], row[id_field])
+        if key not in closest or row['level'] < closest[key]['level']:
+            closest[key] = row
+    return list(closest.values())
+
+
 def get_genes_to_organisms(
     arango_client: ArangoClient,
     genes: List[str],
@@ -222,11 +294,18 @@ def get_genes_to_organisms(
     data_sources: Dict[str, str] = {}
     primary_names: Dict[str, str] = {}
 
-    result = execute_arango_query(
-        db=get_db(arango_client),
-        query=get_gene_to_organism_query(),
-        genes=genes,
-        organisms=organisms,
+    result = _closest_organism_rows(
+        _get_organism_matches(
+            arango_client,
+            entity_type=EntityType.GENE.value,
+            query=get_gene_to_organism_levels_query(),
+            synonyms_arg='genes',
+            synonym_field='gene_synonym',
+            synonyms=genes,
+            organisms=organisms,
+        ),
+        synonym_field='gene_synonym',
+        id_field='gene_id',
     )
 
     for row in result:
@@ -269,19 +348,29 @@ def get_proteins_to_organisms(
     protein_to_organism_map: Dict[str, Dict[str, str]] = {}
     primary_names: Dict[str, str] = {}
 
-    result = execute_arango_query(
-        db=get_db(arango_client),
-        query=get_protein_to_organism_query(),
-        proteins=proteins,
-        organisms=organisms,
+    result = _closest_organism_rows(
+        _get_organism_matches(
+            arango_client,
+            entity_type=EntityType.PROTEIN.value,
+            query=get_protein_to_organism_levels_query(),
+            synonyms_arg='proteins',
+            synonym_field='protein',
+            synonyms=proteins,
+            organisms=organisms,
+        ),
+        synonym_field='protein',
+        id_field='protein_id',
     )
 
     for row in result:
         protein_name: str = row['protein']
         organism_id: str = row['organism_id']
-        # For now just get the first protein in the list of matches,
+        protein_id: str = row['protein_id']
+
+        # For now just get the first protein matched in the organism,
         # no way for us to infer which to use
-        protein_id: str = row['protein_ids'][0]
+        if organism_id in protein_to_organism_map.get(protein_name, {}):
+            continue
 
         primary_names[protein_id] = protein_name
 
@@ -4,8 +4,9 @@ import time
 from arango.client import ArangoClient
 from bisect import bisect_left
 from flask import current_app
+from itertools import accumulate
 from math import inf, isinf
-from typing import cast, Dict, List, Set, Tuple
+from typing import cast, Dict, List, Optional, Set, Tuple
 from urllib.parse import quote as uri_encode
 from uuid import uuid4
 
@@ -16,7 +17,6 @@ from neo4japp.utils.string import equal_number_of_words, normalize_str
 
 from .annotation_db_service import AnnotationDBService
 from .annotation_graph_service import get_genes_to_organisms, get_proteins_to_organisms
-from .annotation_interval_tree import AnnotationInterval, AnnotationIntervalTree
 from .constants import (
     DatabaseType,
     EntityIdStr,
@@ -42,6 +42,53 @@ from .data_transfer_objects import (
 from .utils.common import has_center_point
 
 
+class OrganismLocationIndex:
+    """Mentions of each organism in a document, sorted by offset, with the
+    running max of their hi offsets, so that the closest mention of an
+    organism to an entity is found with a couple of bisects.
+    """
+
+    def __init__(
+        self,
+        locations: Dict[str, List[Tuple[int, int]]],
+        frequency: Dict[str, int],
+    ):
+        self.locations = locations
+        self._max_his: Dict[str, List[int]] = {
+            organism: list(accumulate((hi for _, hi in positions), max))
+            for organism, positions in locations.items()
+        }
+        self.most_frequent: Optional[str] = (
+            max(frequency.keys(), key=(lambda k: frequency[k])) if frequency else None
+        )
+
+    def __contains__(self, organism: str) -> bool:
+        return organism in self.locations
+
+    def closest_distance(
+        self, organism: str, lo: int, hi: int, above_only: bool = False
+    ) -> float:
+        """Returns the distance between the entity at [lo, hi] and the closest
+        mention of the organism (negative if they overlap), or inf if none.
+
+        A mention ending before the entity is at `lo - mention_hi`, any other
+        at `mention_lo - hi`. The first mention (by offset) whose running max
+        hi reaches `lo` is the closest of the latter, and all the mentions
+        before it are of the former, the closest being the one with max hi.
+        """
+        positions = self.locations[organism]
+        max_his = self._max_his[organism]
+        end = bisect_left(positions, (lo, hi)) if above_only else len(positions)
+
+        dist = inf
+        idx = bisect_left(max_his, lo, 0, end)
+        if idx < end:
+            dist = positions[idx][0] - hi
+        if idx > 0:
+            dist = min(dist, lo - max_his[idx - 1])
+        return dist
+
+
 class AnnotationService:
     def __init__(
         self,
@@ -58,6 +105,7 @@ class AnnotationService:
         self.organism_frequency: Dict[str, int] = {}
         self.organism_locations: Dict[str, List[Tuple[int, int]]] = {}
         self.organism_categories: Dict[str, str] = {}
+        self.organism_index = OrganismLocationIndex({}, {})
 
     def get_entities_to_annotate(
         self,
@@ -376,36 +424,17 @@ class AnnotationService:
             if curr_closest_organism is None:
                 curr_closest_organism = organism
 
-            min_organism_dist = inf
-            new_organism_dist = inf
-
-            if organism not in self.organism_locations:
+            if organism not in self.organism_index:
                 current_app.logger.error(
                     f'Organism ID {organism} does not exist in {self.organism_locations}.',
                     extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict(),
                 )
                 continue
 
-            positions_to_check = self.organism_locations[organism]
-            if above_only:
-                cut_idx = bisect_left(
-                    positions_to_check, (entity_location_lo, entity_location_hi)
-                )
-                positions_to_check = positions_to_check[:cut_idx]
-
             # Get the closest instance of this organism
-            for organism_pos in positions_to_check:
-                organism_location_lo = organism_pos[0]
-                organism_location_hi = organism_pos[1]
-
-                if entity_location_lo > organism_location_hi:
-                    # organism is before entity
-                    new_organism_dist = entity_location_lo - organism_location_hi
-                else:
-                    new_organism_dist = organism_location_lo - entity_location_hi
-
-                if new_organism_dist < min_organism_dist:
-                    min_organism_dist = new_organism_dist
+            min_organism_dist = self.organism_index.closest_distance(
+                organism, entity_location_lo, entity_location_hi, above_only
+            )
 
             # If this organism is closer than the current closest, update
             if min_organism_dist < closest_dist:
@@ -522,11 +551,11 @@ class AnnotationService:
                 # if distance is inf, then it means we didn't find an organism above
                 if isinf(closest_distance):
                     # try to use the most frequent organism
-                    most_frequent = max(
-                        self.organism_frequency.keys(),
-                        key=(lambda k: self.organism_frequency[k]),
-                    )
-                    if most_frequent in organisms_to_match:
+                    most_frequent = self.organism_index.most_frequent
+                    if (
+                        most_frequent is not None
+                        and most_frequent in organisms_to_match
+                    ):
                         (
                             entity_id,
                             organism_id,
@@ -926,6 +955,9 @@ class AnnotationService:
         ) = self._get_entity_frequency_location_and_category(
             species_annotations_with_local
         )
+        self.organism_index = OrganismLocationIndex(
+            self.organism_locations, self.organism_frequency
+        )
 
         return species_annotations
 
@@ -1101,7 +1133,7 @@ class AnnotationService:
         cleaned = self._clean_annotations(annotations=annotations)
 
         current_app.logger.info(
-            f'Time to clean and run annotation interval tree {time.time() - start}',
+            f'Time to resolve conflicting annotations {time.time() - start}',
             extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict(),
         )
         return cleaned
@@ -1139,37 +1171,28 @@ class AnnotationService:
             else:
                 annotation_interval_dict[interval_pair] = [unified]
 
-        # it's faster to create an interval tree with just
-        # intervals, rather than a tree with intervals and data
-        # because the data are viewed as unique, so the tree is bigger
-        tree = AnnotationIntervalTree(
-            AnnotationInterval(begin=lo, end=hi)
-            for (lo, hi) in annotation_interval_dict
-        )
-
-        overlap_ranges = tree.merge_overlaps()
+        # sweep the intervals in order, an interval overlapping (or touching)
+        # the current run of conflicts is part of it, otherwise it starts a new
+        # run; only the annotation taking precedence in a run is kept
+        chosen_annotation: Optional[Annotation] = None
+        run_hi = -1
 
-        for lo, hi in overlap_ranges:
-            overlaps = tree.overlap(lo, hi)
+        for lo, hi in sorted(annotation_interval_dict):
+            if chosen_annotation is not None and lo > run_hi:
+                updated_unified_annotations.append(chosen_annotation)
+                chosen_annotation = None
+            run_hi = hi if chosen_annotation is None else max(run_hi, hi)
 
-            annotations_to_fix: List[Annotation] = []
-
-            for overlap in overlaps:
-                annotations_to_fix += [
-                    anno
-                    for anno in annotation_interval_dict[(overlap.begin, overlap.end)]
-                ]
-
-            chosen_annotation = None
-
-            for annotation in annotations_to_fix:
+            for annotation in annotation_interval_dict[(lo, hi)]:
                 if chosen_annotation:
                     chosen_annotation = self.determine_entity_precedence(
                         anno1=chosen_annotation, anno2=annotation
                     )
                 else:
                     chosen_annotation = annotation
-            updated_unified_annotations.append(chosen_annotation)  # type: ignore
+
+        if chosen_annotation is not None:
+            updated_unified_annotations.append(chosen_annotation)
 
         return updated_unified_annotations
 
@@ -1,10 +1,9 @@
-import json
 import string
+import time
 
 from typing import List
 
 from bioc import (
-    biocjson,
     BioCCollection,
     BioCDocument,
     BioCPassage,
@@ -61,14 +60,40 @@ class BiocDocumentService:
         bioc_collection = self.text2collection(text=text, file_uri=file_uri)
         return bioc_collection
 
-    def generate_bioc_json(
+    def create_bioc_json(
         self,
+        text: str,
+        file_uri: str,
         annotations: List[Annotation],
-        bioc: BioCCollection,
     ) -> dict:
-        bioc_dump = biocjson.dumps(bioc, indent=2)
-        bioc = json.loads(bioc_dump)
-        bioc['documents'][0]['passages'][0]['annotations'] = [
-            anno.to_dict() for anno in annotations
-        ]
-        return bioc
+        """Returns the BioC JSON of a collection holding the text as its
+        single passage, with the annotations as the passage annotations.
+
+        This is the structure `biocjson.dumps()` gives to the collection
+        returned by `read()`, but built directly: dumping then loading it
+        back would copy the (possibly huge) text several times.
+        """
+        return {
+            'source': '',
+            'date': time.strftime('%Y-%m-%d'),
+            'key': '',
+            'infons': {},
+            'documents': [
+                {
+                    'id': file_uri,
+                    'infons': {},
+                    'passages': [
+                        {
+                            'offset': 0,
+                            'infons': {},
+                            'text': text,
+                            'sentences': [],
+                            'annotations': [anno.to_dict() for anno in annotations],
+                            'relations': [],
+                        }
+                    ],
+                    'annotations': [],
+                    'relations': [],
+                }
+            ],
+        }
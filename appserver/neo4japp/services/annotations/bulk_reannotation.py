@@ -0,0 +1,199 @@
+import time
+from typing import Dict, Iterable, List, Set, Tuple
+
+from flask import current_app
+from redis import Redis
+from sqlalchemy import and_
+
+from neo4japp.constants import (
+    FILE_MIME_TYPE_ENRICHMENT_TABLE,
+    FILE_MIME_TYPE_PDF,
+    LogEventType,
+)
+from neo4japp.database import db, get_redis_connection
+from neo4japp.models.files import FileAnnotationsVersion, Files
+from neo4japp.services.redis.redis_queue_service import RedisQueueService
+from neo4japp.utils.logger import EventLog
+
+from .constants import (
+    REANNOTATION_JOB_MAX_RETRY,
+    REANNOTATION_JOB_TIMEOUT,
+    REANNOTATION_KEY_PREFIX,
+    REANNOTATION_QUEUE,
+)
+
+
+class ReannotationProgress:
+    """Checkpoint of the current bulk reannotation run.
+
+    Kept in the RQ redis database so it outlives both the `flask reannotate`
+    process and the workers: the ids of processed files are stored as they
+    are committed, a resumed run only enqueues the files not in that set.
+    """
+
+    def __init__(self, redis_conn: Redis):
+        self._redis = redis_conn
+        self.done_key = f'{REANNOTATION_KEY_PREFIX}:done'
+        self.failed_key = f'{REANNOTATION_KEY_PREFIX}:failed'
+        self.stats_key = f'{REANNOTATION_KEY_PREFIX}:stats'
+
+    def reset(self, total: int):
+        pipe = self._redis.pipeline()
+        pipe.delete(self.done_key, self.failed_key, self.stats_key)
+        pipe.hset(self.stats_key, mapping={'total': total, 'started': time.time()})
+        pipe.execute()
+
+    @property
+    def total(self) -> int:
+        return int(self._redis.hget(self.stats_key, 'total') or 0)
+
+    def get_done_ids(self) -> Set[int]:
+        return {int(file_id) for file_id in self._redis.smembers(self.done_key)}
+
+    def get_failures(self) -> Dict[int, str]:
+        return {
+            int(file_id): error.decode('utf-8')
+            for file_id, error in self._redis.hgetall(self.failed_key).items()
+        }
+
+    def get_counts(self) -> Tuple[int, int]:
+        """Returns the number of processed and of failed files."""
+        pipe = self._redis.pipeline()
+        pipe.scard(self.done_key)
+        pipe.hlen(self.failed_key)
+        done, failed = pipe.execute()
+        return done, failed
+
+    def mark_done(self, succeeded: Iterable[int], failed: Dict[int, str]):
+        succeeded_ids = [str(file_id) for file_id in succeeded]
+        pipe = self._redis.pipeline()
+        if succeeded_ids:
+            pipe.sadd(self.done_key, *succeeded_ids)
+            # failed in a previous attempt of the run
+            pipe.hdel(self.failed_key, *succeeded_ids)
+        for file_id, error in failed.items():
+            pipe.sadd(self.done_key, file_id)
+            pipe.hset(self.failed_key, str(file_id), error)
+        pipe.execute()
+
+
+def get_reannotation_file_ids() -> List[int]:
+    """Returns the ids of every annotated file, in a stable order."""
+    query = (
+        db.session.query(Files.id)
+        .filter(
+            and_(
+                Files.mime_type.in_(
+                    [FILE_MIME_TYPE_PDF, FILE_MIME_TYPE_ENRICHMENT_TABLE]
+                ),
+                Files.deletion_date.is_(None),
+                and_(Files.annotations.isnot(None), Files.annotations != '[]'),
+            )
+        )
+        .order_by(Files.id)
+    )
+    return [file_id for file_id, in query]
+
+
+def enqueue_reannotation(file_ids: List[int], user_id: int, batch_size: int) -> int:
+    """Enqueues the files in batches onto the reannotation queue,
+    returns the number of jobs."""
+    rq_service = RedisQueueService()
+    batches = 0
+    for i in range(0, len(file_ids), batch_size):
+        rq_service.enqueue(
+            reannotate_batch,
+            file_ids[i : i + batch_size],
+            user_id,
+            queue=REANNOTATION_QUEUE,
+            max_retry=REANNOTATION_JOB_MAX_RETRY,
+            # retry right away, the workers run without a scheduler
+            retry_interval=0,
+            job_timeout=REANNOTATION_JOB_TIMEOUT,
+            result_ttl=0,
+        )
+        batches += 1
+    return batches
+
+
+def reannotate_batch(file_ids: List[int], user_id: int):
+    """RQ job reannotating a batch of files with their own configs and organism.
+
+    A file failing to annotate is recorded and does not affect the rest of
+    the batch, the updates of the batch are committed together.
+    """
+    # Import what we need, when we need it (Helps to avoid circular dependencies)
+    from app import app
+    from neo4japp.blueprints.annotations import FileAnnotationsGenerationView
+
+    from .initializer import get_manual_annotation_service
+
+    # This will be called by the Redis queue service outside of the normal flask app context, so
+    # here we manually ensure there is a context.
+    with app.app_context():
+        files = (
+            db.session.query(Files)
+            .filter(Files.id.in_(file_ids), Files.deletion_date.is_(None))
+            .all()
+        )
+
+        view = FileAnnotationsGenerationView()
+        updated_files: List[dict] = []
+        versions: List[dict] = []
+        failed: Dict[int, str] = {}
+
+        for file in files:
+            try:
+                updates, file_versions, results = view.annotate_files([file], user_id)
+            except Exception as e:
+                current_app.logger.error(
+                    f'Failed to reannotate file {file.hash_id}.',
+                    exc_info=e,
+                    extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict(),
+                )
+                failed[file.id] = str(e)
+                continue
+
+            result = results[file.hash_id]
+            if result['success']:
+                updated_files.extend(updates)
+                versions.extend(file_versions)
+            else:
+                failed[file.id] = result['error']
+
+        try:
+            db.session.bulk_insert_mappings(FileAnnotationsVersion, versions)
+            db.session.bulk_update_mappings(Files, updated_files)
+            if updated_files:
+                get_manual_annotation_service().index_file_annotations(
+                    [update['id'] for update in updated_files]
+                )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        # files deleted since the batch was enqueued count as done as well
+        ReannotationProgress(get_redis_connection()).mark_done(
+            (file_id for file_id in file_ids if file_id not in failed), failed
+        )
+
+
+def run_reannotation_worker(name: str):
+    """Processes the reannotation queue until it is empty.
+
+    Meant as the target of a process started by `start_forked_workers`. Jobs
+    are run in the worker process itself (rather than a fork per job as
+    `rq worker` does), so the LMDB environments, decoded LMDB values and
+    compiled global inclusions and exclusions warmed up by the first batch
+    are reused by all the next ones.
+    """
+    from rq import SimpleWorker
+
+    from app import app
+
+    with app.app_context():
+        worker = RedisQueueService().create_worker(
+            [REANNOTATION_QUEUE], name, worker_class=SimpleWorker
+        )
+        worker.work(burst=True)
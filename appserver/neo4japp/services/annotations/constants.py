@@ -31,6 +31,44 @@ MIN_ENTITY_LENGTH = 2
 MAX_GENE_WORD_LENGTH = 1
 MAX_FOOD_WORD_LENGTH = 4
 
+# bytes read at a time from a streamed pdfparser response
+PARSER_STREAM_CHUNK_SIZE = 1024 * 1024
+
+# number of decoded LMDB synonym hits kept in memory per process
+LMDB_VALUE_CACHE_SIZE = 200000
+
+# parser and NLP results cached by content expire after
+CONTENT_CACHE_TTL = 3600 * 24 * 30
+
+# the NLP service is sent texts of at most NLP_MAX_CHUNK_SIZE characters,
+# longer ones are split by sentence and sent in parallel
+NLP_MAX_CHUNK_SIZE = 10000
+NLP_MAX_CONCURRENCY = 8
+NLP_CONNECT_TIMEOUT = 5
+# read timeouts (seconds) of a single chunk, others use REQUEST_TIMEOUT
+NLP_MODEL_TIMEOUTS = {
+    'all': 60,
+    'bc2gm_v1_chem': 30,
+    'bc2gm_v1_gene': 30,
+    'bc2gm_v1_ncbi_disease': 30,
+}
+
+# (synonym, organism) KG matches of genes/proteins kept in memory per process
+ORGANISM_MATCH_CACHE_SIZE = 100000
+ORGANISM_MATCH_CACHE_TTL = 3600 * 24 * 7
+# seconds between checks of the KG collection revisions
+KG_VERSION_CHECK_INTERVAL = 60
+
+# bulk reannotation (`flask reannotate`)
+REANNOTATION_QUEUE = 'reannotation'
+REANNOTATION_KEY_PREFIX = 'reannotation'
+REANNOTATION_BATCH_SIZE = 20
+REANNOTATION_JOB_MAX_RETRY = 2
+REANNOTATION_JOB_TIMEOUT = 60 * 60
+
+# files (re)indexed into the annotation occurrence table per transaction
+ANNOTATION_OCCURRENCE_BATCH_SIZE = 100
+
 COMMON_TWO_LETTER_WORDS = {
     'of',
     'to',
@@ -255,6 +293,11 @@ class ManualAnnotationType(Enum):
     EXCLUSION = 'exclusion'
 
 
+class LMDBValueFormat(Enum):
+    JSON = 'json'
+    BINARY = 'binary'
+
+
 # these links are used in annotations and custom annotations
 # first are search links
 # then entity hyperlinks
@@ -0,0 +1,264 @@
+import hashlib
+import marshal
+import time
+import zlib
+from array import array
+from typing import Any, List, Optional, Tuple
+
+import redis
+from flask import current_app
+
+from neo4japp.constants import LogEventType, FILE_MIME_TYPE_PDF
+from neo4japp.database import db
+from neo4japp.models.files import FileContent, Files
+from neo4japp.services.rcache import get_redis_cache_server
+from neo4japp.utils.globals import config
+from neo4japp.utils.logger import EventLog
+
+from .constants import CONTENT_CACHE_TTL
+from .data_transfer_objects import PDFWord, PDFWordRects
+from .utils.parsing import parse_content
+
+# bumped whenever the format of the cached values changes
+CONTENT_CACHE_FORMAT_VERSION = 1
+
+
+class ContentCache:
+    """Size bounded cache of annotation inputs keyed by a hash of the content.
+
+    Values are marshalled, compressed and shared by every process through
+    redis. When the total size of the cached values goes over the size set by
+    `max_size_config`, the least recently used ones are evicted; entries also
+    expire after `CONTENT_CACHE_TTL` so that changes of the remote services
+    propagate.
+
+    Redis failures are logged and treated as misses, the cache is only an
+    optimization.
+    """
+
+    def __init__(self, name: str, max_size_config: str):
+        self.prefix = f'annotations:{name}:v{CONTENT_CACHE_FORMAT_VERSION}'
+        self.max_size_config = max_size_config
+        # key -> last use, key -> size of the value, and total size of the values
+        self.lru_key = f'{self.prefix}:lru'
+        self.sizes_key = f'{self.prefix}:sizes'
+        self.stats_key = f'{self.prefix}:stats'
+
+    @property
+    def enabled(self) -> bool:
+        return config.get('ANNOTATION_CONTENT_CACHE')
+
+    @property
+    def max_size(self) -> int:
+        return config.get(self.max_size_config)
+
+    def _data_key(self, key: str) -> str:
+        return f'{self.prefix}:data:{key}'
+
+    def _log_error(self):
+        current_app.logger.warning(
+            f'Annotation content cache {self.prefix} is unavailable.',
+            exc_info=True,
+            extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict(),
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        try:
+            server = get_redis_cache_server()
+            value = server.get(self._data_key(key))
+            if value is None:
+                # the value may have expired, its size no longer counts
+                self._forget(server, [key])
+                return None
+            server.zadd(self.lru_key, {key: time.time()})
+        except redis.RedisError:
+            self._log_error()
+            return None
+        return marshal.loads(zlib.decompress(value))
+
+    def set(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        data = zlib.compress(marshal.dumps(value, 4), 1)
+        if len(data) > self.max_size:
+            return
+        try:
+            server = get_redis_cache_server()
+            pipe = server.pipeline()
+            pipe.hget(self.sizes_key, key)
+            pipe.set(self._data_key(key), data, ex=CONTENT_CACHE_TTL)
+            pipe.zadd(self.lru_key, {key: time.time()})
+            pipe.hset(self.sizes_key, key, str(len(data)))
+            previous_size, *_ = pipe.execute()
+            total = server.hincrby(
+                self.stats_key, 'total', len(data) - int(previous_size or 0)
+            )
+            if total > self.max_size:
+                self._evict(server, total)
+        except redis.RedisError:
+            self._log_error()
+
+    def _forget(self, server: redis.Redis, keys: List[str]) -> int:
+        """Removes the given keys and their values from the cache.
+        :return: the size of the values removed
+        """
+        pipe = server.pipeline()
+        pipe.hmget(self.sizes_key, keys)
+        # only the sizes of the keys removed here are subtracted from the
+        # total, another process may be removing the same keys
+        for key in keys:
+            pipe.hdel(self.sizes_key, key)
+        pipe.zrem(self.lru_key, *keys)
+        pipe.delete(*(self._data_key(key) for key in keys))
+        sizes, *removed = pipe.execute()
+        size = sum(
+            int(size) for size, deleted in zip(sizes, removed) if size and deleted
+        )
+        if size:
+            server.hincrby(self.stats_key, 'total', -size)
+        return size
+
+    def _evict(self, server: redis.Redis, total: int):
+        # keys last used before the TTL have expired, whatever their order
+        stale = server.zrangebyscore(
+            self.lru_key, '-inf', time.time() - CONTENT_CACHE_TTL
+        )
+        if stale:
+            total -= self._forget(server, [key.decode('utf-8') for key in stale])
+
+        while total > self.max_size:
+            oldest = [key.decode('utf-8') for key in server.zrange(self.lru_key, 0, 9)]
+            if not oldest:
+                # nothing left to evict, the total can only be off
+                server.hset(self.stats_key, 'total', '0')
+                return
+            sizes = server.hmget(self.sizes_key, oldest)
+            evicted = []
+            excess = total - self.max_size
+            for key, size in zip(oldest, sizes):
+                if excess <= 0:
+                    break
+                evicted.append(key)
+                excess -= int(size or 0)
+            total -= self._forget(server, evicted)
+
+
+parse_cache = ContentCache('parse', 'ANNOTATION_PARSE_CACHE_MAX_SIZE')
+nlp_cache = ContentCache('nlp', 'ANNOTATION_NLP_CACHE_MAX_SIZE')
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def dump_parsed(text: str, parsed: List[PDFWord]) -> tuple:
+    """Flattens the parsed words into columns of primitives that marshal
+    (and compress) well; all the words share the same rects."""
+    rects = parsed[0].rects if parsed else None
+    if rects is None:
+        rects = PDFWordRects()
+    return (
+        text,
+        rects.word_starts.tobytes(),
+        rects.lower_x.tobytes(),
+        rects.lower_y.tobytes(),
+        rects.widths.tobytes(),
+        rects.heights.tobytes(),
+        [w.keyword for w in parsed],
+        [w.normalized_keyword for w in parsed],
+        [w.page_number for w in parsed],
+        [w.lo_location_offset for w in parsed],
+        [w.hi_location_offset for w in parsed],
+        [w.previous_words for w in parsed],
+        [w.word_lo for w in parsed],
+        [w.word_hi for w in parsed],
+    )
+
+
+def load_parsed(value: tuple) -> Tuple[str, List[PDFWord]]:
+    text, word_starts, lower_x, lower_y, widths, heights, *columns = value
+    rects = PDFWordRects()
+    rects.word_starts = array('l')
+    rects.word_starts.frombytes(word_starts)
+    rects.lower_x.frombytes(lower_x)
+    rects.lower_y.frombytes(lower_y)
+    rects.widths.frombytes(widths)
+    rects.heights.frombytes(heights)
+    return text, [
+        PDFWord(
+            keyword=keyword,
+            normalized_keyword=normalized_keyword,
+            page_number=page_number,
+            lo_location_offset=lo,
+            hi_location_offset=hi,
+            previous_words=previous_words,
+            rects=rects,
+            word_lo=word_lo,
+            word_hi=word_hi,
+        )
+        for (
+            keyword,
+            normalized_keyword,
+            page_number,
+            lo,
+            hi,
+            previous_words,
+            word_lo,
+            word_hi,
+        ) in zip(*columns)
+    ]
+
+
+def _get_file_parse_cache_key(
+    content_type: str, checksum: bytes, exclude_references: bool
+) -> str:
+    return f'{content_type}:{checksum.hex()}:{int(exclude_references)}'
+
+
+def _get_parse_cache_key(content_type: str, **kwargs) -> Optional[str]:
+    if 'text' in kwargs:
+        return f'{content_type}:{hash_text(kwargs["text"])}'
+
+    checksum = (
+        db.session.query(FileContent.checksum_sha256)
+        .join(Files, Files.content_id == FileContent.id)
+        .filter(Files.id == kwargs['file_id'])
+        .scalar()
+    )
+    if checksum is None:
+        return None
+    return _get_file_parse_cache_key(
+        content_type, checksum, kwargs['exclude_references']
+    )
+
+
+def get_cached_parsed_text(
+    checksum: bytes, content_type=FILE_MIME_TYPE_PDF
+) -> Optional[str]:
+    """Returns the full text the parser extracted from the content with the given
+    checksum, if it is still cached. The text without references is not reused:
+    it would leave them out of the search index."""
+    if not parse_cache.enabled:
+        return None
+    cached = parse_cache.get(_get_file_parse_cache_key(content_type, checksum, False))
+    return cached[0] if cached is not None else None
+
+
+def get_parsed_content(
+    content_type=FILE_MIME_TYPE_PDF, **kwargs
+) -> Tuple[str, List[PDFWord]]:
+    """Same as `parse_content`, but identical content (same file checksum
+    and `exclude_references`, or same text) is only sent to the parser once.
+    """
+    key = _get_parse_cache_key(content_type, **kwargs) if parse_cache.enabled else None
+    if key is not None:
+        cached = parse_cache.get(key)
+        if cached is not None:
+            return load_parsed(cached)
+
+    text, parsed = parse_content(content_type, **kwargs)
+    if key is not None:
+        parse_cache.set(key, dump_parsed(text, parsed))
+    return text, parsed
@@ -1,9 +1,12 @@
-from typing import Dict, List, Optional, Set, Tuple
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 import attr
 
 from neo4japp.utils import CamelDictMixin
 
+from ..constants import PDF_NEW_LINE_THRESHOLD
+
 
 @attr.s(slots=True)
 class NLPResults:
@@ -19,6 +22,131 @@ class NLPResults:
     species: Set[Tuple[int, int]] = attr.ib(default=attr.Factory(set))
 
 
+class PDFWordRects:
+    """Columnar storage of the rects of every word parsed from a document.
+
+    The rects are kept in parallel arrays, and the rects of consecutive
+    words are contiguous, so a run of words (e.g a multi-word token) is
+    addressed by a range of word indexes without copying anything.
+    """
+
+    __slots__ = ('word_starts', 'lower_x', 'lower_y', 'widths', 'heights')
+
+    def __init__(self):
+        # rects of word i are at [word_starts[i], word_starts[i + 1])
+        self.word_starts = array('l', [0])
+        self.lower_x = array('d')
+        self.lower_y = array('d')
+        self.widths = array('d')
+        self.heights = array('d')
+
+    def __len__(self):
+        return len(self.word_starts) - 1
+
+    def add_word(self, rects: Iterable[Tuple[float, float, float, float]]) -> int:
+        """Adds the rects (lower x, lower y, width, height) of the next word,
+        and returns the index of the word.
+        """
+        for lower_x, lower_y, width, height in rects:
+            self.lower_x.append(lower_x)
+            self.lower_y.append(lower_y)
+            self.widths.append(width)
+            self.heights.append(height)
+        self.word_starts.append(len(self.lower_x))
+        return len(self) - 1
+
+    def word_coordinates(self, word_idx: int) -> List[List[float]]:
+        return [
+            [
+                self.lower_x[i],
+                self.lower_y[i],
+                self.lower_x[i] + self.widths[i],
+                self.lower_y[i] + self.heights[i],
+            ]
+            for i in range(self.word_starts[word_idx], self.word_starts[word_idx + 1])
+        ]
+
+    def coordinates(self, word_lo: int, word_hi: int) -> List[List[float]]:
+        """Returns the coordinates of the words in [word_lo, word_hi).
+
+        When combining sequential words their coordinates are merged
+        together, while also keeping in mind words on new lines. The
+        words are merged one at a time, the same way multi-word tokens
+        are built up by the tokenizer.
+        """
+        coordinates = self.word_coordinates(word_lo)
+        for word_idx in range(word_lo + 1, word_hi):
+            heights = self.heights[
+                self.word_starts[word_lo] : self.word_starts[word_idx]
+            ]
+            coordinates = self._merge(
+                [
+                    (coordinates, heights),
+                    (
+                        self.word_coordinates(word_idx),
+                        self.heights[
+                            self.word_starts[word_idx] : self.word_starts[word_idx + 1]
+                        ],
+                    ),
+                ]
+            )
+        return coordinates
+
+    @staticmethod
+    def _merge(words_subset) -> List[List[float]]:
+        coordinates = []
+        start_lower_x = 0.0
+        start_lower_y = 0.0
+        end_upper_x = 0.0
+        end_upper_y = 0.0
+        prev_height = 0.0
+        for word_coordinates, word_heights in words_subset:
+            for j, coords in enumerate(word_coordinates):
+                lower_x, lower_y, upper_x, upper_y = coords
+
+                if (
+                    start_lower_x == 0.0
+                    and start_lower_y == 0.0
+                    and end_upper_x == 0.0
+                    and end_upper_y == 0.0
+                ):
+                    start_lower_x = lower_x
+                    start_lower_y = lower_y
+                    end_upper_x = upper_x
+                    end_upper_y = upper_y
+                    prev_height = word_heights[j]
+                else:
+                    if lower_y != start_lower_y:
+                        diff = abs(lower_y - start_lower_y)
+
+                        # if diff is greater than height ratio
+                        # then part of keyword is on a new line
+                        if diff > prev_height * PDF_NEW_LINE_THRESHOLD:
+                            coordinates.append(
+                                [start_lower_x, start_lower_y, end_upper_x, end_upper_y]
+                            )
+
+                            start_lower_x = lower_x
+                            start_lower_y = lower_y
+                            end_upper_x = upper_x
+                            end_upper_y = upper_y
+                            prev_height = word_heights[j]
+                        else:
+                            if upper_y > end_upper_y:
+                                end_upper_y = upper_y
+
+                            if upper_x > end_upper_x:
+                                end_upper_x = upper_x
+                    else:
+                        if upper_y > end_upper_y:
+                            end_upper_y = upper_y
+
+                        if upper_x > end_upper_x:
+                            end_upper_x = upper_x
+        coordinates.append([start_lower_x, start_lower_y, end_upper_x, end_upper_y])
+        return coordinates
+
+
 @attr.s(slots=True)
 class PDFWord:
     keyword: str = attr.ib()
@@ -30,9 +158,33 @@ class PDFWord:
     # if word is wrapped in parenthesis
     # this attribute will not be empty string
     previous_words: str = attr.ib()
-    heights: List[float] = attr.ib(default=attr.Factory(list))
-    widths: List[float] = attr.ib(default=attr.Factory(list))
-    coordinates: List[List[float]] = attr.ib(default=attr.Factory(list))
+    # view into the document's rects, the word spans
+    # the parsed words in [word_lo, word_hi)
+    rects: Optional[PDFWordRects] = attr.ib(default=None, eq=False, repr=False)
+    word_lo: int = attr.ib(default=0)
+    word_hi: int = attr.ib(default=0)
+
+    @property
+    def coordinates(self) -> List[List[float]]:
+        if self.rects is None or self.word_lo == self.word_hi:
+            return []
+        if self.word_hi - self.word_lo == 1:
+            return self.rects.word_coordinates(self.word_lo)
+        return self.rects.coordinates(self.word_lo, self.word_hi)
+
+    @property
+    def heights(self) -> List[float]:
+        if self.rects is None:
+            return []
+        starts = self.rects.word_starts
+        return list(self.rects.heights[starts[self.word_lo] : starts[self.word_hi]])
+
+    @property
+    def widths(self) -> List[float]:
+        if self.rects is None:
+            return []
+        starts = self.rects.word_starts
+        return list(self.rects.widths[starts[self.word_lo] : starts[self.word_hi]])
 
 
 @attr.s(frozen=False)
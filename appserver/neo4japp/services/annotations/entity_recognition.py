@@ -1,5 +1,6 @@
-import json
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+
+import attr
 
 from .constants import (
     EntityType,
@@ -27,6 +28,154 @@ from .data_transfer_objects import (
 from .lmdb_service import LMDBService
 
 
+@attr.s(frozen=True)
+class EntityRecognitionSpec:
+    """Describes how one entity type is recognized.
+
+    The attribute names refer to the fields of `GlobalInclusions`,
+    `GlobalExclusions`, `NLPResults` and `RecognizedEntities`.
+    """
+
+    entity_type: str = attr.ib()
+    result: str = attr.ib()
+    inclusion: str = attr.ib()
+    exclusion: str = attr.ib()
+    # LMDB database name, None for entity types
+    # that only come from global inclusions
+    dbname: Optional[str] = attr.ib(default=None)
+    exclusion_case_insensitive: Optional[str] = attr.ib(default=None)
+    # NLP is a veto if used, see `_sweep()`
+    nlp: Optional[str] = attr.ib(default=None)
+    max_words: Optional[int] = attr.ib(default=None)
+
+
+LMDB_ENTITY_SPECS = [
+    EntityRecognitionSpec(
+        entity_type=EntityType.ANATOMY.value,
+        result='recognized_anatomy',
+        inclusion='included_anatomy',
+        exclusion='excluded_anatomy',
+        dbname=ANATOMY_LMDB,
+    ),
+    EntityRecognitionSpec(
+        entity_type=EntityType.CHEMICAL.value,
+        result='recognized_chemicals',
+        inclusion='included_chemicals',
+        exclusion='excluded_chemicals',
+        dbname=CHEMICALS_LMDB,
+        nlp='chemicals',
+    ),
+    EntityRecognitionSpec(
+        entity_type=EntityType.COMPOUND.value,
+        result='recognized_compounds',
+        inclusion='included_compounds',
+        exclusion='excluded_compounds',
+        dbname=COMPOUNDS_LMDB,
+        nlp='compounds',
+    ),
+    EntityRecognitionSpec(
+        entity_type=EntityType.DISEASE.value,
+        result='recognized_diseases',
+        inclusion='included_diseases',
+        exclusion='excluded_diseases',
+        dbname=DISEASES_LMDB,
+        nlp='diseases',
+    ),
+    EntityRecognitionSpec(
+        entity_type=EntityType.FOOD.value,
+        result='recognized_foods',
+        inclusion='included_foods',
+        exclusion='excluded_foods',
+        dbname=FOODS_LMDB,
+        max_words=MAX_FOOD_WORD_LENGTH,
+    ),
+    EntityRecognitionSpec(
+        entity_type=EntityType.PHENOMENA.value,
+        result='recognized_phenomenas',
+        inclusion='included_phenomenas',
+        exclusion='excluded_phenomenas',
+        dbname=PHENOMENAS_LMDB,
+    ),
+    EntityRecognitionSpec(
+        entity_type=EntityType.PHENOTYPE.value,
+        result='recognized_phenotypes',
+        inclusion='included_phenotypes',
+        exclusion='excluded_phenotypes',
+        dbname=PHENOTYPES_LMDB,
+    ),
+    EntityRecognitionSpec(
+        entity_type=EntityType.PROTEIN.value,
+        result='recognized_proteins',
+        inclusion='included_proteins',
+        exclusion='excluded_proteins',
+        dbname=PROTEINS_LMDB,
+        exclusion_case_insensitive='excluded_proteins_case_insensitive',
+    ),
+]
+
+GENE_SPEC = EntityRecognitionSpec(
+    entity_type=EntityType.GENE.value,
+    result='recognized_genes',
+    inclusion='included_genes',
+    exclusion='excluded_genes',
+    dbname=GENES_LMDB,
+    exclusion_case_insensitive='excluded_genes_case_insensitive',
+    nlp='genes',
+    max_words=MAX_GENE_WORD_LENGTH,
+)
+
+SPECIES_SPEC = EntityRecognitionSpec(
+    entity_type=EntityType.SPECIES.value,
+    result='recognized_species',
+    inclusion='included_species',
+    exclusion='excluded_species',
+    dbname=SPECIES_LMDB,
+)
+
+# non lmdb lookups
+INCLUSION_ENTITY_SPECS = [
+    EntityRecognitionSpec(
+        entity_type=EntityType.COMPANY.value,
+        result='recognized_companies',
+        inclusion='included_companies',
+        exclusion='excluded_companies',
+    ),
+    EntityRecognitionSpec(
+        entity_type=EntityType.ENTITY.value,
+        result='recognized_entities',
+        inclusion='included_entities',
+        exclusion='excluded_entities',
+    ),
+    EntityRecognitionSpec(
+        entity_type=EntityType.LAB_SAMPLE.value,
+        result='recognized_lab_samples',
+        inclusion='included_lab_samples',
+        exclusion='excluded_lab_samples',
+    ),
+    EntityRecognitionSpec(
+        entity_type=EntityType.LAB_STRAIN.value,
+        result='recognized_lab_strains',
+        inclusion='included_lab_strains',
+        exclusion='excluded_lab_strains',
+    ),
+]
+
+
+@attr.s(slots=True)
+class _Token:
+    """A token with its derived forms computed once."""
+
+    token: PDFWord = attr.ib()
+    key: str = attr.ib()
+    lowered: str = attr.ib()
+    word_count: int = attr.ib()
+    offset_key: Tuple[int, int] = attr.ib()
+
+
+def _primary_entities(results: List[dict]) -> List[dict]:
+    return [data for data in results if data['synonym'] == data['name']] or results
+
+
 class EntityRecognitionService:
     def __init__(
         self,
@@ -38,78 +187,10 @@ class EntityRecognitionService:
         self.entity_exclusions = exclusions
         self.entity_inclusions = inclusions
 
-    def _check_lmdb_genes(self, nlp_results: NLPResults, tokens: List[PDFWord]):
-        keys = {token.normalized_keyword for token in tokens}
-
-        global_inclusion = self.entity_inclusions.included_genes
-        global_exclusion = self.entity_exclusions.excluded_genes
-        global_exclusion_case_insensitive = (
-            self.entity_exclusions.excluded_genes_case_insensitive
-        )
-
-        key_results, _ = self._load_key_results(GENES_LMDB, keys)
-
-        # gene is a bit different
-        # we want both from lmdb and inclusions
-        # not only check inclusions for keys not in lmdb
-        # because a global could normalize to something already in
-        # LMDB, e.g IL-8 is a global inclusion, but il8 is already
-        # normalized in LMDB from IL8
-        for key in keys:
-            found = global_inclusion.get(key, None)
-            if found:
-                match_list = key_results.get(key, [])
-                match_list += found
-                key_results[key] = match_list
-
-        lmdb_matches = []
-        for token in tokens:
-            if token.normalized_keyword in key_results:
-                results = key_results[token.normalized_keyword]
-                lowered = token.keyword.lower()
-                if (
-                    token.keyword in global_exclusion
-                    or lowered in global_exclusion_case_insensitive
-                ):
-                    continue
-
-                exact = [data for data in results if data['synonym'] == token.keyword]
-                if not exact:
-                    continue
-
-                match = LMDBMatch(
-                    entities=[data for data in exact if data['synonym'] == data['name']]
-                    or exact,
-                    token=token,
-                )
-                offset_key = (token.lo_location_offset, token.hi_location_offset)
-                # if an entity set in nlp_results is not empty
-                # that means NLP was used
-                # NLP is veto, so if not found it vetos
-                if nlp_results.genes:
-                    if offset_key in nlp_results.genes:
-                        lmdb_matches.append(match)
-                else:
-                    lmdb_matches.append(match)
-        return lmdb_matches
-
     def _load_key_results(
         self, dbname: str, keys
     ) -> Tuple[Dict[str, List[dict]], Set[str]]:
-        key_results: Dict[str, List[dict]] = {}
-
-        with self.lmdb.begin(dbname=dbname) as txn:
-            cursor = txn.cursor()
-            matched_results = cursor.getmulti(
-                [k.encode('utf-8') for k in keys], dupdata=True
-            )
-
-            for key, value in matched_results:
-                decoded_key = key.decode('utf-8')
-                match_list = key_results.get(decoded_key, [])
-                match_list.append(json.loads(value))
-                key_results[decoded_key] = match_list
-
+        key_results = self.lmdb.get_entities(dbname, keys)
         unmatched_keys = keys - set(key_results)
 
         return key_results, unmatched_keys
@@ -129,278 +210,209 @@ class EntityRecognitionService:
 
         return key_results, unmatched_keys
 
-    def _check_lmdb_species(self, tokens: List[PDFWord]):
-        keys = {token.normalized_keyword for token in tokens}
+    def _load_gene_key_results(self, keys) -> Dict[str, List[dict]]:
+        key_results, _ = self._load_key_results(GENES_LMDB, keys)
+        global_inclusion = self.entity_inclusions.included_genes
 
-        global_inclusion = self.entity_inclusions.included_species
-        local_inclusion = self.entity_inclusions.included_local_species
-        global_exclusion = self.entity_exclusions.excluded_species
+        # gene is a bit different
+        # we want both from lmdb and inclusions
+        # not only check inclusions for keys not in lmdb
+        # because a global could normalize to something already in
+        # LMDB, e.g IL-8 is a global inclusion, but il8 is already
+        # normalized in LMDB from IL8
+        for key in keys:
+            found = global_inclusion.get(key, None)
+            if found:
+                key_results[key] = key_results.get(key, []) + found
+        return key_results
+
+    def _get_exclusions(
+        self, spec: EntityRecognitionSpec
+    ) -> Tuple[Set[str], Optional[Set[str]]]:
+        """Returns the exclusions checked against the lowercased keyword,
+        or if the second value is not None, the exclusions checked against
+        the exact keyword and the case insensitive ones.
+        """
+        global_exclusion = getattr(self.entity_exclusions, spec.exclusion)
+        if spec.exclusion_case_insensitive:
+            case_insensitive = getattr(
+                self.entity_exclusions, spec.exclusion_case_insensitive
+            )
+            # genes always check both, proteins only if there
+            # are case insensitive exclusions
+            if case_insensitive or spec is GENE_SPEC:
+                return global_exclusion, case_insensitive
+        return global_exclusion, None
+
+    def _prepare_tokens(self, tokens: List[PDFWord]) -> List[_Token]:
+        return [
+            _Token(
+                token=token,
+                key=token.normalized_keyword,
+                lowered=token.keyword.lower(),
+                word_count=len(token.keyword.split(' ')),
+                offset_key=(token.lo_location_offset, token.hi_location_offset),
+            )
+            for token in tokens
+        ]
+
+    def _load_all_key_results(
+        self, prepared: List[_Token]
+    ) -> Tuple[
+        Dict[EntityRecognitionSpec, Dict[str, List[dict]]], Dict[str, List[dict]]
+    ]:
+        """Query every LMDB backed entity type, each with its key set
+        computed once for all types sharing the same word limit.
+
+        Returns the key results per spec, and separately the species
+        found only in local inclusions.
+        """
+        keys_by_max_words: Dict[Optional[int], Set[str]] = {
+            None: {t.key for t in prepared}
+        }
+        for spec in LMDB_ENTITY_SPECS + [GENE_SPEC]:
+            max_words = spec.max_words
+            if max_words is not None and max_words not in keys_by_max_words:
+                keys_by_max_words[max_words] = {
+                    t.key for t in prepared if t.word_count <= max_words
+                }
 
-        key_results_local: Dict[str, List[dict]] = {}
-        key_results, unmatched_keys = self._load_species_key_results(
-            SPECIES_LMDB, keys, global_inclusion
+        key_results: Dict[EntityRecognitionSpec, Dict[str, List[dict]]] = {}
+        for spec in LMDB_ENTITY_SPECS:
+            assert spec.dbname is not None
+            key_results[spec], _ = self._load_species_key_results(
+                spec.dbname,
+                keys_by_max_words[spec.max_words],
+                getattr(self.entity_inclusions, spec.inclusion),
+            )
+
+        key_results[GENE_SPEC] = self._load_gene_key_results(
+            keys_by_max_words[GENE_SPEC.max_words]
         )
 
+        key_results[SPECIES_SPEC], unmatched_keys = self._load_species_key_results(
+            SPECIES_LMDB,
+            keys_by_max_words[None],
+            self.entity_inclusions.included_species,
+        )
+        local_inclusion = self.entity_inclusions.included_local_species
+        key_results_local = {}
         for key in unmatched_keys:
             found = local_inclusion.get(key, None)
             if found:
                 key_results_local[key] = found
 
-        lmdb_matches = []
-        lmdb_matches_local = []
-        for token in tokens:
-            if token.keyword.lower() not in global_exclusion:
-                if token.normalized_keyword in key_results:
-                    results = key_results[token.normalized_keyword]
-                    lmdb_matches.append(
+        return key_results, key_results_local
+
+    def _sweep(
+        self,
+        nlp_results: NLPResults,
+        prepared: List[_Token],
+        key_results: Dict[EntityRecognitionSpec, Dict[str, List[dict]]],
+        key_results_local: Dict[str, List[dict]],
+    ) -> RecognizedEntities:
+        results = RecognizedEntities()
+
+        # if an entity set in nlp_results is not empty
+        # that means NLP was used
+        # NLP is veto, so if not found it vetos
+        nlp_vetoes = {
+            spec: getattr(nlp_results, spec.nlp)
+            for spec in LMDB_ENTITY_SPECS + [GENE_SPEC]
+            if spec.nlp and getattr(nlp_results, spec.nlp)
+        }
+        lmdb_specs = [
+            (
+                key_results[spec],
+                *self._get_exclusions(spec),
+                nlp_vetoes.get(spec),
+                getattr(results, spec.result),
+            )
+            for spec in LMDB_ENTITY_SPECS
+        ]
+        inclusion_specs = [
+            (
+                getattr(self.entity_inclusions, spec.inclusion),
+                getattr(self.entity_exclusions, spec.exclusion),
+                getattr(results, spec.result),
+            )
+            for spec in INCLUSION_ENTITY_SPECS
+        ]
+        gene_results = key_results[GENE_SPEC]
+        gene_exclusion, gene_exclusion_case_insensitive = self._get_exclusions(
+            GENE_SPEC
+        )
+        # genes always check both
+        assert gene_exclusion_case_insensitive is not None
+        gene_veto = nlp_vetoes.get(GENE_SPEC)
+        species_results = key_results[SPECIES_SPEC]
+        species_exclusion = self.entity_exclusions.excluded_species
+
+        for t in prepared:
+            token = t.token
+
+            for spec_results, exclusion, case_insensitive, veto, matches in lmdb_specs:
+                found = spec_results.get(t.key)
+                if found is None:
+                    continue
+                if case_insensitive is not None:
+                    if token.keyword in exclusion or t.lowered in case_insensitive:
+                        continue
+                elif t.lowered in exclusion:
+                    continue
+                if veto is None or t.offset_key in veto:
+                    matches.append(
+                        LMDBMatch(entities=_primary_entities(found), token=token)
+                    )
+
+            if t.word_count <= MAX_GENE_WORD_LENGTH and t.key in gene_results:
+                if not (
+                    token.keyword in gene_exclusion
+                    or t.lowered in gene_exclusion_case_insensitive
+                ):
+                    exact = [
+                        data
+                        for data in gene_results[t.key]
+                        if data['synonym'] == token.keyword
+                    ]
+                    if exact and (gene_veto is None or t.offset_key in gene_veto):
+                        results.recognized_genes.append(
+                            LMDBMatch(entities=_primary_entities(exact), token=token)
+                        )
+
+            if t.lowered not in species_exclusion:
+                if t.key in species_results:
+                    results.recognized_species.append(
                         LMDBMatch(
-                            entities=[
-                                data
-                                for data in results
-                                if data['synonym'] == data['name']
-                            ]
-                            or results,
+                            entities=_primary_entities(species_results[t.key]),
                             token=token,
                         )
                     )
-                elif token.normalized_keyword in key_results_local:
-                    results_local = key_results_local[token.normalized_keyword]
-                    lmdb_matches_local.append(
+                elif t.key in key_results_local:
+                    results.recognized_local_species.append(
                         LMDBMatch(
-                            entities=[
-                                data
-                                for data in results_local
-                                if data['synonym'] == data['name']
-                            ]
-                            or results_local,
+                            entities=_primary_entities(key_results_local[t.key]),
                             token=token,
                         )
                     )
-        return lmdb_matches, lmdb_matches_local
-
-    def check_lmdb(self, nlp_results: NLPResults, tokens: List[PDFWord]):
-        results = RecognizedEntities()
-        original_keys = {token.normalized_keyword for token in tokens}
-
-        for entity_type in [entity.value for entity in EntityType]:
-            # because an entity type can create its own set of keys
-            # need to reset for next iteration
-            keys = original_keys
-            dbname = None
-            global_inclusion = None
-            global_exclusion = None
-            global_exclusion_case_insensitive = None
-
-            if entity_type == EntityType.ANATOMY.value:
-                dbname = ANATOMY_LMDB
-                global_inclusion = self.entity_inclusions.included_anatomy
-                global_exclusion = self.entity_exclusions.excluded_anatomy
-
-            elif entity_type == EntityType.CHEMICAL.value:
-                dbname = CHEMICALS_LMDB
-                global_inclusion = self.entity_inclusions.included_chemicals
-                global_exclusion = self.entity_exclusions.excluded_chemicals
-
-            elif entity_type == EntityType.COMPOUND.value:
-                dbname = COMPOUNDS_LMDB
-                global_inclusion = self.entity_inclusions.included_compounds
-                global_exclusion = self.entity_exclusions.excluded_compounds
-
-            elif entity_type == EntityType.DISEASE.value:
-                dbname = DISEASES_LMDB
-                global_inclusion = self.entity_inclusions.included_diseases
-                global_exclusion = self.entity_exclusions.excluded_diseases
-
-            elif entity_type == EntityType.FOOD.value:
-                dbname = FOODS_LMDB
-                global_inclusion = self.entity_inclusions.included_foods
-                global_exclusion = self.entity_exclusions.excluded_foods
-                keys = {
-                    token.normalized_keyword
-                    for token in tokens
-                    if len(token.keyword.split(' ')) <= MAX_FOOD_WORD_LENGTH
-                }
 
-            elif entity_type == EntityType.GENE.value:
-                gene_matches = self._check_lmdb_genes(
-                    nlp_results=nlp_results,
-                    tokens=[
-                        token
-                        for token in tokens
-                        if len(token.keyword.split(' ')) <= MAX_GENE_WORD_LENGTH
-                    ],
-                )
-                results.recognized_genes = gene_matches
-                continue
-
-            elif entity_type == EntityType.PHENOMENA.value:
-                dbname = PHENOMENAS_LMDB
-                global_inclusion = self.entity_inclusions.included_phenomenas
-                global_exclusion = self.entity_exclusions.excluded_phenomenas
-
-            elif entity_type == EntityType.PHENOTYPE.value:
-                dbname = PHENOTYPES_LMDB
-                global_inclusion = self.entity_inclusions.included_phenotypes
-                global_exclusion = self.entity_exclusions.excluded_phenotypes
-
-            elif entity_type == EntityType.PROTEIN.value:
-                dbname = PROTEINS_LMDB
-                global_inclusion = self.entity_inclusions.included_proteins
-                global_exclusion = self.entity_exclusions.excluded_proteins
-                global_exclusion_case_insensitive = (
-                    self.entity_exclusions.excluded_proteins_case_insensitive
-                )
-
-            elif entity_type == EntityType.SPECIES.value:
-                species_matches, species_matches_local = self._check_lmdb_species(
-                    tokens=tokens
-                )
-                results.recognized_species = species_matches
-                results.recognized_local_species = species_matches_local
-                continue
-
-            # non lmdb lookups
-            elif entity_type == EntityType.COMPANY.value:
-                global_inclusion = self.entity_inclusions.included_companies
-                global_exclusion = self.entity_exclusions.excluded_companies
-                results.recognized_companies = [
-                    LMDBMatch(
-                        entities=global_inclusion[token.normalized_keyword], token=token
-                    )
-                    for token in tokens
-                    if global_inclusion.get(token.normalized_keyword)
-                    and token.keyword.lower() not in global_exclusion
-                ]
-                continue
-
-            # non lmdb lookups
-            elif entity_type == EntityType.ENTITY.value:
-                global_inclusion = self.entity_inclusions.included_entities
-                global_exclusion = self.entity_exclusions.excluded_entities
-                results.recognized_entities = [
-                    LMDBMatch(
-                        entities=global_inclusion[token.normalized_keyword], token=token
-                    )
-                    for token in tokens
-                    if global_inclusion.get(token.normalized_keyword)
-                    and token.keyword.lower() not in global_exclusion
-                ]
-                continue
-
-            # non lmdb lookups
-            elif entity_type == EntityType.LAB_SAMPLE.value:
-                global_inclusion = self.entity_inclusions.included_lab_samples
-                global_exclusion = self.entity_exclusions.excluded_lab_samples
-                results.recognized_lab_samples = [
-                    LMDBMatch(
-                        entities=global_inclusion[token.normalized_keyword], token=token
-                    )
-                    for token in tokens
-                    if global_inclusion.get(token.normalized_keyword)
-                    and token.keyword.lower() not in global_exclusion
-                ]
-                continue
-
-            # non lmdb lookups
-            elif entity_type == EntityType.LAB_STRAIN.value:
-                global_inclusion = self.entity_inclusions.included_lab_strains
-                global_exclusion = self.entity_exclusions.excluded_lab_strains
-                results.recognized_lab_strains = [
-                    LMDBMatch(
-                        entities=global_inclusion[token.normalized_keyword], token=token
-                    )
-                    for token in tokens
-                    if global_inclusion.get(token.normalized_keyword)
-                    and token.keyword.lower() not in global_exclusion
-                ]
-                continue
-
-            if (
-                dbname is not None
-                and global_inclusion is not None
-                and global_exclusion is not None
-            ):
-                key_results, unmatched_keys = self._load_species_key_results(
-                    dbname, keys, global_inclusion
-                )
-
-                lmdb_matches = []
-                for token in tokens:
-                    if token.normalized_keyword in key_results:
-                        lowered = token.keyword.lower()
-                        if global_exclusion_case_insensitive:
-                            if (
-                                token.keyword in global_exclusion
-                                or lowered in global_exclusion_case_insensitive
-                            ):
-                                continue
-                        else:
-                            if lowered in global_exclusion:
-                                continue
-
-                        match = LMDBMatch(
-                            entities=[
-                                data
-                                for data in key_results[token.normalized_keyword]
-                                if data['synonym'] == data['name']
-                            ]
-                            or key_results[token.normalized_keyword],
-                            token=token,
-                        )
-                        offset_key = (
-                            token.lo_location_offset,
-                            token.hi_location_offset,
-                        )
-                        # only a few entities currently have NLP
-                        # if an entity set in nlp_results is not empty
-                        # that means NLP was used
-                        # NLP is veto, so if not found it vetos
-                        if (
-                            entity_type == EntityType.CHEMICAL.value
-                            and nlp_results.chemicals
-                        ):
-                            if offset_key in nlp_results.chemicals:
-                                lmdb_matches.append(match)
-                        elif (
-                            entity_type == EntityType.COMPOUND.value
-                            and nlp_results.compounds
-                        ):
-                            if offset_key in nlp_results.compounds:
-                                lmdb_matches.append(match)
-                        elif (
-                            entity_type == EntityType.DISEASE.value
-                            and nlp_results.diseases
-                        ):
-                            if offset_key in nlp_results.diseases:
-                                lmdb_matches.append(match)
-                        else:
-                            lmdb_matches.append(match)
-
-                if entity_type == EntityType.ANATOMY.value:
-                    results.recognized_anatomy = lmdb_matches
-
-                elif entity_type == EntityType.CHEMICAL.value:
-                    results.recognized_chemicals = lmdb_matches
-
-                elif entity_type == EntityType.COMPOUND.value:
-                    results.recognized_compounds = lmdb_matches
-
-                elif entity_type == EntityType.DISEASE.value:
-                    results.recognized_diseases = lmdb_matches
-
-                elif entity_type == EntityType.FOOD.value:
-                    results.recognized_foods = lmdb_matches
-
-                elif entity_type == EntityType.PHENOMENA.value:
-                    results.recognized_phenomenas = lmdb_matches
-
-                elif entity_type == EntityType.PHENOTYPE.value:
-                    results.recognized_phenotypes = lmdb_matches
-
-                elif entity_type == EntityType.PROTEIN.value:
-                    results.recognized_proteins = lmdb_matches
+            for global_inclusion, global_exclusion, matches in inclusion_specs:
+                found = global_inclusion.get(t.key)
+                if found and t.lowered not in global_exclusion:
+                    matches.append(LMDBMatch(entities=found, token=token))
         return results
 
+    def check_lmdb(self, nlp_results: NLPResults, tokens: List[PDFWord]):
+        """Recognizes every entity type in a single pass over the tokens.
+
+        Each token's lookup key and lowercased form are computed once,
+        all LMDB databases are queried up front, then the inclusions,
+        exclusions and NLP vetoes are applied in one sweep.
+        """
+        prepared = self._prepare_tokens(tokens)
+        key_results, key_results_local = self._load_all_key_results(prepared)
+        return self._sweep(nlp_results, prepared, key_results, key_results_local)
+
     def identify(
         self, tokens: List[PDFWord], nlp_results: NLPResults
     ) -> RecognizedEntities:
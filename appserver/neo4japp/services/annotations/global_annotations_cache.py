@@ -0,0 +1,90 @@
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import redis
+from flask import current_app
+
+from neo4japp.constants import LogEventType
+from neo4japp.services.rcache import get_redis_cache_server
+from neo4japp.utils.logger import EventLog
+
+# bumped every time a global inclusion or exclusion changes,
+# shared by every process through redis
+GLOBAL_ANNOTATIONS_VERSION_KEY = 'annotations:globals:version'
+
+T = TypeVar('T')
+
+
+def get_global_annotations_version() -> Optional[int]:
+    """Returns the current version of the global inclusions/exclusions,
+    or None if it cannot be determined (in which case nothing is cached).
+    """
+    try:
+        version = get_redis_cache_server().get(GLOBAL_ANNOTATIONS_VERSION_KEY)
+    except redis.RedisError:
+        current_app.logger.warning(
+            'Could not read the global annotations version, skipping the cache.',
+            extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict(),
+        )
+        return None
+    return int(version) if version is not None else 0
+
+
+def bump_global_annotations_version():
+    """Invalidates the compiled globals of every process.
+
+    Must be called after the change has been committed, otherwise another
+    process could cache the old values under the new version.
+    """
+    global_annotations_cache.clear()
+    try:
+        get_redis_cache_server().incr(GLOBAL_ANNOTATIONS_VERSION_KEY)
+    except redis.RedisError:
+        current_app.logger.error(
+            'Failed to bump the global annotations version, '
+            'other processes may use outdated global inclusions/exclusions.',
+            extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict(),
+        )
+
+
+class GlobalAnnotationsCache:
+    """Process-local cache of the compiled global inclusions and exclusions.
+
+    Compiling them takes two Arango queries per entity type plus loading
+    every global exclusion from Postgres, but they only change when a user
+    adds or removes a global, so they are compiled once per version.
+
+    The cached values are shared between documents and must not be mutated,
+    local (per-file) inclusions/exclusions are layered on top of copies.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version: Optional[int] = None
+        self._values: Dict[str, Any] = {}
+
+    def get(self, name: str, load: Callable[[], T]) -> T:
+        version = get_global_annotations_version()
+        if version is None:
+            return load()
+
+        with self._lock:
+            if version != self._version:
+                self._values = {}
+                self._version = version
+            elif name in self._values:
+                return self._values[name]
+
+        value = load()
+        with self._lock:
+            if version == self._version:
+                self._values[name] = value
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._values = {}
+            self._version = None
+
+
+global_annotations_cache = GlobalAnnotationsCache()
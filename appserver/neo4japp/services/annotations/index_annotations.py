@@ -1,5 +1,4 @@
 import os
-import json
 from http import HTTPStatus
 
 import lmdb
@@ -27,7 +26,7 @@ from neo4japp.database import db
 from neo4japp.factory import create_app
 from neo4japp.models import GlobalList
 from neo4japp.services.annotations.constants import ManualAnnotationType
-
+from neo4japp.services.annotations.utils.lmdb import decode_lmdb_value
 
 es = Elasticsearch(hosts=['http://elasticsearch'], timeout=5000)
 
@@ -41,7 +40,7 @@ def process_lmdb(env, db, entity_type):
     with env.begin(db=db) as transaction:
         cursor = transaction.cursor()
         for i, (key, value) in enumerate(cursor.iternext()):
-            data = json.loads(value.decode('utf-8'))
+            data = decode_lmdb_value(value)
             yield {
                 '_id': i + 1,
                 '_index': entity_type,
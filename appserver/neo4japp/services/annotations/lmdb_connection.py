@@ -1,7 +1,10 @@
+import os
 from os import path
-from typing import Any, Dict
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import lmdb
+from cachetools import LRUCache
 from flask import current_app
 from lmdb import Environment
 
@@ -9,25 +12,133 @@ from neo4japp.constants import LogEventType
 from neo4japp.exceptions import ServerException, wrap_exceptions
 from neo4japp.utils import EventLog
 from ..common import DatabaseConnection, TransactionContext
+from .constants import LMDB_VALUE_CACHE_SIZE
+from .utils.lmdb import decode_lmdb_value
+
+
+class LMDBEnvironmentPool:
+    """Per-process pool of read-only LMDB environments.
+
+    Opening an environment mmaps the data file, so doing it on every lookup
+    is wasteful; instead each LMDB directory is opened once per process and
+    reused across requests and RQ jobs.
+
+    LMDB environments must not be used across a fork, so the pool remembers
+    the pid it was populated in and silently drops inherited handles in the
+    child (without closing them, that would affect the parent).
+
+    The data file of each directory is stat'ed on every checkout, if it was
+    replaced (e.g by `flask load-lmdb` running in another process) the
+    environment is reopened and the directory's version changes.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._pid = os.getpid()
+        self._envs: Dict[str, Environment] = {}
+        self._dbs: Dict[Tuple[str, str], Any] = {}
+        self._versions: Dict[str, Tuple[int, int]] = {}
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._envs = {}
+            self._dbs = {}
+            self._versions = {}
+            self._pid = os.getpid()
+
+    @staticmethod
+    def _file_version(dbpath: str) -> Tuple[int, int]:
+        stat = os.stat(path.join(dbpath, 'data.mdb'))
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _close(self, dbpath: str):
+        env = self._envs.pop(dbpath)
+        self._dbs = {k: v for k, v in self._dbs.items() if k[0] != dbpath}
+        env.close()
+
+    def get(self, dbpath: str, dbname: str) -> Tuple[Environment, Any, Tuple[int, int]]:
+        with self._lock:
+            self._check_pid()
+            version = self._file_version(dbpath)
+            if dbpath in self._envs and self._versions[dbpath] != version:
+                self._close(dbpath)
+
+            env = self._envs.get(dbpath)
+            if env is None:
+                env = lmdb.open(path=dbpath, readonly=True, max_dbs=2)
+                self._envs[dbpath] = env
+                self._versions[dbpath] = version
+
+            db = self._dbs.get((dbpath, dbname))
+            if db is None:
+                # see note in LMDBConnection.begin() about `dupsort`
+                db = env.open_db(key=dbname.encode('utf-8'), create=False, dupsort=True)
+                self._dbs[(dbpath, dbname)] = db
+            return env, db, version
+
+    def clear(self):
+        """Close every pooled environment, e.g after the LMDB files
+        were replaced on disk (`flask load-lmdb`)."""
+        with self._lock:
+            if self._pid == os.getpid():
+                for env in self._envs.values():
+                    env.close()
+            self._envs = {}
+            self._dbs = {}
+            self._versions = {}
+            self._pid = os.getpid()
+
+
+class LMDBValueCache:
+    """Process-wide LRU of decoded LMDB values.
+
+    Keys include the version of the LMDB file they were read from,
+    so entries of replaced files are never served and simply age out.
+    """
+
+    def __init__(self, maxsize: int):
+        self._lock = Lock()
+        self._cache: LRUCache = LRUCache(maxsize=maxsize)
+
+    def get(self, key) -> Optional[Tuple[dict, ...]]:
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key, value: Tuple[dict, ...]):
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+lmdb_environment_pool = LMDBEnvironmentPool()
+lmdb_value_cache = LMDBValueCache(LMDB_VALUE_CACHE_SIZE)
 
 
 class LMDBConnection(DatabaseConnection):
     def __init__(self, dirpath: str, **kwargs):
         self.dirpath = dirpath
-        self.dbs: Dict[str, Any] = {}
         self.configs = kwargs
 
     class _context(TransactionContext):
-        def __init__(self, env, db):
+        def __init__(self, env, db, close_env=False, version=None):
             self.db = db
             self.env: Environment = env
+            self.close_env = close_env
+            self.version = version
 
         def __enter__(self):
             self.session = self.env.begin(self.db)
             return self.session
 
         def __exit__(self, exc_type, exc_val, exc_traceback):
-            self.env.close()
+            # read transactions are cheap to abort, the pooled
+            # environment itself stays open for the next lookup
+            self.session.abort()
+            if self.close_env:
+                self.env.close()
 
     @wrap_exceptions(ServerException, title='Cannot Connect to LMDB')
     def begin(self, **kwargs):
@@ -45,10 +156,23 @@ class LMDBConnection(DatabaseConnection):
             )
 
         dbpath = path.join(self.dirpath, self.configs[dbname])
+        pooled = readonly and not create
+
+        if pooled:
+            try:
+                env, db, version = lmdb_environment_pool.get(dbpath, dbname)
+            except Exception as e:
+                current_app.logger.error(
+                    f'Failed to open LMDB database {dbname} in path {dbpath}.',
+                    extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict(),
+                )
+                raise ServerException(
+                    message=f'Encountered unexpected error connecting to LMDB.'
+                ) from e
+            return self._context(env, db, version=version)
+
         try:
-            env: Environment = lmdb.open(
-                path=dbpath, create=create, readonly=readonly, max_dbs=2
-            )
+            env = lmdb.open(path=dbpath, create=create, readonly=readonly, max_dbs=2)
         except Exception as e:
             current_app.logger.error(
                 f'Failed to open LMDB environment in path {dbpath}.',
@@ -70,15 +194,10 @@ class LMDBConnection(DatabaseConnection):
             and the transaction and cursor will point to the wrong address in
             memory and retrieve whatever is there.
             """
-            if dbname not in self.dbs:
-                db = env.open_db(
-                    key=dbname.encode('utf-8'), create=create, dupsort=True
-                )
-                self.dbs[dbname] = db
-            else:
-                db = self.dbs[dbname]
-            return self._context(env, db)
+            db = env.open_db(key=dbname.encode('utf-8'), create=create, dupsort=True)
+            return self._context(env, db, close_env=True)
         except Exception as e:
+            env.close()
             current_app.logger.error(
                 f'Failed to open LMDB database named {dbname}.',
                 extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict(),
@@ -86,3 +205,39 @@ class LMDBConnection(DatabaseConnection):
             raise ServerException(
                 message=f'Encountered unexpected error connecting to LMDB.'
             ) from e
+
+    def get_entities(self, dbname: str, keys: Iterable[str]) -> Dict[str, List[dict]]:
+        """Returns the decoded records of every key found in the database.
+
+        Decoded hits are served from and added to the process-wide
+        `lmdb_value_cache`, only the remaining keys are read from LMDB.
+        """
+        key_results: Dict[str, List[dict]] = {}
+        context = self.begin(dbname=dbname)
+        with context as txn:
+            missing = []
+            for key in keys:
+                cached = lmdb_value_cache.get((context.version, dbname, key))
+                if cached is None:
+                    missing.append(key)
+                else:
+                    key_results[key] = list(cached)
+
+            if not missing:
+                return key_results
+
+            cursor = txn.cursor()
+            for raw_key, value in cursor.getmulti(
+                [k.encode('utf-8') for k in missing], dupdata=True
+            ):
+                decoded_key = raw_key.decode('utf-8')
+                match_list = key_results.get(decoded_key, [])
+                match_list.append(decode_lmdb_value(value))
+                key_results[decoded_key] = match_list
+
+        for key in missing:
+            if key in key_results:
+                lmdb_value_cache.set(
+                    (context.version, dbname, key), tuple(key_results[key])
+                )
+        return key_results
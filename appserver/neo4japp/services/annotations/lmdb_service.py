@@ -1,5 +1,4 @@
 import csv
-import json
 from os import path
 from typing import Callable, Dict, Any
 
@@ -19,6 +18,7 @@ from .constants import (
     FOODS_LMDB,
     ANATOMY_LMDB,
     EntityType,
+    LMDBValueFormat,
 )
 from .lmdb_connection import LMDBConnection
 from .utils.lmdb import (
@@ -32,6 +32,7 @@ from .utils.lmdb import (
     create_ner_type_phenotype,
     create_ner_type_protein,
     create_ner_type_species,
+    encode_lmdb_value,
 )
 
 # reference to this directory
@@ -82,6 +83,7 @@ class LMDBService(LMDBConnection):
     def __init__(self, dirpath: str, **kwargs) -> None:
         super().__init__(dirpath, **kwargs)
         self.map_size = 1099511627776
+        self.value_format = LMDBValueFormat.JSON.value
 
     def _lmdb_open(self, file):
         return lmdb.open(
@@ -111,7 +113,7 @@ class LMDBService(LMDBConnection):
                         try:
                             transaction.put(
                                 normalize_str(synonym).encode('utf-8'),
-                                json.dumps(gene).encode('utf-8'),
+                                encode_lmdb_value(gene, self.value_format),
                             )
                         except lmdb.BadValsizeError:
                             # ignore any keys that are too large
@@ -142,7 +144,7 @@ class LMDBService(LMDBConnection):
                     try:
                         transaction.put(
                             normalize_str(entity['synonym']).encode('utf-8'),
-                            json.dumps(entity).encode('utf-8'),
+                            encode_lmdb_value(entity, self.value_format),
                         )
                     except lmdb.BadValsizeError:
                         # ignore any keys that are too large
@@ -181,7 +183,7 @@ class LMDBService(LMDBConnection):
                         try:
                             transaction.put(
                                 normalize_str(compound_name).encode('utf-8'),
-                                json.dumps(compound).encode('utf-8'),
+                                encode_lmdb_value(compound, self.value_format),
                             )
 
                             if synonyms:
@@ -197,7 +199,9 @@ class LMDBService(LMDBConnection):
 
                                         transaction.put(
                                             normalized_key.encode('utf-8'),
-                                            json.dumps(synonym).encode('utf-8'),
+                                            encode_lmdb_value(
+                                                synonym, self.value_format
+                                            ),
                                         )
                         except lmdb.BadValsizeError:
                             # ignore any keys that are too large
@@ -231,7 +235,7 @@ class LMDBService(LMDBConnection):
                         try:
                             transaction.put(
                                 normalize_str(protein_name).encode('utf-8'),
-                                json.dumps(protein).encode('utf-8'),
+                                encode_lmdb_value(protein, self.value_format),
                             )
                         except lmdb.BadValsizeError:
                             # ignore any keys that are too large
@@ -260,9 +264,11 @@ class LMDBService(LMDBConnection):
 
                         species = create_ner_type_species(
                             id=species_id,
-                            category=species_category
-                            if species_category
-                            else 'Uncategorized',
+                            category=(
+                                species_category
+                                if species_category
+                                else 'Uncategorized'
+                            ),
                             name=species_name,
                             synonym=species_name,
                         )
@@ -270,7 +276,7 @@ class LMDBService(LMDBConnection):
                         try:
                             transaction.put(
                                 normalize_str(species_name).encode('utf-8'),
-                                json.dumps(species).encode('utf-8'),
+                                encode_lmdb_value(species, self.value_format),
                             )
                         except lmdb.BadValsizeError:
                             # ignore any keys that are too large
@@ -310,7 +316,10 @@ class LMDBService(LMDBConnection):
             LMDB_ANATOMY_SOURCE, 'anatomy', ANATOMY_LMDB, create_ner_type_anatomy
         )
 
-    def create_lmdb_files(self, file_type=None):
+    def create_lmdb_files(self, file_type=None, value_format=None):
+        if value_format is not None:
+            self.value_format = LMDBValueFormat(value_format).value
+
         funcs = {
             EntityType.ANATOMY.value: self.create_lmdb_anatomy_database,
             EntityType.CHEMICAL.value: self.create_lmdb_chemicals_database,
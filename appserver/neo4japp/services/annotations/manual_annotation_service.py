@@ -6,7 +6,7 @@ from flask import current_app
 from http import HTTPStatus
 from typing import Callable, Dict, List, Tuple
 
-from neo4japp.constants import TIMEZONE, LogEventType
+from neo4japp.constants import FILE_MIME_TYPE_PDF, TIMEZONE, LogEventType
 from neo4japp.database import db
 from neo4japp.exceptions import (
     AnnotationError,
@@ -14,13 +14,15 @@ from neo4japp.exceptions import (
     wrap_exceptions,
     ServerWarning,
 )
-from neo4japp.models import Files, GlobalList, AppUser
+from neo4japp.models import Files, FileAnnotationOccurrence, GlobalList, AppUser
 from neo4japp.models.files import FileAnnotationsVersion, AnnotationChangeCause
 from neo4japp.services.arangodb import get_db, execute_arango_query
 from neo4japp.utils.logger import EventLog
 from neo4japp.utils.string import standardize_str
 
 from .exceptions import AnnotationLimitationError
+from .content_cache import get_parsed_content
+from .global_annotations_cache import bump_global_annotations_version
 from .constants import (
     ManualAnnotationType,
     MAX_ENTITY_WORD_LENGTH,
@@ -55,7 +57,6 @@ from .utils.graph_queries import (
     get_species_global_inclusion_exist_query,
     query_builder,
 )
-from .utils.parsing import parse_content
 from ...utils.globals import warn
 
 
@@ -192,7 +193,7 @@ class ManualAnnotationService:
         term = custom_annotation['meta']['allText'].strip()
 
         if annotate_all:
-            _, parsed = parse_content(file_id=file.id, exclude_references=False)
+            _, parsed = get_parsed_content(file_id=file.id, exclude_references=False)
             is_case_insensitive = custom_annotation['meta']['isCaseInsensitive']
             self.validate_term(term, custom_annotation)
 
@@ -259,6 +260,7 @@ class ManualAnnotationService:
 
             file.custom_annotations = [*inclusions, *file.custom_annotations]
 
+            self.index_file_annotations([file.id])
             db.session.commit()
         except Exception as e:
             db.session.rollback()
@@ -313,6 +315,7 @@ class ManualAnnotationService:
                 if ann['uuid'] not in removed_annotation_uuids
             ]
 
+            self.index_file_annotations([file.id])
             db.session.commit()
         except Exception as e:
             db.session.rollback()
@@ -346,6 +349,8 @@ class ManualAnnotationService:
                 'we are working on a solution. Please try again later.',
             ) from e
 
+        bump_global_annotations_version()
+
         try:
             # we need to do some cleaning up
             # a global could've been added with the wrong entity type
@@ -461,6 +466,7 @@ class ManualAnnotationService:
                 *file.excluded_annotations,
             ]
 
+            self.index_file_annotations([file.id])
             db.session.commit()
         except Exception as e:
             db.session.rollback()
@@ -499,6 +505,7 @@ class ManualAnnotationService:
             db.session.add(version)
 
             file.excluded_annotations = updated_exclusions
+            self.index_file_annotations([file.id])
             db.session.commit()
         except Exception as e:
             db.session.rollback()
@@ -538,6 +545,78 @@ class ManualAnnotationService:
         ]
         return filtered_annotations + file.custom_annotations
 
+    def get_annotation_occurrences(self, file) -> List[dict]:
+        """Returns the `FileAnnotationOccurrence` rows of a file, one per entity
+        with the text and primary name of its first annotation."""
+        occurrences: Dict[str, dict] = {}
+        for annotation in self.get_file_annotations(file):
+            meta = annotation['meta']
+            occurrence = occurrences.get(meta['id'])
+            if occurrence is not None:
+                occurrence['count'] += 1
+                continue
+            if annotation.get('keyword', None) is not None:
+                text = annotation['keyword']
+            else:
+                text = meta['allText']
+            occurrences[meta['id']] = {
+                'file_id': file.id,
+                'entity_id': meta['id'],
+                'type': meta['type'],
+                'keyword': text.strip(),
+                'primary_name': annotation.get('primaryName', '').strip(),
+                'count': 1,
+            }
+        return list(occurrences.values())
+
+    def index_file_annotations(self, file_ids: List[int]):
+        """Recomputes the annotation occurrences of the given PDFs from their
+        current annotations, custom annotations and exclusions.
+
+        Runs in the current transaction: must be called after every change
+        of these columns, before the change is committed.
+        """
+        files = (
+            db.session.query(
+                Files.id,
+                Files.annotations,
+                Files.custom_annotations,
+                Files.excluded_annotations,
+            )
+            .filter(Files.id.in_(file_ids), Files.mime_type == FILE_MIME_TYPE_PDF)
+            .all()
+        )
+        db.session.query(FileAnnotationOccurrence).filter(
+            FileAnnotationOccurrence.file_id.in_(file_ids)
+        ).delete(synchronize_session=False)
+        db.session.bulk_insert_mappings(
+            FileAnnotationOccurrence,
+            [
+                occurrence
+                for file in files
+                for occurrence in self.get_annotation_occurrences(file)
+            ],
+        )
+
+    def get_unindexed_file_ids(self) -> List[int]:
+        """Returns the ids of the annotated PDFs without annotation occurrences,
+        e.g. annotated before the table existed (see `flask index-annotation-occurrences`).
+        """
+        query = (
+            db.session.query(Files.id)
+            .filter(
+                Files.mime_type == FILE_MIME_TYPE_PDF,
+                Files.deletion_date.is_(None),
+                Files.annotations.isnot(None),
+                Files.annotations != '[]',
+                ~db.session.query(FileAnnotationOccurrence)
+                .filter(FileAnnotationOccurrence.file_id == Files.id)
+                .exists(),
+            )
+            .order_by(Files.id)
+        )
+        return [file_id for file_id, in query]
+
     # TODO: Seems like there is some unexpected behavior in saving a new global: If both the
     # entity and the synonym already exist, no global is created. This is probably "correct" in the
     # sense that the term should get annotated without the existence of the global, but it's very
@@ -746,6 +825,8 @@ class ManualAnnotationService:
                         'we are working on a solution. Please try again later.',
                     ) from e
 
+        bump_global_annotations_version()
+
     def _global_annotation_exists_in_kg(self, values: dict):
         entity_type = values['entity_type']
         mesh_params = {
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import time
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import redis
+from arango.client import ArangoClient
+from cachetools import LRUCache
+from flask import current_app
+
+from neo4japp.constants import LogEventType
+from neo4japp.services.arangodb import get_db
+from neo4japp.services.rcache import get_redis_cache_server
+from neo4japp.utils.logger import EventLog
+
+from .constants import (
+    KG_VERSION_CHECK_INTERVAL,
+    ORGANISM_MATCH_CACHE_SIZE,
+    ORGANISM_MATCH_CACHE_TTL,
+)
+
+# collections the gene/protein to organism lookups traverse, any
+# write to them (KG reload, new global inclusion...) changes the version
+KG_LOOKUP_COLLECTIONS = ('synonym', 'has_synonym', 'has_taxonomy', 'has_parent')
+
+Pair = Tuple[str, str]  # (synonym, organism id)
+
+
+class OrganismMatchCache:
+    """Cache of the KG rows matching a synonym to an organism, for the
+    gene/protein to organism lookups of `annotation_graph_service`.
+
+    Hits are served from a process-local LRU, then from redis (shared by
+    every process), and only the remaining pairs are queried in Arango.
+    Both are keyed by the version of the KG collections the lookups
+    traverse, so that a KG change invalidates every entry.
+    """
+
+    def __init__(self, maxsize: int):
+        self._lock = Lock()
+        self._cache: LRUCache = LRUCache(maxsize=maxsize)
+        self._kg_version: Optional[str] = None
+        self._kg_version_checked = 0.0
+
+    def get_kg_version(self, arango_client: ArangoClient) -> str:
+        """Returns a hash of the revisions of the looked up collections,
+        rechecked at most every `KG_VERSION_CHECK_INTERVAL` seconds."""
+        now = time.time()
+        with self._lock:
+            if (
+                self._kg_version is not None
+                and now - self._kg_version_checked < KG_VERSION_CHECK_INTERVAL
+            ):
+                return self._kg_version
+
+        db = get_db(arango_client)
+        revisions = ':'.join(
+            db.collection(name).revision() for name in KG_LOOKUP_COLLECTIONS
+        )
+        version = hashlib.sha1(revisions.encode('utf-8')).hexdigest()[:16]
+        with self._lock:
+            self._kg_version = version
+            self._kg_version_checked = now
+        return version
+
+    @staticmethod
+    def _redis_key(version: str, entity_type: str, synonym: str) -> str:
+        return f'annotations:organism_matches:{version}:{entity_type}:{synonym}'
+
+    def _log_error(self):
+        current_app.logger.warning(
+            'Organism match cache is unavailable in redis.',
+            exc_info=True,
+            extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict(),
+        )
+
+    def get_many(
+        self, version: str, entity_type: str, pairs: Iterable[Pair]
+    ) -> Dict[Pair, List[dict]]:
+        found: Dict[Pair, List[dict]] = {}
+        missing: Dict[str, List[str]] = {}
+
+        with self._lock:
+            for synonym, organism in pairs:
+                rows = self._cache.get((version, entity_type, synonym, organism))
+                if rows is None:
+                    missing.setdefault(synonym, []).append(organism)
+                else:
+                    found[(synonym, organism)] = rows
+
+        if not missing:
+            return found
+
+        try:
+            pipe = get_redis_cache_server().pipeline()
+            for synonym, organisms in missing.items():
+                pipe.hmget(self._redis_key(version, entity_type, synonym), organisms)
+            responses = pipe.execute()
+        except redis.RedisError:
+            self._log_error()
+            return found
+
+        with self._lock:
+            for (synonym, organisms), values in zip(missing.items(), responses):
+                for organism, value in zip(organisms, values):
+                    if value is not None:
+                        rows = json.loads(value)
+                        found[(synonym, organism)] = rows
+                        self._cache[(version, entity_type, synonym, organism)] = rows
+        return found
+
+    def set_many(self, version: str, entity_type: str, matches: Dict[Pair, List[dict]]):
+        by_synonym: Dict[str, Dict[str, str]] = {}
+        with self._lock:
+            for (synonym, organism), rows in matches.items():
+                self._cache[(version, entity_type, synonym, organism)] = rows
+                by_synonym.setdefault(synonym, {})[organism] = json.dumps(rows)
+
+        try:
+            pipe = get_redis_cache_server().pipeline()
+            for synonym, values in by_synonym.items():
+                key = self._redis_key(version, entity_type, synonym)
+                pipe.hset(key, mapping=values)
+                pipe.expire(key, ORGANISM_MATCH_CACHE_TTL)
+            pipe.execute()
+        except redis.RedisError:
+            self._log_error()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._kg_version = None
+
+
+organism_match_cache = OrganismMatchCache(ORGANISM_MATCH_CACHE_SIZE)
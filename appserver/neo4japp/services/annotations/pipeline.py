@@ -1,4 +1,3 @@
-import json
 import time
 
 from flask import current_app
@@ -12,9 +11,10 @@ from neo4japp.utils.logger import EventLog
 
 from .annotation_graph_service import get_entity_inclusions
 from .constants import SPECIES_LMDB
+from .content_cache import get_parsed_content
 from .data_transfer_objects import GlobalInclusions, PDFWord, SpecifiedOrganismStrain
+from .utils.lmdb import decode_lmdb_value
 from .utils.nlp import predict
-from .utils.parsing import parse_content
 
 
 class Pipeline:
@@ -73,7 +73,7 @@ class Pipeline:
                 'Cannot annotate the PDF file, the file id is missing or data is corrupted.',
             )
 
-        return parse_content(content_type, **params)
+        return get_parsed_content(content_type, **params)
 
     def get_globals(
         self, excluded_annotations: List[dict], custom_annotations: List[dict]
@@ -151,8 +151,9 @@ class Pipeline:
             extra=EventLog(event_type=LogEventType.ANNOTATION.value).to_dict(),
         )
 
-        bioc = bioc_service.read(text=self.text, file_uri=filename)
-        return bioc_service.generate_bioc_json(annotations=annotations, bioc=bioc)
+        return bioc_service.create_bioc_json(
+            text=self.text, file_uri=filename, annotations=annotations
+        )
 
     def create_fallback_organism(
         self, specified_organism_synonym: str, specified_organism_tax_id: str
@@ -165,8 +166,8 @@ class Pipeline:
             entity_synonym = normalize_str(specified_organism_synonym)
             entity_id = specified_organism_tax_id
             try:
-                with self.er_service.lmdb.begin(SPECIES_LMDB) as txn:
-                    entity_category = json.loads(
+                with self.er_service.lmdb.begin(dbname=SPECIES_LMDB) as txn:
+                    entity_category = decode_lmdb_value(
                         txn.get(entity_synonym.encode('utf-8'))
                     )['category']
             except (KeyError, TypeError, Exception):
@@ -1,19 +1,27 @@
-from typing import Dict, Tuple, Union, TypedDict, List
+from typing import Dict, Union, TypedDict, List
 
 import numpy as np
-from neo4japp.models import Files
+from neo4japp.database import db
+from neo4japp.models import Files, FileAnnotationOccurrence
+from neo4japp.models.annotations_queries import get_entity_occurrences_query
 from neo4japp.services.annotations import ManualAnnotationService
-from pandas import DataFrame, MultiIndex
-from scipy.stats import mannwhitneyu
+from pandas import DataFrame
+from scipy.stats import norm
 import pandas as pd
 
 
 # region Types
 class AnnotationMeta(TypedDict):
     id: str
+    type: str
 
 
-class Annotation(TypedDict):
+class AnnotationText(TypedDict, total=False):
+    keyword: str
+    primaryName: str
+
+
+class Annotation(AnnotationText):
     meta: AnnotationMeta
 
 
@@ -23,11 +31,51 @@ class SortedAnnotationResult(TypedDict):
 
 
 SortedAnnotationResults = Dict[str, SortedAnnotationResult]
-FileAnnotationTable = List[Tuple[str, str]]
-AnnotationLookupTable = Dict[str, Annotation]
 # endregion
 
 
+def mannwhitneyu_greater(
+    values: np.ndarray, codes: np.ndarray, sizes: np.ndarray
+) -> np.ndarray:
+    """One-sided Mann-Whitney U test of every group of a sample against the
+    rest of the sample, i.e. for each group `g` the p-value of
+    `mannwhitneyu(sample[group == g], sample[group != g], alternative='greater')`
+    (normal approximation, with tie and continuity corrections).
+
+    The whole sample is ranked once, so all the groups are tested in one pass.
+
+    :param values: the non zero values of the sample
+    :param codes: the group of each value, in `range(len(sizes))`
+    :param sizes: the size of each group, values missing from `values` are zeros
+    :return: the p-value of each group
+    """
+    n = sizes.sum()
+    # the last value stands for every zero left out of `values`
+    uniques, inverse = np.unique(np.append(values, 0), return_inverse=True)
+    frequencies = np.bincount(
+        inverse, weights=np.append(np.ones(len(values)), n - len(values))
+    )
+    # average of the ranks of the ties
+    ranks = np.cumsum(frequencies) - (frequencies - 1) / 2
+    rank_sums = (
+        np.bincount(codes, weights=ranks[inverse[:-1]], minlength=len(sizes))
+        + (sizes - np.bincount(codes, minlength=len(sizes))) * ranks[inverse[-1]]
+    )
+
+    n1 = sizes.astype(float)
+    n2 = n - n1
+    u = rank_sums - n1 * (n1 + 1) / 2
+    tie_correction = 1.0
+    if n > 1:
+        tie_correction -= (frequencies**3 - frequencies).sum() / (float(n) ** 3 - n)
+    if tie_correction == 0:
+        # every value is identical, no group is greater than the others
+        return np.ones(len(sizes))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (u - n1 * n2 / 2 - 0.5) / np.sqrt(tie_correction * n1 * n2 * (n + 1) / 12)
+    return norm.sf(z)
+
+
 class SortedAnnotation:
     id: str
 
@@ -37,18 +85,23 @@ class SortedAnnotation:
     ) -> None:
         self.annotation_service = annotation_service
 
-    def get_annotations_per_file(
-        self, files
-    ) -> Tuple[FileAnnotationTable, AnnotationLookupTable]:
-        files_annotations: FileAnnotationTable = []
-        key_map: AnnotationLookupTable = {}
-        for file in files:
-            annotations = self.annotation_service.get_file_annotations(file)
-            for annotation in annotations:
-                key = annotation['meta']['id']
-                key_map[key] = annotation
-                files_annotations.append((file.hash_id, key))
-        return files_annotations, key_map
+    @staticmethod
+    def get_file_ids(files) -> List[int]:
+        return [file.id for file in files]
+
+    @staticmethod
+    def to_results(rows) -> SortedAnnotationResults:
+        return {
+            row.entity_id: {
+                'annotation': {
+                    'meta': {'id': row.entity_id, 'type': row.type},
+                    'keyword': row.keyword,
+                    'primaryName': row.primary_name,
+                },
+                'value': row.value,
+            }
+            for row in rows
+        }
 
     def get_annotations(self, project_id: List[Files]) -> SortedAnnotationResults:
         raise NotImplementedError
@@ -58,70 +111,59 @@ class SumLogCountSA(SortedAnnotation):
     id = 'sum_log_count'
 
     def get_annotations(self, files):
-        files_annotations, key_map = self.get_annotations_per_file(files)
-        df = DataFrame(files_annotations, columns=['file_id', 'key'])
-        gdf = df.groupby(["key", "file_id"])
-        distinct_annotations = dict()
-        for key, value in np.log(gdf.size()).sum(level="key").items():
-            distinct_annotations[key] = {
-                'annotation': key_map[key],
-                'value': float(value),
-            }
-        return distinct_annotations
+        return self.to_results(
+            get_entity_occurrences_query(
+                self.get_file_ids(files),
+                db.func.sum(db.func.ln(FileAnnotationOccurrence.count)),
+            )
+        )
 
 
 class FrequencySA(SortedAnnotation):
     id = 'frequency'
 
     def get_annotations(self, files):
-        distinct_annotations = dict()
-
-        for file in files:
-            annotations = self.annotation_service.get_file_annotations(file)
-            for annotation in annotations:
-                key = annotation['meta']['id']
-                if key in distinct_annotations:
-                    distinct_annotations[key]['value'] += 1
-                else:
-                    distinct_annotations[key] = {'annotation': annotation, 'value': 1}
-
-        return distinct_annotations
+        return self.to_results(
+            get_entity_occurrences_query(
+                self.get_file_ids(files),
+                db.func.sum(FileAnnotationOccurrence.count),
+            )
+        )
 
 
 class MannWhitneyUSA(SortedAnnotation):
     id = 'mwu'
 
     def get_annotations(self, files):
-        files_annotations, key_map = self.get_annotations_per_file(files)
-
-        ds = (
-            DataFrame(files_annotations, columns=['file_id', 'key'])
-            .groupby(['file_id', 'key'])
-            .size()
+        file_ids = self.get_file_ids(files)
+        df = DataFrame(
+            db.session.query(
+                FileAnnotationOccurrence.file_id,
+                FileAnnotationOccurrence.entity_id,
+                FileAnnotationOccurrence.count,
+            )
+            .filter(FileAnnotationOccurrence.file_id.in_(file_ids))
+            .order_by(FileAnnotationOccurrence.file_id)
+            .all(),
+            columns=['file_id', 'key', 'count'],
         )
-
-        # Calc before exploding the array
-        keys = ds.index.get_level_values('key')
-        unique_keys = keys.unique()
-        unique_file_ids = ds.index.get_level_values('file_id').unique()
-
-        idx = pd.MultiIndex.from_product(
-            [unique_file_ids, unique_keys], names=['file_id', 'key']
+        annotations = self.to_results(
+            get_entity_occurrences_query(file_ids, db.func.count())
         )
-        ds = ds.reindex(idx, fill_value=0, copy=False)
 
-        key_index_values = idx.get_level_values('key')
-        distinct_annotations = dict()
-        for key in unique_keys:
-            mask = key_index_values == key
-            distinct_annotations[key] = {
-                'annotation': key_map[key],
-                'value': -np.log(
-                    mannwhitneyu(ds[mask], ds[~mask], alternative='greater').pvalue
-                ),
-            }
+        codes, keys = pd.factorize(df['key'])
+        # every key is compared over all the files with annotations,
+        # counting 0 in the files it does not occur in
+        sizes = np.full(len(keys), df['file_id'].nunique())
+        pvalues = mannwhitneyu_greater(df['count'].to_numpy(), codes, sizes)
 
-        return distinct_annotations
+        return {
+            key: {
+                'annotation': annotations[key]['annotation'],
+                'value': -np.log(pvalue),
+            }
+            for key, pvalue in zip(keys, pvalues)
+        }
 
 
 class FrequencyEnrichmentSA(SortedAnnotation):
@@ -177,18 +219,17 @@ class MannWhitneyPerRowUSA(SortedAnnotation):
                 .reset_index()
             )
 
-            gen = df.groupby(['id']).aggregate(take_first_annotation).iterrows()
-            ids = df['id']
-            values = df[0]
-            for key, annotation in gen:
-                mask = ids == key
+            annotations = df.groupby(['id']).aggregate(take_first_annotation)
+            codes = annotations.index.get_indexer(df['id'])
+            pvalues = mannwhitneyu_greater(
+                df[0].to_numpy(),
+                codes,
+                np.bincount(codes, minlength=len(annotations)),
+            )
+            for (key, annotation), pvalue in zip(annotations.iterrows(), pvalues):
                 distinct_annotations[key] = {
                     'annotation': annotation,
-                    'value': -np.log(
-                        mannwhitneyu(
-                            values[mask], values[~mask], alternative='greater'
-                        ).pvalue
-                    ),
+                    'value': -np.log(pvalue),
                 }
 
         return distinct_annotations
@@ -7,12 +7,13 @@ from .constants import (
     ABBREVIATION_WORD_LENGTH,
     COMMON_WORDS,
     MAX_ENTITY_WORD_LENGTH,
-    PDF_NEW_LINE_THRESHOLD,
     WORD_CHECK_REGEX,
     MIN_ENTITY_LENGTH,
 )
 from .data_transfer_objects import PDFWord
 
+NORMALIZE_TABLE = str.maketrans('', '', punctuation + whitespace)
+
 
 class Tokenizer:
     def __init__(self) -> None:
@@ -65,125 +66,38 @@ class Tokenizer:
         return False
 
     def _create(self, words: List[PDFWord]) -> List[PDFWord]:
-        prev_token = None
+        prev_keyword = None
         new_tokens = []
+        first = words[0]
 
         for word in words:
-            if prev_token is None:
-                # copied from def normalize_str
-                # to avoid function calls, ~7-10 sec faster
-                normalized = word.keyword.lower()
-                normalized = normalized.translate(str.maketrans('', '', punctuation))
-                normalized_keyword = normalized.translate(
-                    str.maketrans('', '', whitespace)
-                )
-                new_token = PDFWord(
-                    keyword=word.keyword,
-                    normalized_keyword=normalized_keyword,
-                    page_number=word.page_number,
-                    lo_location_offset=word.lo_location_offset,
-                    hi_location_offset=word.hi_location_offset,
-                    coordinates=word.coordinates,
-                    heights=word.heights,
-                    widths=word.widths,
-                    previous_words=word.previous_words,
-                )
-                new_tokens.append(new_token)
-                prev_token = new_token
+            if prev_keyword is None:
+                curr_keyword = word.keyword
             else:
-                words_subset = [prev_token, word]
-                curr_keyword = ' '.join([word.keyword for word in words_subset])
-                coordinates = []
-                heights = []
-                widths = []
-
-                start_lower_x = 0.0
-                start_lower_y = 0.0
-                end_upper_x = 0.0
-                end_upper_y = 0.0
-                prev_height = 0.0
-                for word in words_subset:
-                    # when combining sequential words
-                    # need to merge their coordinates together
-                    # while also keeping in mind words on new lines
-                    for j, coords in enumerate(word.coordinates):
-                        lower_x, lower_y, upper_x, upper_y = coords
-
-                        if (
-                            start_lower_x == 0.0
-                            and start_lower_y == 0.0
-                            and end_upper_x == 0.0
-                            and end_upper_y == 0.0
-                        ):
-                            start_lower_x = lower_x
-                            start_lower_y = lower_y
-                            end_upper_x = upper_x
-                            end_upper_y = upper_y
-                            prev_height = word.heights[j]
-                        else:
-                            if lower_y != start_lower_y:
-                                diff = abs(lower_y - start_lower_y)
-
-                                # if diff is greater than height ratio
-                                # then part of keyword is on a new line
-                                if diff > prev_height * PDF_NEW_LINE_THRESHOLD:
-                                    coordinates.append(
-                                        [
-                                            start_lower_x,
-                                            start_lower_y,
-                                            end_upper_x,
-                                            end_upper_y,
-                                        ]
-                                    )
-
-                                    start_lower_x = lower_x
-                                    start_lower_y = lower_y
-                                    end_upper_x = upper_x
-                                    end_upper_y = upper_y
-                                    prev_height = word.heights[j]
-                                else:
-                                    if upper_y > end_upper_y:
-                                        end_upper_y = upper_y
-
-                                    if upper_x > end_upper_x:
-                                        end_upper_x = upper_x
-                            else:
-                                if upper_y > end_upper_y:
-                                    end_upper_y = upper_y
-
-                                if upper_x > end_upper_x:
-                                    end_upper_x = upper_x
-
-                    heights += word.heights
-                    widths += word.widths
-                coordinates.append(
-                    [start_lower_x, start_lower_y, end_upper_x, end_upper_y]
-                )
-
-                # copied from def normalize_str
-                # to avoid function calls, ~7-10 sec faster
-                normalized = curr_keyword.lower()
-                normalized = normalized.translate(str.maketrans('', '', punctuation))
-                normalized_keyword = normalized.translate(
-                    str.maketrans('', '', whitespace)
-                )
-                new_token = PDFWord(
+                curr_keyword = prev_keyword + ' ' + word.keyword
+
+            # copied from def normalize_str
+            # to avoid function calls, ~7-10 sec faster
+            normalized_keyword = curr_keyword.lower().translate(NORMALIZE_TABLE)
+            # the token is a view over the words so far, its
+            # coordinates are only merged if it is ever used
+            new_tokens.append(
+                PDFWord(
                     keyword=curr_keyword,
                     normalized_keyword=normalized_keyword,
                     # take the page of the first word
                     # if multi-word, consider it as part
                     # of page of first word
-                    page_number=words_subset[0].page_number,
-                    lo_location_offset=words_subset[0].lo_location_offset,
-                    hi_location_offset=words_subset[-1].hi_location_offset,
-                    coordinates=coordinates,
-                    heights=heights,
-                    widths=widths,
-                    previous_words=words_subset[0].previous_words,
+                    page_number=first.page_number,
+                    lo_location_offset=first.lo_location_offset,
+                    hi_location_offset=word.hi_location_offset,
+                    previous_words=first.previous_words,
+                    rects=first.rects,
+                    word_lo=first.word_lo,
+                    word_hi=word.word_hi,
                 )
-
-                new_tokens.append(new_token)
-                prev_token = new_token
+            )
+            prev_keyword = curr_keyword
 
         # remove any keywords that fit the removal
         # criteria at the end here, e.g common words, digits, ascii_letters etc
@@ -74,74 +74,49 @@ def get_organisms_from_gene_ids_query():
     """
 
 
-def get_gene_to_organism_query():
+def get_gene_to_organism_levels_query():
+    """Returns every organism of @organisms each gene belongs to, along
+    with how far up the taxonomy of the gene it is (0 for its own taxonomy,
+    1 for its parent and 2 for its grandparent).
+    """
     return """
     FOR s IN synonym
         FILTER s.name IN @genes
-        FOR gene, synonym_rel IN INBOUND s has_synonym
+        FOR gene IN INBOUND s has_synonym
             FILTER 'Gene' IN gene.labels
-            LET t = FIRST(
-                FOR t IN OUTBOUND gene has_taxonomy
-                    FILTER t.eid IN @organisms
-                    RETURN t.eid
-            )
-            LET t_parent = FIRST(
-                FOR temp_t IN OUTBOUND gene has_taxonomy
-                    FOR parent IN OUTBOUND temp_t has_parent
-                        FILTER parent.eid IN @organisms
-                        RETURN parent.eid
-            )
-            LET t_grandparent = FIRST(
-                FOR temp_t IN OUTBOUND gene has_taxonomy
-                    FOR temp_parent IN OUTBOUND temp_t has_parent
-                        FOR grand_parent IN OUTBOUND temp_parent has_parent
-                            FILTER grand_parent.eid IN @organisms
-                            RETURN grand_parent.eid
-            )
-            LET organism_to_use = FIRST([t, t_parent, t_grandparent][* FILTER CURRENT != null])
-            FILTER organism_to_use != null
-            RETURN DISTINCT {
-                'gene_name': gene.name,
-                'gene_synonym': s.name,
-                'gene_id': gene.eid,
-                'organism_id': organism_to_use,
-                'data_source': gene.data_source
-            }
+            FOR t IN OUTBOUND gene has_taxonomy
+                FOR organism, parent_rel, path IN 0..2 OUTBOUND t has_parent
+                    FILTER organism.eid IN @organisms
+                    RETURN DISTINCT {
+                        'gene_name': gene.name,
+                        'gene_synonym': s.name,
+                        'gene_id': gene.eid,
+                        'organism_id': organism.eid,
+                        'data_source': gene.data_source,
+                        'level': LENGTH(path.edges)
+                    }
     """
 
 
-def get_protein_to_organism_query():
+def get_protein_to_organism_levels_query():
+    """Returns every organism of @organisms each protein belongs to, along
+    with how far up the taxonomy of the protein it is (0 for its own taxonomy,
+    1 for its parent and 2 for its grandparent).
+    """
     return """
     FOR s IN synonym
         FILTER s.name IN @proteins
         FOR protein IN INBOUND s has_synonym OPTIONS {vertexCollections: 'uniprot'}
             FILTER 'Protein' IN protein.labels
-            LET t = FIRST(
-                FOR t IN OUTBOUND protein has_taxonomy
-                    FILTER t.eid IN @organisms
-                    RETURN t.eid
-            )
-            LET t_parent = FIRST(
-                FOR temp_t IN OUTBOUND protein has_taxonomy
-                    FOR parent IN OUTBOUND temp_t has_parent
-                        FILTER parent.eid IN @organisms
-                        RETURN parent.eid
-            )
-            LET t_grandparent = FIRST(
-                FOR temp_t IN OUTBOUND protein has_taxonomy
-                    FOR temp_parent IN OUTBOUND temp_t has_parent
-                        FOR grand_parent IN OUTBOUND temp_parent has_parent
-                            FILTER grand_parent.eid IN @organisms
-                            RETURN grand_parent.eid
-            )
-            LET organism_to_use = FIRST([t, t_parent, t_grandparent][* FILTER CURRENT != null])
-            FILTER organism_to_use != null
-            COLLECT organism = organism_to_use, protein_name = s.name INTO protein_ids
-            RETURN {
-                'protein': protein_name,
-                'protein_ids': protein_ids[*].protein.eid,
-                'organism_id': organism,
-            }
+            FOR t IN OUTBOUND protein has_taxonomy
+                FOR organism, parent_rel, path IN 0..2 OUTBOUND t has_parent
+                    FILTER organism.eid IN @organisms
+                    RETURN DISTINCT {
+                        'protein': s.name,
+                        'protein_id': protein.eid,
+                        'organism_id': organism.eid,
+                        'level': LENGTH(path.edges)
+                    }
     """
 
 
@@ -1,64 +1,192 @@
-import multiprocessing as mp
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
-from typing import Dict, Set
+from threading import Lock
+from typing import Dict, List, Optional, Set, Tuple
 
 import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
 
 from neo4japp.exceptions import ServerException
 from neo4japp.utils.globals import config
-from ..constants import EntityType
+from ..constants import (
+    EntityType,
+    NLP_CONNECT_TIMEOUT,
+    NLP_MAX_CHUNK_SIZE,
+    NLP_MAX_CONCURRENCY,
+    NLP_MODEL_TIMEOUTS,
+)
+from ..content_cache import hash_text, nlp_cache
 from ..data_transfer_objects import NLPResults
 
+# end of a sentence, or of a line
+_SENTENCE_END = re.compile(r'[.!?]\s+|\n\s*')
 
-def _call_nlp_service(model: str, text: str) -> dict:
-    try:
-        req = requests.post(
-            config.get('NLP_SERVICE_ENDPOINT'),
-            json={'model': model, 'sentence': text},
-            headers={'secret': config.get('NLP_SERVICE_SECRET')},
-            timeout=config.get('REQUEST_TIMEOUT'),
-        )
-        req.raise_for_status()
-        return req.json()
-
-    # Got a non-2xx response
-    except requests.exceptions.HTTPError as e:
-        raise ServerException(
-            'NLP Service Error',
-            'An unexpected error occurred with the NLP service.',
-            additional_msgs=(
-                f'Status: {e.response.status_code}, Body: {e.response.text}',
-            ),
-            code=e.response.status_code,
-        ) from e
-
-    # Timeout either when connecting or reading response
-    except requests.exceptions.Timeout as e:
-        raise ServerException(
-            'NLP Service timeout',
-            'Request to NLP service timed out.',
-            code=HTTPStatus.GATEWAY_TIMEOUT,
-        ) from e
-
-    # Could not decode JSON response
-    except ValueError as e:
-        raise ServerException(
-            'NLP Service Error', 'Error while parsing JSON response from NLP Service'
-        ) from e
-
-    # Other request errors
-    except requests.exceptions.RequestException as e:
-        raise ServerException(
-            'NLP Service Error',
-            'An unexpected error occurred with the NLP service.',
-            code=HTTPStatus.SERVICE_UNAVAILABLE,
-        ) from e
+
+class NLPClient:
+    """Per-process client of the NLP service.
+
+    Requests go through a single keep-alive session, and are sent
+    concurrently from a bounded pool of threads (with the app context
+    of the caller pushed, so config and logging keep working).
+
+    Neither sockets nor threads survive a fork, so both are recreated
+    when used from a new process.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self._lock = Lock()
+        self._max_concurrency = max_concurrency
+        self._pid: Optional[int] = None
+        self._session: Optional[requests.Session] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _check_pid(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self._max_concurrency
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_concurrency, thread_name_prefix='nlp'
+                )
+                self._pid = os.getpid()
+
+    def post(self, model: str, text: str) -> dict:
+        self._check_pid()
+        try:
+            req = self._session.post(  # type: ignore
+                config.get('NLP_SERVICE_ENDPOINT'),
+                json={'model': model, 'sentence': text},
+                headers={'secret': config.get('NLP_SERVICE_SECRET')},
+                timeout=(
+                    NLP_CONNECT_TIMEOUT,
+                    NLP_MODEL_TIMEOUTS.get(model, config.get('REQUEST_TIMEOUT')),
+                ),
+            )
+            req.raise_for_status()
+            return req.json()
+
+        # Got a non-2xx response
+        except requests.exceptions.HTTPError as e:
+            raise ServerException(
+                'NLP Service Error',
+                'An unexpected error occurred with the NLP service.',
+                additional_msgs=(
+                    f'Status: {e.response.status_code}, Body: {e.response.text}',
+                ),
+                code=e.response.status_code,
+            ) from e
+
+        # Timeout either when connecting or reading response
+        except requests.exceptions.Timeout as e:
+            raise ServerException(
+                'NLP Service timeout',
+                'Request to NLP service timed out.',
+                code=HTTPStatus.GATEWAY_TIMEOUT,
+            ) from e
+
+        # Could not decode JSON response
+        except ValueError as e:
+            raise ServerException(
+                'NLP Service Error',
+                'Error while parsing JSON response from NLP Service',
+            ) from e
+
+        # Other request errors
+        except requests.exceptions.RequestException as e:
+            raise ServerException(
+                'NLP Service Error',
+                'An unexpected error occurred with the NLP service.',
+                code=HTTPStatus.SERVICE_UNAVAILABLE,
+            ) from e
+
+    def post_all(self, calls: List[Tuple[str, str]]) -> List[dict]:
+        """Sends the (model, text) calls concurrently,
+        returns the responses in the same order."""
+        if len(calls) == 1:
+            return [self.post(*calls[0])]
+
+        self._check_pid()
+        app = current_app._get_current_object()
+
+        def post(call: Tuple[str, str]) -> dict:
+            with app.app_context():
+                return self.post(*call)
+
+        futures = [self._executor.submit(post, call) for call in calls]  # type: ignore
+        return [future.result() for future in futures]
+
+
+nlp_client = NLPClient(NLP_MAX_CONCURRENCY)
+
+
+def split_text(text: str, max_size: int) -> List[Tuple[int, str]]:
+    """Splits the text in windows of at most `max_size` characters, each
+    paired with its offset in the text.
+
+    Windows end after the last sentence (or line) ending in them, so that
+    entities are not cut in two; on the last whitespace if a sentence is
+    longer than a window.
+    """
+    windows = []
+    start = 0
+    while len(text) - start > max_size:
+        end = start + max_size
+        cut = start
+        for match in _SENTENCE_END.finditer(text, start, end):
+            cut = match.end()
+        if cut == start:
+            cut = text.rfind(' ', start, end) + 1
+        if cut <= start:
+            cut = end
+        windows.append((start, text[start:cut]))
+        start = cut
+    windows.append((start, text[start:]))
+    return windows
+
+
+def _predict_models(
+    models: List[str], text: str
+) -> Dict[str, List[Tuple[str, List[Tuple[int, int]]]]]:
+    """Runs the models over the text, long texts are split in windows all
+    sent in parallel, and the offsets found merged back by model."""
+    if not models:
+        return {}
+
+    windows = split_text(text, NLP_MAX_CHUNK_SIZE)
+    calls = [(model, window) for model in models for _, window in windows]
+    responses = iter(nlp_client.post_all(calls))
+
+    results = {}
+    for model in models:
+        offsets: Dict[str, List[Tuple[int, int]]] = {}
+        for window_offset, _ in windows:
+            for model_results in next(responses)['results']:
+                offsets.setdefault(model_results['model'], []).extend(
+                    (
+                        window_offset + token['start_pos'],
+                        window_offset + token['end_pos'] - 1,
+                    )
+                    for token in model_results['annotations']
+                )
+        results[model] = list(offsets.items())
+    return results
 
 
 def predict(text: str, entities: Set[str]):
     """
     Makes a call to the NLP service.
     Returns the set of entity types in which the token was found.
+
+    The results of each model are cached by the hash of the text,
+    so the same text is only ever sent once to a model.
     """
     if not entities:
         return NLPResults()
@@ -91,25 +219,28 @@ def predict(text: str, entities: Set[str]):
         EntityType.SPECIES.value: set(),
     }
 
-    models = []
     if all([model in entities for model in nlp_models]):
-        models.append(_call_nlp_service(model='all', text=text))
+        units = ['all']
     else:
-        with mp.Pool(processes=4) as pool:
-            models = pool.starmap(
-                _call_nlp_service,
-                [
-                    (nlp_models[model], text)
-                    for model in entities
-                    if nlp_models.get(model)
-                ],
-            )
+        units = [nlp_models[model] for model in entities if nlp_models.get(model)]
 
-    for model in models:
-        for results in model['results']:
-            for token in results['annotations']:
-                token_offset = (token['start_pos'], token['end_pos'] - 1)
-                entity_results[nlp_model_types[results['model']]].add(token_offset)
+    # the offsets found by each model, for each model (or 'all') requested
+    text_hash = hash_text(text)
+    cached = {unit: nlp_cache.get(f'{unit}:{text_hash}') for unit in units}
+    unit_results = {
+        unit: results for unit, results in cached.items() if results is not None
+    }
+
+    predicted = _predict_models(
+        [unit for unit in units if unit not in unit_results], text
+    )
+    for unit, results in predicted.items():
+        nlp_cache.set(f'{unit}:{text_hash}', results)
+    unit_results.update(predicted)
+
+    for results in unit_results.values():
+        for model, offsets in results:
+            entity_results[nlp_model_types[model]].update(offsets)
 
     return NLPResults(
         anatomy=entity_results[EntityType.ANATOMY.value],
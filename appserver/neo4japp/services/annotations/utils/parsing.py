@@ -1,58 +1,68 @@
 import requests
 
 from string import punctuation
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 
 from neo4japp.utils.globals import config
-from ..constants import MAX_ABBREVIATION_WORD_LENGTH
-from ..data_transfer_objects import PDFWord
+from neo4japp.utils.json_stream import iter_json_array
+from ..constants import MAX_ABBREVIATION_WORD_LENGTH, PARSER_STREAM_CHUNK_SIZE
+from ..data_transfer_objects import PDFWord, PDFWordRects
 
 from neo4japp.constants import FILE_MIME_TYPE_PDF
 from neo4japp.exceptions import ServerException
 
 
-def process_parsed_content(resp: dict) -> Tuple[str, List[PDFWord]]:
-    parsed = []
-    pdf_text = ''
-
-    for page in resp['pages']:
-        prev_words: List[str] = []
-        pdf_text += page['pageText']
-        for token in page['tokens']:
-            # for now ignore any rotated words
-            if token['text'] not in punctuation and all(
-                [rect['rotation'] == 0 for rect in token['rects']]
-            ):
-                token_len = len(token['text'])
-                offset = token['pgIdx']
-                pdf_word = PDFWord(
-                    keyword=token['text'],
-                    normalized_keyword=token['text'],  # don't need to normalize yet
-                    page_number=page['pageNo'],
-                    lo_location_offset=offset,
-                    hi_location_offset=offset
-                    if token_len == 1
-                    else offset + token_len - 1,
-                    heights=[rect['height'] for rect in token['rects']],
-                    widths=[rect['width'] for rect in token['rects']],
-                    coordinates=[
-                        [
-                            rect['lowerLeftPt']['x'],
-                            rect['lowerLeftPt']['y'],
-                            rect['lowerLeftPt']['x'] + rect['width'],
-                            rect['lowerLeftPt']['y'] + rect['height'],
-                        ]
-                        for rect in token['rects']
-                    ],
-                    previous_words=' '.join(prev_words[-MAX_ABBREVIATION_WORD_LENGTH:])
-                    if token['possibleAbbrev']
-                    else '',
+def process_parsed_page(page: dict, rects: PDFWordRects) -> Iterator[PDFWord]:
+    prev_words: List[str] = []
+    for token in page['tokens']:
+        # for now ignore any rotated words
+        if token['text'] not in punctuation and all(
+            [rect['rotation'] == 0 for rect in token['rects']]
+        ):
+            token_len = len(token['text'])
+            offset = token['pgIdx']
+            word_idx = rects.add_word(
+                (
+                    rect['lowerLeftPt']['x'],
+                    rect['lowerLeftPt']['y'],
+                    rect['width'],
+                    rect['height'],
                 )
-                parsed.append(pdf_word)
-                prev_words.append(token['text'])
-                if len(prev_words) > MAX_ABBREVIATION_WORD_LENGTH:
-                    prev_words = prev_words[1:]
-    return pdf_text, parsed
+                for rect in token['rects']
+            )
+            yield PDFWord(
+                keyword=token['text'],
+                normalized_keyword=token['text'],  # don't need to normalize yet
+                page_number=page['pageNo'],
+                lo_location_offset=offset,
+                hi_location_offset=offset if token_len == 1 else offset + token_len - 1,
+                previous_words=' '.join(prev_words[-MAX_ABBREVIATION_WORD_LENGTH:])
+                if token['possibleAbbrev']
+                else '',
+                rects=rects,
+                word_lo=word_idx,
+                word_hi=word_idx + 1,
+            )
+            prev_words.append(token['text'])
+            if len(prev_words) > MAX_ABBREVIATION_WORD_LENGTH:
+                prev_words = prev_words[1:]
+
+
+def process_parsed_pages(pages: Iterable[dict]) -> Tuple[str, List[PDFWord]]:
+    """Processes the parser pages one at a time, so `pages` can be
+    a generator and only one page is ever held in memory."""
+    parsed: List[PDFWord] = []
+    page_texts = []
+    rects = PDFWordRects()
+
+    for page in pages:
+        page_texts.append(page['pageText'])
+        parsed.extend(process_parsed_page(page, rects))
+    return ''.join(page_texts), parsed
+
+
+def process_parsed_content(resp: dict) -> Tuple[str, List[PDFWord]]:
+    return process_parsed_pages(resp['pages'])
 
 
 def parse_content(
@@ -83,6 +93,16 @@ def parse_content(
         url=url, data=data, timeout=config.get('REQUEST_TIMEOUT')
     )
     try:
+        if config.get('PARSER_STREAM_RESPONSE'):
+            # decode the pages as they arrive instead of loading
+            # the whole response, they can be hundreds of MB
+            with requests.post(**request_args, stream=True) as req:
+                req.raise_for_status()
+                return process_parsed_pages(
+                    iter_json_array(
+                        req.iter_content(chunk_size=PARSER_STREAM_CHUNK_SIZE), 'pages'
+                    )
+                )
         req = requests.post(**request_args)
         resp = req.json()
         req.close()
@@ -16,5 +16,33 @@ ELASTIC_PIPELINE_SEED_PAIRS = [
     (ATTACHMENT_PIPELINE_ID, ATTACHMENT_PIPELINE_DEFINITION_PATH),
 ]
 
+# bumped whenever the extraction of the indexed text changes, to reindex unchanged files
+INDEXED_TEXT_FORMAT_VERSION = 1
+# number of files whose index state is fetched at once when indexing
+INDEX_STATE_CHECK_SIZE = 50
+
 # Search constants
 WILDCARD_MIN_LEN = 3
+
+# Index change journal
+ELASTIC_JOURNAL_KEY_PREFIX = 'elastic_journal'
+# changes recorded within this many seconds are indexed together
+ELASTIC_JOURNAL_WINDOW = 10
+# number of changes of each kind applied per bulk request
+ELASTIC_JOURNAL_BATCH_SIZE = 500
+# a scheduled job lost with its worker is rescheduled after this many seconds
+ELASTIC_JOURNAL_SCHEDULE_TTL = 60 * 10
+ELASTIC_JOURNAL_JOB_MAX_RETRY = 5
+
+# Full reindex
+ELASTIC_REINDEX_KEY_PREFIX = 'elastic_reindex'
+# number of files queried at once by a reindex worker
+ELASTIC_REINDEX_WINDOW = 200
+# maximum size of a bulk request
+ELASTIC_REINDEX_CHUNK_BYTES = 10 * 1024 * 1024
+# number of bulk requests in flight per reindex worker
+ELASTIC_REINDEX_THREADS = 4
+# number of files indexed between two checkpoints of a reindex worker
+ELASTIC_REINDEX_CHECKPOINT_SIZE = 100
+# timeout of the copy of the documents of the file index to an index with a new mapping
+ELASTIC_INDEX_COPY_TIMEOUT = 60 * 60 * 2
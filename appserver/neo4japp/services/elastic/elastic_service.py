@@ -1,7 +1,14 @@
 import base64
+import hashlib
 import json
+from collections import deque
+from datetime import datetime, timedelta
+from itertools import chain
 
-from elasticsearch.exceptions import RequestError as ElasticRequestError
+from elasticsearch.exceptions import (
+    NotFoundError as ElasticNotFoundError,
+    RequestError as ElasticRequestError,
+)
 from elasticsearch.helpers import parallel_bulk, streaming_bulk
 from flask import current_app
 from pyparsing import (
@@ -15,22 +22,47 @@ from pyparsing import (
     opAssoc,
     printables,
 )
-from sqlalchemy import and_
+from sqlalchemy import and_, literal, or_, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import joinedload, raiseload
-from typing import Any, Dict, List
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional as TypingOptional,
+    Sequence,
+)
 
 from app import app
-from neo4japp.constants import LogEventType
-from neo4japp.database import get_file_type_service, ElasticConnection
+from neo4japp.constants import FILE_MIME_TYPE_PDF, LogEventType
+from neo4japp.database import (
+    db,
+    get_file_type_service,
+    get_redis_connection,
+    ElasticConnection,
+)
 from neo4japp.exceptions import ServerException, wrap_exceptions
 from neo4japp.models import (
+    FileIndexState,
     Files,
     Projects,
 )
 from neo4japp.models.files_queries import build_file_hierarchy_query
 from neo4japp.services.elastic import (
     ATTACHMENT_PIPELINE_ID,
+    ELASTIC_INDEX_COPY_TIMEOUT,
+    ELASTIC_JOURNAL_WINDOW,
     ELASTIC_PIPELINE_SEED_PAIRS,
+    ELASTIC_REINDEX_CHECKPOINT_SIZE,
+    ELASTIC_REINDEX_CHUNK_BYTES,
+    ELASTIC_REINDEX_THREADS,
+    ELASTIC_REINDEX_WINDOW,
+    INDEXED_TEXT_FORMAT_VERSION,
+    INDEX_STATE_CHECK_SIZE,
 )
 from neo4japp.services.elastic.query_parser_helpers import (
     BoolMust,
@@ -38,7 +70,7 @@ from neo4japp.services.elastic.query_parser_helpers import (
     BoolOperand,
     BoolShould,
 )
-from neo4japp.utils import EventLog
+from neo4japp.utils import EventLog, chunked
 from neo4japp.utils.file_content_buffer import FileContentBuffer
 from neo4japp.utils.globals import config
 
@@ -60,7 +92,10 @@ class ElasticService(ElasticConnection):
             # the index. So to prevent this from happening, we just trash the index and re-create
             # it.
             try:
-                self.elastic_client.indices.delete(index=index_id)
+                # The index may be an alias, pointing to the index built by `reindex-files`
+                index_names = list(self.elastic_client.indices.get(index=index_id))
+                self.elastic_client.indices.delete(index=index_names)
+                self._delete_index_states(index_names)
                 current_app.logger.info(
                     f'Deleted ElasticSearch index {index_id}',
                     extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict(),
@@ -96,6 +131,145 @@ class ElasticService(ElasticConnection):
         # which index was actually re-created.
         self.reindex_all_documents()
 
+    def get_new_file_index_id(self) -> str:
+        """Returns a name for a new index to replace the file index with."""
+        return (
+            f'{config.get("ELASTIC_FILE_INDEX_ID")}-'
+            f'{datetime.now().strftime("%Y%m%d%H%M%S")}'
+        )
+
+    def create_file_index(self, index_id: str, index_mapping_file: str = None):
+        """Creates an index with the mapping of the file index, to be filled by a full
+        reindex. Refreshes are disabled until it is made the file index."""
+        index_mapping_file = index_mapping_file or self._get_file_index_mapping_file()
+        with open(index_mapping_file) as f:
+            index_definition = json.load(f)
+        index_definition.setdefault('settings', {})['refresh_interval'] = '-1'
+        self.elastic_client.indices.create(
+            index=index_id, body=index_definition, include_type_name=True
+        )
+        current_app.logger.info(
+            f'Created ElasticSearch index {index_id}',
+            extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict(),
+        )
+
+    def swap_file_index(self, index_id: str):
+        """Atomically makes the given index the file index of the environment, by pointing
+        the `ELASTIC_FILE_INDEX_ID` alias to it. The previous index is deleted."""
+        alias = config.get('ELASTIC_FILE_INDEX_ID')
+        self.elastic_client.indices.put_settings(
+            index=index_id, body={'index': {'refresh_interval': None}}
+        )
+        self.elastic_client.indices.refresh(index=index_id)
+
+        actions: List[dict] = [{'add': {'index': index_id, 'alias': alias}}]
+        previous: List[str] = []
+        removed: List[str] = []
+        if self.elastic_client.indices.exists_alias(name=alias):
+            previous = list(self.elastic_client.indices.get_alias(name=alias))
+            actions += [
+                {'remove': {'index': previous_id, 'alias': alias}}
+                for previous_id in previous
+            ]
+        elif self.elastic_client.indices.exists(index=alias):
+            # The file index was created before it was an alias
+            actions.append({'remove_index': {'index': alias}})
+            removed = [alias]
+        self.elastic_client.indices.update_aliases(body={'actions': actions})
+        current_app.logger.info(
+            f'ElasticSearch index {index_id} is now the file index {alias}',
+            extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict(),
+        )
+
+        for previous_id in previous:
+            if previous_id != index_id:
+                self.elastic_client.indices.delete(index=previous_id)
+                removed.append(previous_id)
+        self._delete_index_states(removed)
+
+    def copy_file_index(self, index_mapping_file: str = None):
+        """Replaces the file index by an index with the given mapping, to which its
+        documents are copied by elastic. Their content is neither read nor extracted again.
+        """
+        alias = config.get('ELASTIC_FILE_INDEX_ID')
+        previous_name = self._get_index_name(alias)
+        index_id = self.get_new_file_index_id()
+        self.create_file_index(index_id, index_mapping_file)
+
+        # The states are copied first, so that a document changed while the documents are
+        # copied is out of date in the new index rather than wrongly up to date
+        columns = ['file_id', 'content_checksum', 'content_format', 'indexed_at']
+        db.session.execute(
+            FileIndexState.__table__.insert().from_select(
+                columns + ['index_name', 'mapping_version'],
+                select(
+                    [FileIndexState.__table__.c[column] for column in columns]
+                    + [literal(index_id), literal(self._get_mapping_version())]
+                ).where(FileIndexState.index_name == previous_name),
+            )
+        )
+        db.session.commit()
+
+        # Import what we need, when we need it (Helps to avoid circular dependencies)
+        from neo4japp.services.elastic.reindex import ReindexProgress
+
+        # Files changed while the documents are copied get their document written to the
+        # new index as well, which their copy does not overwrite
+        progress = ReindexProgress(get_redis_connection())
+        progress.start_building(index_id)
+        # changes are applied up to the journal window after they are made
+        started = datetime.now() - timedelta(seconds=ELASTIC_JOURNAL_WINDOW)
+        try:
+            response = self.elastic_client.reindex(
+                body={
+                    'conflicts': 'proceed',
+                    'source': {'index': previous_name},
+                    'dest': {'index': index_id, 'op_type': 'create'},
+                },
+                wait_for_completion=True,
+                request_timeout=ELASTIC_INDEX_COPY_TIMEOUT,
+            )
+            failed = [failure['id'] for failure in response['failures']]
+            if failed:
+                current_app.logger.warning(
+                    f'Failed to copy {len(failed)} documents to ElasticSearch index '
+                    f'{index_id}',
+                    extra=EventLog(
+                        event_type=LogEventType.ELASTIC_FAILURE.value
+                    ).to_dict(),
+                )
+                self._delete_index_states([index_id], failed)
+            current_app.logger.info(
+                f'Copied {response["created"]} documents of ElasticSearch index '
+                f'{previous_name} to {index_id}',
+                extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict(),
+            )
+
+            # The documents are copied from a snapshot of the index, files deleted
+            # meanwhile may have had theirs copied after they were deleted
+            deleted = [
+                hash_id
+                for hash_id, in db.session.query(Files.hash_id).filter(
+                    or_(Files.deletion_date >= started, Files.recycling_date >= started)
+                )
+            ]
+            if deleted:
+                self._delete_index_states([index_id], deleted)
+                self._streaming_bulk_documents(
+                    [self._get_delete_obj(hash_id, index_id) for hash_id in deleted]
+                )
+            self.swap_file_index(index_id)
+        finally:
+            progress.finish_building()
+
+    def delete_index(self, index_id: str):
+        self.elastic_client.indices.delete(index=index_id, ignore=[404])
+        self._delete_index_states([index_id])
+        current_app.logger.info(
+            f'Deleted ElasticSearch index {index_id}',
+            extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict(),
+        )
+
     def update_or_create_pipeline(self, pipeline_id, pipeline_definition_file):
         """Creates a pipeline with the given pipeline id and definition file. If the pipeline
         already exists, we update it."""
@@ -134,25 +308,148 @@ class ElasticService(ElasticConnection):
     def reindex_all_documents(self):
         self.index_files()
 
-    def update_files(self, hash_ids: List[str] = None):
-        raise NotImplementedError()
-
     def delete_files(self, hash_ids: List[str]):
+        index_id = config.get('ELASTIC_FILE_INDEX_ID')
+        self._delete_index_states([self._get_index_name(index_id)], hash_ids)
         self._streaming_bulk_documents(
-            [
-                self._get_delete_obj(hash_id, config.get('ELASTIC_FILE_INDEX_ID'))
-                for hash_id in hash_ids
-            ]
+            [self._get_delete_obj(hash_id, index_id) for hash_id in hash_ids]
         )
-        self.elastic_client.indices.refresh(config.get('ELASTIC_FILE_INDEX_ID'))
 
     def index_files(self, hash_ids: List[str] = None, batch_size: int = 50):
         """
         Adds the files with the given ids to Elastic. If no IDs are given,
-        all non-deleted files will be indexed.
+        all non-deleted files will be indexed. Only the metadata of files
+        whose document is up to date is sent.
         :param hash_ids: a list of file table IDs (integers)
         :param batch_size: number of documents to index per batch
         """
+        index_id = config.get('ELASTIC_FILE_INDEX_ID')
+        index_states: Dict[str, dict] = {}
+        failures = self._streaming_bulk_documents(
+            self._get_index_actions(hash_ids, batch_size, index_id, index_states)
+        )
+        self._save_index_states(index_id, index_states, failures)
+        self._index_missing_documents(failures, index_id)
+
+    def apply_file_changes(
+        self,
+        index_hash_ids: Collection[str],
+        fields_by_hash_id: Dict[str, Iterable[str]],
+        delete_hash_ids: Collection[str],
+        index_id: str = None,
+    ):
+        """
+        Indexes, partially updates and deletes the documents of the given files in a single
+        stream of bulk requests. Files without a document to update are fully indexed
+        instead.
+        :param index_hash_ids: hash ids of the files to fully (re)index
+        :param fields_by_hash_id: names of the document fields to update for each file hash id
+        :param delete_hash_ids: hash ids of the files to remove from the index
+        :param index_id: the index, the file index of the environment by default
+        """
+        index_id = index_id or config.get('ELASTIC_FILE_INDEX_ID')
+        if delete_hash_ids:
+            self._delete_index_states([self._get_index_name(index_id)], delete_hash_ids)
+        index_states: Dict[str, dict] = {}
+        failures = self._streaming_bulk_documents(
+            chain(
+                (
+                    self._get_delete_obj(hash_id, index_id)
+                    for hash_id in delete_hash_ids
+                ),
+                self._get_index_actions(
+                    index_hash_ids, index_id=index_id, index_states=index_states
+                )
+                if index_hash_ids
+                else (),
+                self._get_update_actions(fields_by_hash_id, index_id=index_id),
+            )
+        )
+        self._save_index_states(index_id, index_states, failures)
+        self._index_missing_documents(failures, index_id)
+
+    def index_file_range(
+        self,
+        index_id: str,
+        first_id: int,
+        last_id: int,
+        on_progress: Callable[[int, int, List[int]], None],
+        max_chunk_bytes: int = ELASTIC_REINDEX_CHUNK_BYTES,
+        thread_count: int = ELASTIC_REINDEX_THREADS,
+    ):
+        """
+        Indexes the files whose id is in the given range, in order of id, with several bulk
+        requests in flight.
+        :param index_id: the index
+        :param first_id: the first file id of the range
+        :param last_id: the last file id of the range (included)
+        :param on_progress: called every `ELASTIC_REINDEX_CHECKPOINT_SIZE` files with the id
+        of the last file processed (all files before it are processed as well), the number
+        of files processed and the ids of the files which failed since the last call
+        :param max_chunk_bytes: maximum size of a bulk request
+        :param thread_count: number of bulk requests in flight
+        """
+        # The results of the bulk requests come back in the order of the actions
+        file_ids: Deque[int] = deque()
+        index_states: Dict[str, dict] = {}
+        indexed: Dict[str, dict] = {}
+
+        def files():
+            # Consumed by the thread of parallel_bulk building the requests, so the files
+            # are queried with the session of that thread: the session of the calling
+            # thread saves the index states meanwhile
+            in_range = Files.id.between(first_id, last_id)
+            query = (
+                self._get_file_hierarchy_query(
+                    and_(
+                        in_range,
+                        Files.deletion_date.is_(None),
+                        Files.recycling_date.is_(None),
+                    )
+                )
+                .filter(in_range)
+                .with_entities(Files, Projects)
+            )
+            for file, project in self._windowed_query(
+                query, Files.id, ELASTIC_REINDEX_WINDOW
+            ):
+                file_ids.append(file.id)
+                yield file, project
+
+        processed = 0
+        failed: List[int] = []
+        for success, info in self._parallel_bulk_documents(
+            self._lazy_create_index_docs_for_parallel_bulk(
+                files(), index_id, index_states
+            ),
+            max_chunk_bytes=max_chunk_bytes,
+            thread_count=thread_count,
+        ):
+            last_file_id = file_ids.popleft()
+            processed += 1
+            (result,) = info.values()
+            index_state = index_states.pop(result['_id'], None)
+            if not success:
+                failed.append(last_file_id)
+            elif index_state is not None:
+                indexed[result['_id']] = index_state
+            if processed == ELASTIC_REINDEX_CHECKPOINT_SIZE:
+                self._save_index_states(index_id, indexed)
+                on_progress(last_file_id, processed, failed)
+                processed = 0
+                failed = []
+                indexed = {}
+        if processed:
+            self._save_index_states(index_id, indexed)
+            on_progress(last_file_id, processed, failed)
+
+    def _get_index_actions(
+        self,
+        hash_ids: Collection[str] = None,
+        batch_size: int = 50,
+        index_id: str = None,
+        index_states: Dict[str, dict] = None,
+    ):
         filters = [
             Files.deletion_date.is_(None),
             Files.recycling_date.is_(None),
@@ -172,12 +469,80 @@ class ElasticService(ElasticConnection):
         # Just return Files and Projects data, we don't care about any other columns
         query = query.with_entities(Files, Projects)
 
-        self._streaming_bulk_documents(
-            self._lazy_create_index_docs_for_streaming_bulk(
-                self._windowed_query(query, Files.hash_id, batch_size)
+        return self._lazy_create_index_docs_for_streaming_bulk(
+            self._windowed_query(query, Files.hash_id, batch_size),
+            index_id,
+            index_states,
+        )
+
+    def _get_update_actions(
+        self,
+        fields_by_hash_id: Dict[str, Iterable[str]],
+        batch_size: int = 500,
+        index_id: str = None,
+    ):
+        fields_by_hash_id = {
+            hash_id: set(fields)
+            for hash_id, fields in fields_by_hash_id.items()
+            if fields
+        }
+        if not fields_by_hash_id:
+            return
+
+        hash_ids = list(fields_by_hash_id)
+        index_id = index_id or config.get('ELASTIC_FILE_INDEX_ID')
+        # The content of the files is not needed to update their metadata
+        query = (
+            build_file_hierarchy_query(
+                and_(
+                    Files.hash_id.in_(hash_ids),
+                    Files.deletion_date.is_(None),
+                    Files.recycling_date.is_(None),
+                ),
+                Projects,
+                Files,
             )
+            .options(raiseload('*'), joinedload(Files.user))
+            .filter(Files.hash_id.in_(hash_ids))
+            .with_entities(Files, Projects)
         )
 
+        for file, project in self._windowed_query(query, Files.hash_id, batch_size):
+            fields = fields_by_hash_id[file.hash_id]
+            yield self._get_update_action_obj(
+                file.hash_id,
+                index_id,
+                {
+                    field: value
+                    for field, value in self._get_document_metadata(
+                        file, project
+                    ).items()
+                    if field in fields
+                },
+            )
+
+    def _index_missing_documents(self, failures: List[dict], index_id: str = None):
+        """Fully indexes the files whose document could not be updated as it does not exist."""
+        missing = [
+            info['update']['_id']
+            for info in failures
+            if info.get('update', {}).get('status') == 404
+        ]
+        if missing:
+            index_id = index_id or config.get('ELASTIC_FILE_INDEX_ID')
+            # their state would only let an update through again
+            self._delete_index_states([self._get_index_name(index_id)], missing)
+            index_states: Dict[str, dict] = {}
+            self._save_index_states(
+                index_id,
+                index_states,
+                self._streaming_bulk_documents(
+                    self._get_index_actions(
+                        missing, index_id=index_id, index_states=index_states
+                    )
+                ),
+            )
+
     def _get_file_hierarchy_query(self, filter):
         """
         Generate the query to get files that will be indexed.
@@ -185,7 +550,10 @@ class ElasticService(ElasticConnection):
         :return: the query
         """
         return build_file_hierarchy_query(filter, Projects, Files).options(
-            raiseload('*'), joinedload(Files.user), joinedload(Files.content)
+            raiseload('*'),
+            joinedload(Files.user),
+            # The content is only loaded for the files whose document is out of date
+            joinedload(Files.content).defer('raw_file'),
         )
 
     def _windowed_query(self, q, column, windowsize):
@@ -225,52 +593,190 @@ class ElasticService(ElasticConnection):
         else:
             return FileContentBuffer()
 
-    def _lazy_create_index_docs_for_parallel_bulk(self, batch):
+    def _lazy_create_index_docs_for_parallel_bulk(
+        self, batch, index_id: str = None, index_states: Dict[str, dict] = None
+    ):
         """
         Creates a generator out of the elastic document creation
         process to prevent loading everything into memory.
         :param batch: iterable of file/project pairs
+        :param index_id: the index, the file index of the environment by default
+        :param index_states: see `_lazy_create_index_docs_for_streaming_bulk`
         :return: indexable object in generator form
         """
 
         # Preserve context that is lost from threading when used
         # with the elasticsearch parallel_bulk
         with app.app_context():
-            for file, project in batch:
-                yield self._get_index_obj(
-                    file, project, config.get('ELASTIC_FILE_INDEX_ID')
-                )
+            yield from self._lazy_create_index_docs_for_streaming_bulk(
+                batch, index_id, index_states
+            )
 
-    def _lazy_create_index_docs_for_streaming_bulk(self, batch):
+    def _lazy_create_index_docs_for_streaming_bulk(
+        self, batch, index_id: str = None, index_states: Dict[str, dict] = None
+    ):
         """
         Creates a generator out of the elastic document creation
-        process to prevent loading everything into memory.
+        process to prevent loading everything into memory. Files whose
+        document in the index is up to date only get their metadata
+        updated.
         :param batch: iterable of file/project pairs
+        :param index_id: the index, the file index of the environment by default
+        :param index_states: if given, filled with the state of the document of each
+        file fully indexed, by hash id, to save once elastic acknowledged it
         :return: indexable object in generator form
         """
-        for file, project in batch:
-            yield self._get_index_obj(
-                file, project, config.get('ELASTIC_FILE_INDEX_ID')
+        index_id = index_id or config.get('ELASTIC_FILE_INDEX_ID')
+        index_name = self._get_index_name(index_id)
+        mapping_version = self._get_mapping_version()
+        for chunk in chunked(batch, INDEX_STATE_CHECK_SIZE):
+            indexed_states = self._get_indexed_states(
+                index_name, [file.id for file, _ in chunk]
             )
+            for file, project in chunk:
+                index_state = self._get_index_state(file, mapping_version)
+                if indexed_states.get(file.id) == index_state:
+                    yield self._get_update_action_obj(
+                        file.hash_id,
+                        index_id,
+                        self._get_document_metadata(file, project),
+                    )
+                else:
+                    if index_states is not None:
+                        index_states[file.hash_id] = index_state
+                    yield self._get_index_obj(file, project, index_id)
+
+    def _get_file_index_mapping_file(self) -> str:
+        return dict(config.get('ELASTIC_INDEX_SEED_PAIRS'))[
+            config.get('ELASTIC_FILE_INDEX_ID')
+        ]
+
+    def _get_mapping_version(self) -> str:
+        """
+        Identify the mapping of the file index, which changes along with its definition
+        :return: the version
+        """
+        with open(self._get_file_index_mapping_file(), 'rb') as f:
+            return hashlib.md5(f.read()).hexdigest()
+
+    def _get_index_name(self, index_id: str) -> TypingOptional[str]:
+        """
+        Resolve the index behind an alias, such as the file index
+        :param index_id: the index or alias
+        :return: the name of the index, or None if it does not exist
+        """
+        try:
+            return next(iter(self.elastic_client.indices.get_alias(index=index_id)))
+        except ElasticNotFoundError:
+            return None
+
+    def _get_index_state(self, file: Files, mapping_version: str) -> dict:
+        """
+        Identify what the document of a file is built from: its content, its type, the way
+        it is indexed and the mapping of the index
+        :param file: the file
+        :param mapping_version: see `_get_mapping_version`
+        :return: the columns of the `FileIndexState` of the document
+        """
+        mode = 'text' if config.get('ELASTIC_INDEX_PLAIN_TEXT') else 'attachment'
+        return {
+            'file_id': file.id,
+            'content_checksum': file.content.checksum_sha256 if file.content else None,
+            'content_format': f'{file.mime_type}:{mode}:{INDEXED_TEXT_FORMAT_VERSION}',
+            'mapping_version': mapping_version,
+        }
+
+    def _get_indexed_states(
+        self, index_name: TypingOptional[str], file_ids: List[int]
+    ) -> Dict[int, dict]:
+        """
+        Fetch the state of the documents of the given files in an index
+        :param index_name: the name of the index
+        :param file_ids: file ids
+        :return: the state of each file with a document, see `_get_index_state`
+        """
+        if index_name is None:
+            return {}
+        query = db.session.query(
+            FileIndexState.file_id,
+            FileIndexState.content_checksum,
+            FileIndexState.content_format,
+            FileIndexState.mapping_version,
+        ).filter(
+            FileIndexState.index_name == index_name,
+            FileIndexState.file_id.in_(file_ids),
+        )
+        return {state.file_id: state._asdict() for state in query}
+
+    def _save_index_states(
+        self, index_id: str, index_states: Dict[str, dict], failures: List[dict] = []
+    ):
+        """
+        Save the state of the documents elastic acknowledged
+        :param index_id: the index
+        :param index_states: the state of the document of each file hash id
+        :param failures: the info of the failed operations, see `_streaming_bulk_documents`
+        """
+        failed = {result.get('_id') for info in failures for result in info.values()}
+        rows = [
+            index_state
+            for hash_id, index_state in index_states.items()
+            if hash_id not in failed
+        ]
+        index_name = self._get_index_name(index_id)
+        if not rows or index_name is None:
+            return
+
+        statement = insert(FileIndexState).values(
+            [
+                {**row, 'index_name': index_name, 'indexed_at': db.func.now()}
+                for row in rows
+            ]
+        )
+        db.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[FileIndexState.file_id, FileIndexState.index_name],
+                set_={
+                    column: statement.excluded[column]
+                    for column in [
+                        'content_checksum',
+                        'content_format',
+                        'mapping_version',
+                        'indexed_at',
+                    ]
+                },
+            )
+        )
+        db.session.commit()
+
+    def _delete_index_states(
+        self,
+        index_names: Sequence[TypingOptional[str]],
+        hash_ids: Collection[str] = None,
+    ):
+        """
+        Forget the documents of the given files, or of all files, in the given indexes
+        :param index_names: the names of the indexes
+        :param hash_ids: file hash ids
+        """
+        index_names = [index_name for index_name in index_names if index_name]
+        if not index_names:
+            return
+        query = db.session.query(FileIndexState).filter(
+            FileIndexState.index_name.in_(index_names)
+        )
+        if hash_ids is not None:
+            query = query.filter(
+                FileIndexState.file_id.in_(
+                    db.session.query(Files.id).filter(Files.hash_id.in_(list(hash_ids)))
+                )
+            )
+        query.delete(synchronize_session=False)
+        db.session.commit()
 
     def _get_update_action_obj(
         self, file_hash_id: str, index_id: str, changes: dict = {}
     ) -> dict:
-        # 'filename': file.filename,
-        # 'description': file.description,
-        # 'uploaded_date': file.creation_date,
-        # 'data': base64.b64encode(indexable_content).decode('utf-8'),
-        # 'user_id': file.user_id,
-        # 'username': file.user.username,
-        # 'project_id': project.id,
-        # 'project_hash_id': project.hash_id,
-        # 'project_name': project.name,
-        # 'doi': file.doi,
-        # 'public': file.public,
-        # 'id': file.id,
-        # 'hash_id': file.hash_id,
-        # 'mime_type': file.mime_type,
-        # 'data_ok': data_ok,
         return {
             '_op_type': 'update',
             '_index': index_id,
@@ -281,6 +787,54 @@ class ElasticService(ElasticConnection):
     def _get_delete_obj(self, file_hash_id: str, index_id: str) -> dict:
         return {'_op_type': 'delete', '_index': index_id, '_id': file_hash_id}
 
+    def _get_document_metadata(self, file: Files, project: Projects) -> dict:
+        """
+        Generate the fields of a file document, other than its content
+        :param file: the file
+        :param project: the project that file is within
+        :return: the document fields
+        """
+        # NOTE: Remember to update any relevant ORM event listeners if these properties are
+        # updated! For example, the `after_update` listener of `Files` and
+        # `ELASTIC_DOC_FIELDS_BY_COLUMN`.
+        return {
+            'filename': file.filename,
+            'path': file.path,
+            'description': file.description,
+            'uploaded_date': file.creation_date,
+            'user_id': file.user_id,
+            'username': file.user.username,
+            'project_id': project.id,
+            'project_hash_id': project.hash_id,
+            'project_name': project.name,
+            'doi': file.doi,
+            'public': file.public,
+            'id': file.id,
+            'hash_id': file.hash_id,
+            'mime_type': file.mime_type,
+        }
+
+    def _get_indexable_text(self, file: Files) -> str:
+        """
+        Get the text of the file to index. The text of PDFs is reused from the results of
+        the parser if they are still cached from the annotation of the file.
+        :param file: the file
+        :return: the text to send to Elastic
+        """
+        # Import what we need, when we need it (Helps to avoid circular dependencies)
+        from neo4japp.services.annotations.content_cache import get_cached_parsed_text
+
+        if not file.content:
+            return ''
+        if file.mime_type == FILE_MIME_TYPE_PDF:
+            text = get_cached_parsed_text(file.content.checksum_sha256)
+            if text is not None:
+                return text
+        file_type_service = get_file_type_service()
+        return file_type_service.get(file.mime_type).to_indexable_text(
+            FileContentBuffer(file.content.raw_file)
+        )
+
     def _get_index_obj(self, file: Files, project: Projects, index_id) -> dict:
         """
         Generate an index operation object from the given file and project
@@ -289,6 +843,9 @@ class ElasticService(ElasticConnection):
         :param index_id: the index
         :return: a document
         """
+        if config.get('ELASTIC_INDEX_PLAIN_TEXT'):
+            return self._get_text_index_obj(file, project, index_id)
+
         try:
             indexable_content = self._transform_data_for_indexing(file).getvalue()
         except Exception as e:
@@ -308,42 +865,67 @@ class ElasticService(ElasticConnection):
         else:
             data = base64.b64encode(indexable_content).decode('utf-8')
 
-        # NOTE: Remember to update any relevant ORM event listeners if these properties are
-        # updated! For example, the `after_update` listener of `Files`.
         return {
             '_index': index_id,
             'pipeline': ATTACHMENT_PIPELINE_ID,
             '_id': file.hash_id,
             '_source': {
-                'filename': file.filename,
-                'path': file.path,
-                'description': file.description,
-                'uploaded_date': file.creation_date,
+                **self._get_document_metadata(file, project),
                 'data': data,
-                'user_id': file.user_id,
-                'username': file.user.username,
-                'project_id': project.id,
-                'project_hash_id': project.hash_id,
-                'project_name': project.name,
-                'doi': file.doi,
-                'public': file.public,
-                'id': file.id,
-                'hash_id': file.hash_id,
-                'mime_type': file.mime_type,
                 'data_ok': bool(data),
             },
         }
 
-    def _parallel_bulk_documents(self, documents):
+    def _get_text_index_obj(self, file: Files, project: Projects, index_id) -> dict:
+        """
+        Generate an index operation object from the given file and project, sending the
+        text of the file in the field the attachment pipeline would have extracted it to
+        :param file: the file
+        :param project: the project that file is within
+        :param index_id: the index
+        :return: a document
+        """
+        try:
+            text = self._get_indexable_text(file)
+        except Exception as e:
+            text = ''
+            # We should still index the file even if we can't extract its text
+            current_app.logger.error(
+                f'Failed to generate indexable text for file '
+                f'#{file.id} (hash={file.hash_id}, mime type={file.mime_type})',
+                exc_info=e,
+                extra=EventLog(event_type=LogEventType.ELASTIC_FAILURE.value).to_dict(),
+            )
+
+        return {
+            '_index': index_id,
+            '_id': file.hash_id,
+            '_source': {
+                **self._get_document_metadata(file, project),
+                'data': {'content': text},
+                'data_ok': bool(text),
+            },
+        }
+
+    def _parallel_bulk_documents(
+        self,
+        documents,
+        max_chunk_bytes: int = ELASTIC_REINDEX_CHUNK_BYTES,
+        thread_count: int = ELASTIC_REINDEX_THREADS,
+    ):
         """
         Performs a series of bulk operations in elastic, determined by the `documents` input.
         These operations are executed in parallel, on 4 threads by default.
+        :return: generator of the (success, info) result of each operation, in the order of
+        the documents
         """
         # `raise_on_exception` set to False so that we don't error out if one of the documents
         # fails to index
         results = parallel_bulk(
             self.elastic_client,
             documents,
+            thread_count=thread_count,
+            max_chunk_bytes=max_chunk_bytes,
             raise_on_error=False,
             raise_on_exception=False,
         )
@@ -364,12 +946,15 @@ class ElasticService(ElasticConnection):
                         event_type=LogEventType.ELASTIC_FAILURE.value
                     ).to_dict(),
                 )
+            yield success, info
 
     def _streaming_bulk_documents(self, documents):
         """
         Performs a series of bulk operations in elastic, determined by the `documents` input.
         These operations are done in series.
+        :return: the info of the failed operations
         """
+        failures = []
         # `raise_on_exception` set to False so that we don't error out if one of the documents
         # fails to index
         results = streaming_bulk(
@@ -391,12 +976,14 @@ class ElasticService(ElasticConnection):
                     extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict(),
                 )
             else:
+                failures.append(info)
                 current_app.logger.warning(
                     f'Elastic search bulk operation failed: {info}',
                     extra=EventLog(
                         event_type=LogEventType.ELASTIC_FAILURE.value
                     ).to_dict(),
                 )
+        return failures
 
     # End indexing methods
 
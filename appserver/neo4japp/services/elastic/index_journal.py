@@ -0,0 +1,230 @@
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Collection, Dict, Iterable, List, Mapping, Set
+
+from flask import current_app
+from redis import Redis
+from sqlalchemy import and_
+
+from neo4japp.constants import (
+    ELASTIC_DOC_FIELDS_BY_COLUMN,
+    ELASTIC_DOC_HIERARCHY_FIELDS,
+    LogEventType,
+)
+from neo4japp.database import db, get_elastic_service, get_redis_connection
+from neo4japp.models.files import Files
+from neo4japp.models.files_queries import build_file_children_cte
+from neo4japp.utils.logger import EventLog
+
+from .constants import (
+    ELASTIC_JOURNAL_BATCH_SIZE,
+    ELASTIC_JOURNAL_JOB_MAX_RETRY,
+    ELASTIC_JOURNAL_KEY_PREFIX,
+    ELASTIC_JOURNAL_SCHEDULE_TTL,
+    ELASTIC_JOURNAL_WINDOW,
+)
+from .reindex import get_file_index_write_ids
+
+UPDATABLE_FIELDS = sorted(
+    {field for fields in ELASTIC_DOC_FIELDS_BY_COLUMN.values() for field in fields}
+)
+
+
+@dataclass
+class JournalBatch:
+    """Changes popped from the journal, coalesced per file."""
+
+    index: Set[str]
+    # names of the document fields to update for each file hash id
+    updates: Dict[str, Set[str]]
+    delete: Set[str]
+
+    def __bool__(self):
+        return bool(self.index or self.updates or self.delete)
+
+    def __len__(self):
+        return len(self.index | self.updates.keys() | self.delete)
+
+
+class ElasticIndexJournal:
+    """Pending changes of the elastic documents of files.
+
+    The ORM listeners of `Files` record which files changed, and how, once their
+    transaction is committed, instead of enqueuing a job per event: a file is kept
+    once per kind of change (full index, partial update of each field, delete) however
+    often it changes, and one job applies everything recorded within
+    `ELASTIC_JOURNAL_WINDOW` seconds in bulk.
+    """
+
+    def __init__(self, redis_conn: Redis):
+        self._redis = redis_conn
+        self.index_key = f'{ELASTIC_JOURNAL_KEY_PREFIX}:index'
+        self.delete_key = f'{ELASTIC_JOURNAL_KEY_PREFIX}:delete'
+        self.scheduled_key = f'{ELASTIC_JOURNAL_KEY_PREFIX}:scheduled'
+
+    def _update_key(self, field: str) -> str:
+        return f'{ELASTIC_JOURNAL_KEY_PREFIX}:update:{field}'
+
+    def record(
+        self,
+        index: Iterable[str] = (),
+        updates: Mapping[str, Iterable[str]] = {},
+        delete: Iterable[str] = (),
+    ):
+        """Records changed files, and schedules the job applying them if not yet scheduled.
+        :param index: hash ids of the files to fully (re)index
+        :param updates: names of the document fields to update for each file hash id
+        :param delete: hash ids of the files to remove from the index
+        """
+        by_field: Dict[str, List[str]] = {}
+        for hash_id, fields in updates.items():
+            for field in fields:
+                by_field.setdefault(field, []).append(hash_id)
+        index = list(index)
+        delete = list(delete)
+        if not (index or by_field or delete):
+            return
+
+        pipe = self._redis.pipeline()
+        if index:
+            pipe.sadd(self.index_key, *index)
+        for field, hash_ids in by_field.items():
+            pipe.sadd(self._update_key(field), *hash_ids)
+        if delete:
+            pipe.sadd(self.delete_key, *delete)
+        pipe.set(self.scheduled_key, 1, nx=True, ex=ELASTIC_JOURNAL_SCHEDULE_TTL)
+        *_, scheduled = pipe.execute()
+
+        if scheduled:
+            # Import what we need, when we need it (Helps to avoid circular dependencies)
+            from neo4japp.services.redis.redis_queue_service import RedisQueueService
+
+            RedisQueueService().enqueue_in(
+                timedelta(seconds=ELASTIC_JOURNAL_WINDOW),
+                process_elastic_index_journal,
+                max_retry=ELASTIC_JOURNAL_JOB_MAX_RETRY,
+                result_ttl=0,
+            )
+
+    def unschedule(self):
+        """Lets the next recorded change schedule a new job, called before popping
+        the changes so that none is left without a job to apply it."""
+        self._redis.delete(self.scheduled_key)
+
+    def pop(self, count: int) -> JournalBatch:
+        """Removes up to `count` files of each kind of change from the journal."""
+        pipe = self._redis.pipeline()
+        pipe.spop(self.index_key, count)
+        pipe.spop(self.delete_key, count)
+        for field in UPDATABLE_FIELDS:
+            pipe.spop(self._update_key(field), count)
+        index, delete, *updated = pipe.execute()
+
+        updates: Dict[str, Set[str]] = {}
+        for field, hash_ids in zip(UPDATABLE_FIELDS, updated):
+            for hash_id in hash_ids:
+                updates.setdefault(hash_id.decode('utf-8'), set()).add(field)
+        return JournalBatch(
+            {hash_id.decode('utf-8') for hash_id in index},
+            updates,
+            {hash_id.decode('utf-8') for hash_id in delete},
+        )
+
+    def restore(self, batch: JournalBatch):
+        """Records the changes of a batch which could not be applied again."""
+        self.record(batch.index, batch.updates, batch.delete)
+
+
+def _get_descendant_hash_ids(
+    hash_ids: Collection[str], include_deleted: bool
+) -> Dict[str, List[str]]:
+    """Returns the hash ids of the descendants of each of the given files."""
+    q_hierarchy = build_file_children_cte(Files.hash_id.in_(list(hash_ids)))
+    t_initial = db.aliased(Files)
+    query = (
+        db.session.query(t_initial.hash_id, Files.hash_id)
+        .join(q_hierarchy, q_hierarchy.c.id == Files.id)
+        .join(t_initial, t_initial.id == q_hierarchy.c.initial_id)
+        .filter(q_hierarchy.c.level > 0)
+    )
+    if not include_deleted:
+        query = query.filter(
+            and_(Files.deletion_date.is_(None), Files.recycling_date.is_(None))
+        )
+
+    descendants: Dict[str, List[str]] = {}
+    for hash_id, descendant_hash_id in query:
+        descendants.setdefault(hash_id, []).append(descendant_hash_id)
+    return descendants
+
+
+def apply_journal_batch(batch: JournalBatch):
+    """Applies a batch of changes in a single stream of bulk requests.
+
+    Documents are built from the current state of the files, so a change
+    superseded by a later one (e.g. an update of a file deleted since) is a no-op.
+    """
+    # Changes are only recorded once committed, see `record_elastic_changes`
+    delete = set(batch.delete)
+    if delete:
+        for descendants in _get_descendant_hash_ids(delete, True).values():
+            delete.update(descendants)
+
+    index = batch.index - delete
+
+    # Descendants of renamed or moved folders get their path and project updated
+    moved = {
+        hash_id: fields & ELASTIC_DOC_HIERARCHY_FIELDS
+        for hash_id, fields in batch.updates.items()
+        if fields & ELASTIC_DOC_HIERARCHY_FIELDS
+    }
+    updates = {hash_id: set(fields) for hash_id, fields in batch.updates.items()}
+    if moved:
+        for hash_id, descendants in _get_descendant_hash_ids(moved, False).items():
+            for descendant in descendants:
+                updates.setdefault(descendant, set()).update(moved[hash_id])
+    updates = {
+        hash_id: fields
+        for hash_id, fields in updates.items()
+        if hash_id not in delete and hash_id not in index
+    }
+
+    current_app.logger.info(
+        f'Applying elastic changes: {len(index)} indexed, {len(updates)} updated, '
+        + f'{len(delete)} deleted.',
+        extra=EventLog(event_type=LogEventType.ELASTIC.value).to_dict(),
+    )
+    elastic_service = get_elastic_service()
+    # While a new file index is built, it gets the changes as well
+    for index_id in get_file_index_write_ids():
+        elastic_service.apply_file_changes(
+            sorted(index), updates, sorted(delete), index_id=index_id
+        )
+
+
+def process_elastic_index_journal():
+    """RQ job applying every change recorded in the journal, in batches."""
+    # Import what we need, when we need it (Helps to avoid circular dependencies)
+    from app import app
+
+    # This will be called by the Redis queue service outside of the normal flask app context, so
+    # here we manually ensure there is a context.
+    with app.app_context():
+        journal = ElasticIndexJournal(get_redis_connection())
+        journal.unschedule()
+        while True:
+            batch = journal.pop(ELASTIC_JOURNAL_BATCH_SIZE)
+            if not batch:
+                break
+            try:
+                apply_journal_batch(batch)
+            except Exception as e:
+                journal.restore(batch)
+                current_app.logger.error(
+                    f'Failed to apply elastic changes of {len(batch)} files.',
+                    exc_info=e,
+                    extra=EventLog(
+                        event_type=LogEventType.ELASTIC_FAILURE.value
+                    ).to_dict(),
+                )
+                raise
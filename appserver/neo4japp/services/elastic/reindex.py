@@ -0,0 +1,166 @@
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from redis import Redis
+from sqlalchemy import and_, func
+
+from neo4japp.database import db, get_elastic_service, get_redis_connection
+from neo4japp.models.files import Files
+from neo4japp.utils.globals import config
+
+from .constants import ELASTIC_REINDEX_CHUNK_BYTES, ELASTIC_REINDEX_KEY_PREFIX
+
+
+class ReindexProgress:
+    """Checkpoint of the current run of `flask reindex-files`.
+
+    The files are split in ranges of ids, indexed in order by one worker
+    each: the id of the last file indexed in each range is stored every
+    few files, a resumed run starts each range after it.
+    """
+
+    def __init__(self, redis_conn: Redis):
+        self._redis = redis_conn
+        self.stats_key = f'{ELASTIC_REINDEX_KEY_PREFIX}:stats'
+        self.partitions_key = f'{ELASTIC_REINDEX_KEY_PREFIX}:partitions'
+        self.checkpoints_key = f'{ELASTIC_REINDEX_KEY_PREFIX}:checkpoints'
+        self.failed_key = f'{ELASTIC_REINDEX_KEY_PREFIX}:failed'
+
+    def reset(self, index_id: str, partitions: List[Tuple[int, int, int]], new: bool):
+        """
+        :param index_id: the index the files are indexed in
+        :param partitions: first id, last id and number of files of each range
+        :param new: whether the index is built to replace the file index
+        """
+        pipe = self._redis.pipeline()
+        pipe.delete(
+            self.stats_key, self.partitions_key, self.checkpoints_key, self.failed_key
+        )
+        pipe.hset(self.stats_key, 'index', index_id)
+        pipe.hset(self.stats_key, 'total', sum(count for _, _, count in partitions))
+        pipe.hset(self.stats_key, 'started', time.time())
+        if new:
+            pipe.hset(self.stats_key, 'building', index_id)
+        for i, (first_id, last_id, _) in enumerate(partitions):
+            pipe.hset(self.partitions_key, str(i), f'{first_id}:{last_id}')
+        pipe.execute()
+
+    @property
+    def total(self) -> int:
+        return int(self._redis.hget(self.stats_key, 'total') or 0)
+
+    @property
+    def index_id(self) -> Optional[str]:
+        index_id = self._redis.hget(self.stats_key, 'index')
+        return index_id.decode('utf-8') if index_id is not None else None
+
+    @property
+    def building_index_id(self) -> Optional[str]:
+        """The index being built to replace the file index, if any."""
+        index_id = self._redis.hget(self.stats_key, 'building')
+        return index_id.decode('utf-8') if index_id is not None else None
+
+    def start_building(self, index_id: str):
+        """Writes the changes of files to the given index as well, until
+        `finish_building`, e.g. while documents are copied to it."""
+        self._redis.hset(self.stats_key, 'building', index_id)
+
+    def finish_building(self):
+        self._redis.hdel(self.stats_key, 'building')
+
+    def get_partitions(self) -> Dict[int, Tuple[int, int]]:
+        partitions = {}
+        for i, file_range in self._redis.hgetall(self.partitions_key).items():
+            first_id, last_id = file_range.decode('utf-8').split(':')
+            partitions[int(i)] = (int(first_id), int(last_id))
+        return partitions
+
+    def get_checkpoint(self, partition: int) -> Optional[int]:
+        last_id = self._redis.hget(self.checkpoints_key, str(partition))
+        return int(last_id) if last_id is not None else None
+
+    def checkpoint(
+        self, partition: int, last_id: int, processed: int, failed: List[int]
+    ):
+        pipe = self._redis.pipeline()
+        pipe.hset(self.checkpoints_key, str(partition), last_id)
+        pipe.hincrby(self.stats_key, 'processed', processed)
+        if failed:
+            pipe.sadd(self.failed_key, *failed)
+        pipe.execute()
+
+    def get_counts(self) -> Tuple[int, int]:
+        """Returns the number of processed and of failed files."""
+        pipe = self._redis.pipeline()
+        pipe.hget(self.stats_key, 'processed')
+        pipe.scard(self.failed_key)
+        processed, failed = pipe.execute()
+        return int(processed or 0), failed
+
+    def pop_failed_ids(self) -> Set[int]:
+        """Removes the files which failed from the progress, to index them again."""
+        pipe = self._redis.pipeline()
+        pipe.smembers(self.failed_key)
+        pipe.delete(self.failed_key)
+        failed, _ = pipe.execute()
+        return {int(file_id) for file_id in failed}
+
+
+def get_reindex_partitions(count: int) -> List[Tuple[int, int, int]]:
+    """Splits the indexed files in up to `count` ranges of ids of similar size.
+    :return: first id, last id and number of files of each range
+    """
+    live = and_(Files.deletion_date.is_(None), Files.recycling_date.is_(None))
+    q_tiles = (
+        db.session.query(
+            Files.id.label('id'),
+            func.ntile(count).over(order_by=Files.id).label('tile'),
+        )
+        .filter(live)
+        .subquery()
+    )
+    query = (
+        db.session.query(
+            func.min(q_tiles.c.id), func.max(q_tiles.c.id), func.count(q_tiles.c.id)
+        )
+        .group_by(q_tiles.c.tile)
+        .order_by(q_tiles.c.tile)
+    )
+    return [(first_id, last_id, files) for first_id, last_id, files in query]
+
+
+def get_file_index_write_ids() -> List[str]:
+    """Returns the indexes changes of files are written to: the file index, and
+    the index built to replace it while `flask reindex-files --new-index` runs."""
+    index_ids = [config.get('ELASTIC_FILE_INDEX_ID')]
+    building_index_id = ReindexProgress(get_redis_connection()).building_index_id
+    if building_index_id is not None:
+        index_ids.append(building_index_id)
+    return index_ids
+
+
+def run_reindex_partition(partition: int, max_chunk_bytes=ELASTIC_REINDEX_CHUNK_BYTES):
+    """Indexes the files of a range, starting after its last checkpoint.
+
+    Meant as the target of a forked process.
+    """
+    from app import app
+
+    with app.app_context():
+        progress = ReindexProgress(get_redis_connection())
+        first_id, last_id = progress.get_partitions()[partition]
+        checkpoint = progress.get_checkpoint(partition)
+        if checkpoint is not None:
+            first_id = checkpoint + 1
+        if first_id > last_id:
+            return
+
+        get_elastic_service().index_file_range(
+            progress.index_id,
+            first_id,
+            last_id,
+            lambda last_file_id, processed, failed: progress.checkpoint(
+                partition, last_file_id, processed, failed
+            ),
+            max_chunk_bytes=max_chunk_bytes,
+        )
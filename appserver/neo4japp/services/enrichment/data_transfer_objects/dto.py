@@ -1,4 +1,5 @@
 import attr
+import bisect
 
 from typing import Dict, List, Tuple
 
@@ -8,3 +9,10 @@ class EnrichmentCellTextMapping:
     text: str = attr.ib()
     text_index_map: List[Tuple[int, dict]] = attr.ib()
     cell_texts: List[dict] = attr.ib()
+    # offset of the last character of each mapped cell in `text`, ascending
+    offsets: List[int] = attr.ib(factory=list)
+
+    def get_cell_index(self, offset: int) -> int:
+        """Returns the index in `text_index_map` of the cell containing
+        the offset, `len(text_index_map)` if past the last cell."""
+        return bisect.bisect_left(self.offsets, offset)
@@ -44,10 +44,10 @@ class EnrichmentTableService(RDBMSBaseDao):
         # got here so passed validation
         data = enrichment['result']
 
-        total_index = 0
         cell_texts = []
         text_index_map = []
-        combined_text = ''
+        offsets = []
+        texts = []
 
         # need to combine cell text together into one
         # the idea is to create a mapping to later identify
@@ -134,16 +134,21 @@ class EnrichmentTableService(RDBMSBaseDao):
                 warn(ServerWarning(message=message), cause=e)
                 continue
 
+        total_index = 0
         for text in cell_texts:
             domain = EnrichmentDomain.get(text['domain'])
             if domain not in (EnrichmentDomain.GO, EnrichmentDomain.BIOCYC):
-                combined_text += text['text']
-                total_index = len(combined_text)
+                texts.append(text['text'])
+                total_index += len(text['text'])
+                offsets.append(total_index - 1)
                 text_index_map.append((total_index - 1, text))
-                combined_text += ' '  # to separate prev text
+                total_index += 1  # for the space separating the next text
 
         return EnrichmentCellTextMapping(
-            text=combined_text, text_index_map=text_index_map, cell_texts=cell_texts
+            text=''.join(f'{text} ' for text in texts),
+            text_index_map=text_index_map,
+            cell_texts=cell_texts,
+            offsets=offsets,
         )
 
 
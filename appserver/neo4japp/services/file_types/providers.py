@@ -492,6 +492,10 @@ class PDFTypeProvider(BaseFileTypeProvider):
     def to_indexable_content(self, buffer: FileContentBuffer):
         return buffer  # Elasticsearch can index PDF files directly
 
+    def to_indexable_text(self, buffer: FileContentBuffer) -> str:
+        with buffer as bufferView:
+            return high_level.extract_text(bufferView)
+
     def should_highlight_content_text_matches(self) -> bool:
         return True
 
@@ -6,7 +6,7 @@ from typing import Dict, List, Optional, Tuple, Union, Iterator, Set, cast
 import magic
 from flask import g
 
-from neo4japp.constants import FILE_MIME_TYPE_DIRECTORY
+from neo4japp.constants import BYTE_ENCODING, FILE_MIME_TYPE_DIRECTORY
 from neo4japp.database import db
 from neo4japp.exceptions import ServerWarning
 from neo4japp.models.files import Files
@@ -158,6 +158,22 @@ class BaseFileTypeProvider:
         # with all the relevant keywords
         return FileContentBuffer()
 
+    def to_indexable_text(self, buffer: FileContentBuffer) -> str:
+        """
+        Return the text to index for the file when Elasticsearch is sent plain
+        text rather than the file itself. By default, this method decodes the
+        UTF-8 text returned by :func:`to_indexable_content`, file types whose
+        indexable content is not text must override it.
+
+        :param buffer: the file's contents
+        :return: the text to be indexed
+        """
+        return (
+            self.to_indexable_content(buffer)
+            .getvalue()
+            .decode(BYTE_ENCODING, errors='replace')
+        )
+
     def should_highlight_content_text_matches(self) -> bool:
         """
         Return whether the 'highlight terms' returned from Elasticsearch should be shown
@@ -42,6 +42,7 @@ from neo4japp.models import (
     AppUser,
     FileContent,
 )
+from neo4japp.models.annotations_queries import copy_file_annotation_occurrences
 from neo4japp.models.files_queries import (
     add_file_starred_columns,
     add_file_user_role_columns,
@@ -739,6 +740,9 @@ class Filesystem:
                     )
 
                 db.session.add(file)
+                if content_hash_id is not None:
+                    db.session.flush()
+                    copy_file_annotation_occurrences(existing_file.id, file.id)
                 db.session.commit()
             except IntegrityError as e:
                 savepoint.rollback()
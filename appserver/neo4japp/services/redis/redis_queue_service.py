@@ -1,9 +1,9 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask import current_app
 from rq import Queue, Retry, Worker
 from rq.command import send_shutdown_command
 from rq.job import Job
-from rq.registry import FailedJobRegistry
+from rq.registry import FailedJobRegistry, StartedJobRegistry
 from typing import Iterable
 
 from neo4japp.constants import LogEventType
@@ -39,6 +39,34 @@ class RedisQueueService:
         )
         return job
 
+    def enqueue_in(
+        self,
+        time_delta: timedelta,
+        f,
+        *args,
+        queue='default',
+        max_retry=10,
+        retry_interval=60,
+        **kwargs,
+    ) -> Job:
+        """Like `enqueue`, but the job is only queued once the delay has passed.
+        Delayed jobs are moved to their queue by workers started with `--with-scheduler`.
+        """
+        q = self.get_queue(queue)
+
+        retry = (
+            Retry(max=max_retry, interval=retry_interval)
+            if max_retry is not None
+            else None
+        )
+
+        job = q.enqueue_in(time_delta, f, *args, retry=retry, **kwargs)
+        current_app.logger.info(
+            f'Job scheduled in redis.',
+            extra={'event_type': LogEventType.REDIS, 'job': job.to_dict()},
+        )
+        return job
+
     def empty_queue(self, queue: str) -> int:
         retval = self.get_queue(queue).empty()
         current_app.logger.info(
@@ -83,8 +111,10 @@ class RedisQueueService:
             )
         return job
 
-    def create_worker(self, queues, name, **kwargs) -> Worker:
-        worker = Worker(queues=queues, name=name, connection=self._redis_conn, **kwargs)
+    def create_worker(self, queues, name, worker_class=Worker, **kwargs) -> Worker:
+        worker = worker_class(
+            queues=queues, name=name, connection=self._redis_conn, **kwargs
+        )
         current_app.logger.info(
             f'Redis worker {worker.name} created.',
             extra={'event_type': LogEventType.REDIS},
@@ -131,6 +161,10 @@ class RedisQueueService:
         for w in Worker.all(connection=self._redis_conn):
             self.shutdown_worker(w.name)
 
+    def get_started_job_registry(self, queue) -> StartedJobRegistry:
+        q = self.get_queue(queue)
+        return StartedJobRegistry(queue=q)
+
     def get_failed_job_registry(self, queue) -> FailedJobRegistry:
         q = self.get_queue(queue)
         return FailedJobRegistry(queue=q)
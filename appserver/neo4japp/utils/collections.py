@@ -29,4 +29,14 @@ def window(seq, n=2):
         yield result
 
 
-__all__ = ['find', 'find_index', 'window']
+def chunked(seq, n):
+    """Returns the items of the iterable in lists of (at most) n items."""
+    it = iter(seq)
+    while True:
+        chunk = list(islice(it, n))
+        if not chunk:
+            return
+        yield chunk
+
+
+__all__ = ['find', 'find_index', 'window', 'chunked']
@@ -0,0 +1,114 @@
+import codecs
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _ChunkBuffer:
+    """Text buffer filled on demand from an iterable of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self, min_size: int = 0) -> bool:
+        """Reads chunks until at least `min_size` more characters are
+        buffered, returns False if the stream ended before that."""
+        # drop what was already consumed so memory stays bounded
+        if self.pos:
+            self.text = self.text[self.pos :]
+            self.pos = 0
+        target = len(self.text) + max(min_size, 1)
+        parts = [self.text]
+        size = len(self.text)
+        while size < target:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                parts.append(self._decoder.decode(b'', final=True))
+                self.exhausted = True
+                break
+            decoded = self._decoder.decode(chunk)
+            parts.append(decoded)
+            size += len(decoded)
+        self.text = ''.join(parts)
+        return size >= target
+
+    def skip_whitespace(self):
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text) or not self.fill():
+                return
+
+    def peek(self) -> str:
+        self.skip_whitespace()
+        if self.pos >= len(self.text):
+            raise ValueError('Unexpected end of JSON stream.')
+        return self.text[self.pos]
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f'Expected "{char}" at JSON stream position {self.pos}.')
+        self.pos += 1
+
+    def decode_value(self) -> Any:
+        decoder = json.JSONDecoder()
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.exhausted:
+                    raise
+                # grow geometrically so that retrying the
+                # decode stays linear in the size of the value
+                self.fill(len(self.text) - self.pos)
+                continue
+            if end == len(self.text) and not self.exhausted:
+                # a number could continue in the next chunk
+                if isinstance(value, (int, float)):
+                    self.fill()
+                    continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(
+    chunks: Iterable[bytes], key: str, other: Optional[Dict[str, Any]] = None
+) -> Iterator[Any]:
+    """Incrementally decodes a JSON object streamed as byte chunks
+    and yields the items of its `key` array one at a time.
+
+    Only a single item is held in memory at once, which keeps the memory
+    of huge responses bounded by their biggest item. The other top level
+    values are decoded whole and, if given, stored in `other`.
+    """
+    buffer = _ChunkBuffer(chunks)
+    buffer.expect('{')
+    if buffer.peek() == '}':
+        return
+    while True:
+        name = buffer.decode_value()
+        buffer.expect(':')
+        if name == key:
+            buffer.expect('[')
+            if buffer.peek() == ']':
+                buffer.pos += 1
+            else:
+                while True:
+                    yield buffer.decode_value()
+                    if buffer.peek() == ']':
+                        buffer.pos += 1
+                        break
+                    buffer.expect(',')
+        else:
+            value = buffer.decode_value()
+            if other is not None:
+                other[name] = value
+        if buffer.peek() == '}':
+            return
+        buffer.expect(',')
@@ -0,0 +1,57 @@
+import multiprocessing
+import time
+from multiprocessing.process import BaseProcess
+from typing import Callable, List, Sequence, Tuple
+
+from neo4japp.database import db
+
+
+def start_forked_workers(
+    targets: List[Tuple[Callable, tuple]]
+) -> Sequence[BaseProcess]:
+    """Starts a forked process running each of the given targets with its arguments.
+
+    A forked child inherits the scoped session of the parent (sessions are scoped
+    by thread ident, which a fork keeps) along with its checked out connection, so
+    the session and the connection pool are released first: every process opens
+    its own connections.
+    """
+    db.session.remove()
+    db.engine.dispose()
+
+    ctx = multiprocessing.get_context('fork')
+    processes = [
+        ctx.Process(target=target, args=args, daemon=True) for target, args in targets
+    ]
+    for p in processes:
+        p.start()
+    return processes
+
+
+def report_progress(
+    get_counts: Callable[[], Tuple[int, int]],
+    total: int,
+    interval: int,
+    is_done: Callable[[], bool],
+):
+    """Prints the progress of workers every `interval` seconds until they are done.
+    :param get_counts: returns the number of processed and of failed items
+    :param total: number of items to process
+    :param interval: seconds between progress reports
+    :param is_done: whether the workers are done
+    """
+    start_time = time.time()
+    start_processed, _ = get_counts()
+
+    while True:
+        time.sleep(interval)
+        processed, failed = get_counts()
+        elapsed = time.time() - start_time
+        rate = (processed - start_processed) / elapsed * 60
+        eta = f'{(total - processed) / rate:.0f} min' if rate else 'unknown'
+        print(
+            f'{processed}/{total} files processed, {failed} failed, '
+            f'{rate:.1f} files/min, ETA {eta}'
+        )
+        if is_done():
+            break
@@ -3,6 +3,7 @@ import json
 from http import HTTPStatus
 
 from neo4japp.models import Files, AppUser
+from neo4japp.services.annotations.initializer import get_manual_annotation_service
 
 
 def generate_headers(jwt_token):
@@ -20,6 +21,8 @@ def test_user_can_get_gene_annotations_from_pdf(
     login_resp = client.login_as_user(fix_admin_user.email, 'password')
     headers = generate_headers(login_resp['accessToken']['token'])
     file_id = test_user_with_pdf.hash_id
+    # as done when the file is annotated
+    get_manual_annotation_service().index_file_annotations([test_user_with_pdf.id])
 
     response = client.post(
         f'/filesystem/objects/{file_id}/annotations/gene-counts',
@@ -43,6 +46,8 @@ def test_user_can_get_all_annotations_from_pdf(
     login_resp = client.login_as_user(fix_admin_user.email, 'password')
     headers = generate_headers(login_resp['accessToken']['token'])
     file_id = test_user_with_pdf.hash_id
+    # as done when the file is annotated
+    get_manual_annotation_service().index_file_annotations([test_user_with_pdf.id])
 
     response = client.post(
         f'/filesystem/objects/{file_id}/annotations/counts',
@@ -25,6 +25,14 @@ from neo4japp.services.annotations.constants import (
     SPECIES_LMDB,
 )
 from neo4japp.services.annotations.data_transfer_objects import GeneOrProteinToOrganism
+from neo4japp.services.annotations.global_annotations_cache import (
+    global_annotations_cache,
+)
+from neo4japp.services.annotations.lmdb_connection import (
+    lmdb_environment_pool,
+    lmdb_value_cache,
+)
+from neo4japp.services.annotations.organism_match_cache import organism_match_cache
 from neo4japp.services.annotations.utils.lmdb import (
     create_ner_type_anatomy,
     create_ner_type_chemical,
@@ -51,6 +59,16 @@ def teardown():
                 remove(path.join(parent, fn))
 
 
+@pytest.fixture(autouse=True)
+def clear_annotation_caches():
+    # the LMDB files and globals are recreated by every test
+    yield
+    lmdb_environment_pool.clear()
+    lmdb_value_cache.clear()
+    global_annotations_cache.clear()
+    organism_match_cache.clear()
+
+
 def create_empty_lmdb(path_to_folder: str, db_name: str):
     map_size = 1099511627776
     env = lmdb.open(path.join(directory, path_to_folder), map_size=map_size, max_dbs=2)
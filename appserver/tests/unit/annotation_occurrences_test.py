@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+from neo4japp.services.annotations.manual_annotation_service import (
+    ManualAnnotationService,
+)
+
+
+def _annotation(entity_id, entity_type, text, primary_name, keyword=True):
+    annotation = {
+        'meta': {'id': entity_id, 'type': entity_type, 'allText': text},
+        'textInDocument': text,
+        'primaryName': primary_name,
+    }
+    if keyword:
+        annotation['keyword'] = text
+    return annotation
+
+
+def test_annotation_occurrences():
+    file = SimpleNamespace(
+        id=1,
+        annotations={
+            'documents': [
+                {
+                    'passages': [
+                        {
+                            'annotations': [
+                                _annotation('59272', 'Gene', ' ace2 ', 'ACE2'),
+                                _annotation('9606', 'Species', 'human', 'Homo'),
+                                _annotation('59272', 'Gene', 'ACE2', 'ACE2'),
+                                _annotation('9606', 'Species', 'Human', 'Homo'),
+                            ]
+                        }
+                    ]
+                }
+            ]
+        },
+        excluded_annotations=[
+            {'type': 'Species', 'text': 'human', 'isCaseInsensitive': False}
+        ],
+        custom_annotations=[
+            _annotation('MESH:D006973', 'Disease', 'hypertension', '', keyword=False)
+        ],
+    )
+
+    service = ManualAnnotationService(tokenizer=None, arango_client=None)
+
+    assert service.get_annotation_occurrences(file) == [
+        {
+            'file_id': 1,
+            'entity_id': '59272',
+            'type': 'Gene',
+            'keyword': 'ace2',
+            'primary_name': 'ACE2',
+            'count': 2,
+        },
+        {
+            'file_id': 1,
+            'entity_id': '9606',
+            'type': 'Species',
+            'keyword': 'Human',
+            'primary_name': 'Homo',
+            'count': 1,
+        },
+        {
+            'file_id': 1,
+            'entity_id': 'MESH:D006973',
+            'type': 'Disease',
+            'keyword': 'hypertension',
+            'primary_name': '',
+            'count': 1,
+        },
+    ]
@@ -0,0 +1,46 @@
+from fakeredis import FakeStrictRedis
+
+from neo4japp.services.annotations import bulk_reannotation
+from neo4japp.services.annotations.bulk_reannotation import (
+    ReannotationProgress,
+    enqueue_reannotation,
+    reannotate_batch,
+)
+from neo4japp.services.annotations.constants import REANNOTATION_QUEUE
+from neo4japp.services.redis import redis_queue_service
+
+
+def test_reannotation_progress():
+    progress = ReannotationProgress(FakeStrictRedis())
+    progress.reset(5)
+
+    progress.mark_done([1, 2], {3: 'failed'})
+    assert progress.total == 5
+    assert progress.get_done_ids() == {1, 2, 3}
+    assert progress.get_failures() == {3: 'failed'}
+    assert progress.get_counts() == (3, 1)
+
+    # a resumed run annotates the failed file again
+    progress.mark_done([3, 4], {})
+    assert progress.get_done_ids() == {1, 2, 3, 4}
+    assert progress.get_failures() == {}
+    assert progress.get_counts() == (4, 0)
+
+    progress.reset(2)
+    assert progress.total == 2
+    assert progress.get_counts() == (0, 0)
+
+
+def test_enqueue_reannotation(app, monkeypatch):
+    redis_conn = FakeStrictRedis()
+    monkeypatch.setattr(redis_queue_service, 'get_redis_connection', lambda: redis_conn)
+
+    assert enqueue_reannotation([1, 2, 3, 4, 5], 7, batch_size=2) == 3
+
+    queue = redis_queue_service.RedisQueueService().get_queue(REANNOTATION_QUEUE)
+    jobs = queue.jobs
+    assert [job.args for job in jobs] == [([1, 2], 7), ([3, 4], 7), ([5], 7)]
+    assert all(job.func is reannotate_batch for job in jobs)
+    assert all(
+        job.retries_left == bulk_reannotation.REANNOTATION_JOB_MAX_RETRY for job in jobs
+    )
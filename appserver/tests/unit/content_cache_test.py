@@ -0,0 +1,118 @@
+import marshal
+import time
+import zlib
+
+from fakeredis import FakeStrictRedis
+
+from neo4japp.services.annotations import content_cache
+from neo4japp.services.annotations.constants import CONTENT_CACHE_TTL
+from neo4japp.services.annotations.content_cache import (
+    ContentCache,
+    dump_parsed,
+    load_parsed,
+)
+from neo4japp.services.annotations.utils.parsing import process_parsed_content
+
+
+def _token(text, idx, x, y, abbrev=False):
+    return {
+        'text': text,
+        'pgIdx': idx,
+        'possibleAbbrev': abbrev,
+        'rects': [
+            {
+                'lowerLeftPt': {'x': x, 'y': y},
+                'width': 5.5,
+                'height': 10.0,
+                'rotation': 0,
+            }
+        ],
+    }
+
+
+def test_parsed_content_round_trip():
+    text, parsed = process_parsed_content(
+        {
+            'pages': [
+                {
+                    'pageNo': 1,
+                    'pageText': 'Homo sapiens (HS)',
+                    'tokens': [
+                        _token('Homo', 0, 1.0, 2.0),
+                        _token('sapiens', 5, 7.0, 2.0),
+                        _token('HS', 14, 15.5, 2.0, abbrev=True),
+                    ],
+                },
+                {
+                    'pageNo': 2,
+                    'pageText': 'TP53',
+                    'tokens': [_token('TP53', 17, 1.0, 30.0)],
+                },
+            ]
+        }
+    )
+
+    # values go through marshal in the cache
+    loaded_text, loaded = load_parsed(
+        marshal.loads(marshal.dumps(dump_parsed(text, parsed)))
+    )
+
+    assert loaded_text == text
+    assert loaded == parsed
+    assert [w.coordinates for w in loaded] == [w.coordinates for w in parsed]
+    assert [w.heights for w in loaded] == [w.heights for w in parsed]
+
+
+def test_empty_parsed_content_round_trip():
+    assert load_parsed(dump_parsed('', [])) == ('', [])
+
+
+def test_content_cache_eviction(app, monkeypatch):
+    server = FakeStrictRedis()
+    monkeypatch.setattr(content_cache, 'get_redis_cache_server', lambda: server)
+    monkeypatch.setitem(app.config, 'ANNOTATION_CONTENT_CACHE', True)
+    cache = ContentCache('test', 'TEST_CACHE_MAX_SIZE')
+
+    value = 'x' * 1000
+    size = len(zlib.compress(marshal.dumps(value, 4), 1))
+    monkeypatch.setitem(app.config, 'TEST_CACHE_MAX_SIZE', 2 * size)
+
+    cache.set('a', value)
+    cache.set('b', value)
+    # replacing a value does not count it twice
+    cache.set('b', value)
+    assert int(server.hget(cache.stats_key, 'total')) == 2 * size
+
+    # 'a' is now the most recently used, 'b' is evicted
+    assert cache.get('a') == value
+    cache.set('c', value)
+    assert cache.get('b') is None
+    assert cache.get('c') == value
+    assert int(server.hget(cache.stats_key, 'total')) == 2 * size
+
+    # expired values are dropped from the total
+    server.delete(cache._data_key('a'))
+    assert cache.get('a') is None
+    assert server.hkeys(cache.sizes_key) == [b'c']
+    assert int(server.hget(cache.stats_key, 'total')) == size
+
+
+def test_content_cache_evicts_stale_keys(app, monkeypatch):
+    server = FakeStrictRedis()
+    monkeypatch.setattr(content_cache, 'get_redis_cache_server', lambda: server)
+    monkeypatch.setitem(app.config, 'ANNOTATION_CONTENT_CACHE', True)
+    monkeypatch.setitem(app.config, 'TEST_CACHE_MAX_SIZE', 10000)
+    cache = ContentCache('test', 'TEST_CACHE_MAX_SIZE')
+
+    cache.set('old', 'x' * 1000)
+    cache.set('new', 'y' * 1000)
+    # last used before the TTL, the value is gone
+    server.zadd(cache.lru_key, {'old': time.time() - CONTENT_CACHE_TTL - 1})
+    server.delete(cache._data_key('old'))
+
+    # over the size with a value as large as the stale one
+    total = int(server.hget(cache.stats_key, 'total'))
+    monkeypatch.setitem(app.config, 'TEST_CACHE_MAX_SIZE', total)
+    cache.set('other', 'z' * 1000)
+    assert server.zrange(cache.lru_key, 0, -1) == [b'new', b'other']
+    assert cache.get('new') == 'y' * 1000
@@ -0,0 +1,107 @@
+from fakeredis import FakeStrictRedis
+from rq.job import Job
+
+from neo4japp.services.elastic import index_journal
+from neo4japp.services.elastic.index_journal import (
+    ElasticIndexJournal,
+    JournalBatch,
+    apply_journal_batch,
+    process_elastic_index_journal,
+)
+from neo4japp.services.redis import redis_queue_service
+from neo4japp.services.redis.redis_queue_service import RedisQueueService
+
+
+def test_journal_coalesces_changes(app, monkeypatch):
+    redis_conn = FakeStrictRedis()
+    monkeypatch.setattr(redis_queue_service, 'get_redis_connection', lambda: redis_conn)
+    registry = RedisQueueService().get_queue().scheduled_job_registry
+    journal = ElasticIndexJournal(redis_conn)
+
+    journal.record(index=['a', 'b'], updates={'a': ['filename'], 'c': {'doi'}})
+    journal.record(index=['a'], updates={'c': ['doi', 'public']}, delete=['d'])
+    # one job applies every change recorded in the window
+    assert registry.count == 1
+    job = Job.fetch(registry.get_job_ids()[0], connection=redis_conn)
+    assert job.func is process_elastic_index_journal
+
+    batch = journal.pop(10)
+    assert batch == JournalBatch(
+        {'a', 'b'}, {'a': {'filename'}, 'c': {'doi', 'public'}}, {'d'}
+    )
+    assert len(batch) == 4
+    assert not journal.pop(10)
+
+    # a batch which could not be applied is kept for the next job
+    journal.restore(batch)
+    assert journal.pop(10) == batch
+    assert registry.count == 1
+
+    journal.unschedule()
+    journal.record(delete=['e'])
+    assert registry.count == 2
+
+
+def test_journal_pops_in_batches():
+    journal = ElasticIndexJournal(FakeStrictRedis())
+    # the job applying the changes is already scheduled
+    journal._redis.set(journal.scheduled_key, 1)
+
+    journal.record(index=['a', 'b', 'c'])
+    first, second = journal.pop(2), journal.pop(2)
+    assert len(first.index) == 2 and len(second.index) == 1
+    assert first.index | second.index == {'a', 'b', 'c'}
+
+
+def test_apply_journal_batch(app, monkeypatch):
+    # folder -> descendants, the deleted ones only when include_deleted
+    descendants = {
+        'deleted-folder': (['deleted-child'], []),
+        'moved-folder': (
+            ['moved-child', 'new', 'recycled-child'],
+            ['moved-child', 'new'],
+        ),
+    }
+    monkeypatch.setattr(
+        index_journal,
+        '_get_descendant_hash_ids',
+        lambda hash_ids, include_deleted: {
+            hash_id: descendants[hash_id][0 if include_deleted else 1]
+            for hash_id in hash_ids
+            if hash_id in descendants
+        },
+    )
+    monkeypatch.setattr(
+        index_journal, 'get_file_index_write_ids', lambda: ['files', 'files-new']
+    )
+    applied = []
+
+    class ElasticService:
+        def apply_file_changes(self, *args, **kwargs):
+            applied.append((*args, kwargs['index_id']))
+
+    monkeypatch.setattr(index_journal, 'get_elastic_service', ElasticService)
+
+    apply_journal_batch(
+        JournalBatch(
+            index={'new', 'deleted-child'},
+            updates={
+                'moved-folder': {'path', 'project_id', 'description'},
+                'new': {'filename'},
+                'deleted-folder': {'public'},
+            },
+            delete={'deleted-folder'},
+        )
+    )
+
+    changes = (
+        # a full index supersedes the updates, a delete supersedes both
+        ['new'],
+        {
+            'moved-folder': {'path', 'project_id', 'description'},
+            # only the fields derived from the location of the folder
+            'moved-child': {'path', 'project_id'},
+        },
+        ['deleted-child', 'deleted-folder'],
+    )
+    assert applied == [(*changes, 'files'), (*changes, 'files-new')]
@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+from neo4japp.services.elastic import ElasticService
+
+
+def _file(file_id, checksum):
+    return SimpleNamespace(
+        id=file_id,
+        hash_id=f'file-{file_id}',
+        mime_type='application/pdf',
+        content=SimpleNamespace(checksum_sha256=checksum),
+    )
+
+
+def test_only_out_of_date_documents_are_indexed(app, monkeypatch):
+    service = ElasticService.__new__(ElasticService)
+    unchanged, changed, remapped, new = (
+        _file(1, b'a'),
+        _file(2, b'b'),
+        _file(3, b'c'),
+        _file(4, b'd'),
+    )
+    indexed_states = {
+        unchanged.id: service._get_index_state(unchanged, 'v2'),
+        changed.id: service._get_index_state(_file(2, b'old'), 'v2'),
+        remapped.id: service._get_index_state(remapped, 'v1'),
+    }
+    monkeypatch.setattr(service, '_get_index_name', lambda index_id: 'files-1')
+    monkeypatch.setattr(service, '_get_mapping_version', lambda: 'v2')
+    monkeypatch.setattr(
+        service, '_get_indexed_states', lambda index_name, file_ids: indexed_states
+    )
+    monkeypatch.setattr(
+        service, '_get_document_metadata', lambda file, project: {'id': file.id}
+    )
+    monkeypatch.setattr(
+        service,
+        '_get_index_obj',
+        lambda file, project, index_id: {'_index': index_id, '_id': file.hash_id},
+    )
+
+    index_states = {}
+    actions = list(
+        service._lazy_create_index_docs_for_streaming_bulk(
+            [(file, None) for file in [unchanged, changed, remapped, new]],
+            'files',
+            index_states,
+        )
+    )
+
+    assert actions == [
+        {'_op_type': 'update', '_index': 'files', '_id': 'file-1', 'doc': {'id': 1}},
+        {'_index': 'files', '_id': 'file-2'},
+        {'_index': 'files', '_id': 'file-3'},
+        {'_index': 'files', '_id': 'file-4'},
+    ]
+    assert index_states == {
+        file.hash_id: service._get_index_state(file, 'v2')
+        for file in [changed, remapped, new]
+    }
+
+
+def test_missing_documents_are_fully_indexed(app, monkeypatch):
+    service = ElasticService.__new__(ElasticService)
+    # the state of file-1 says its document is up to date, though elastic lost it
+    indexed_states = {'files-1': {'file-1', 'file-2'}}
+    monkeypatch.setattr(service, '_get_index_name', lambda index_id: 'files-1')
+    monkeypatch.setattr(
+        service,
+        '_delete_index_states',
+        lambda index_names, hash_ids: [
+            indexed_states[index_name].difference_update(hash_ids)
+            for index_name in index_names
+        ],
+    )
+    monkeypatch.setattr(
+        service,
+        '_get_index_actions',
+        lambda hash_ids, index_id, index_states: [
+            {'_op_type': 'update', '_index': index_id, '_id': hash_id}
+            if hash_id in indexed_states['files-1']
+            else {'_index': index_id, '_id': hash_id}
+            for hash_id in hash_ids
+        ],
+    )
+    sent = []
+    monkeypatch.setattr(
+        service, '_streaming_bulk_documents', lambda actions: sent.extend(actions) or []
+    )
+    monkeypatch.setattr(service, '_save_index_states', lambda *args: None)
+
+    service._index_missing_documents(
+        [
+            {'update': {'_id': 'file-1', 'status': 404}},
+            {'update': {'_id': 'file-3', 'status': 500}},
+        ],
+        'files',
+    )
+
+    assert sent == [{'_index': 'files', '_id': 'file-1'}]
+    assert indexed_states == {'files-1': {'file-2'}}
@@ -0,0 +1,39 @@
+from fakeredis import FakeStrictRedis
+
+from neo4japp.services.elastic.reindex import ReindexProgress
+
+
+def test_reindex_progress():
+    progress = ReindexProgress(FakeStrictRedis())
+    progress.reset('files-2', [(1, 10, 8), (11, 30, 8)], new=True)
+
+    assert progress.index_id == 'files-2'
+    assert progress.building_index_id == 'files-2'
+    assert progress.total == 16
+    assert progress.get_partitions() == {0: (1, 10), 1: (11, 30)}
+    assert progress.get_checkpoint(1) is None
+
+    progress.checkpoint(1, 20, 5, [12, 14])
+    progress.checkpoint(0, 10, 8, [])
+    assert progress.get_checkpoint(1) == 20
+    assert progress.get_counts() == (13, 2)
+
+    # a resumed run indexes the failed files again
+    assert progress.pop_failed_ids() == {12, 14}
+    assert progress.get_counts() == (13, 0)
+
+    progress.finish_building()
+    assert progress.building_index_id is None
+
+    progress.reset('files', [(1, 30, 16)], new=False)
+    assert progress.building_index_id is None
+    assert progress.get_partitions() == {0: (1, 30)}
+    assert progress.get_checkpoint(1) is None
+    assert progress.get_counts() == (0, 0)
+
+    # documents copied to a new index
+    progress.start_building('files-3')
+    assert progress.building_index_id == 'files-3'
+    assert progress.total == 16
+    progress.finish_building()
+    assert progress.building_index_id is None
@@ -0,0 +1,26 @@
+import pytest
+
+from neo4japp.models.files import _get_changed_elastic_fields
+
+
+@pytest.mark.parametrize(
+    'changes, expected',
+    [
+        ({'annotations': [{}, {}], 'modified_date': [None, None]}, set()),
+        ({'description': ['old', 'new']}, {'description'}),
+        (
+            {'filename': ['a.pdf', 'b.pdf'], 'path': ['/p/a.pdf', '/p/b.pdf']},
+            {'filename', 'path'},
+        ),
+        (
+            {'parent_id': [1, 2], 'path': ['/p/a', '/q/a']},
+            {'path', 'project_id', 'project_hash_id', 'project_name'},
+        ),
+        (
+            {'public': [False, True], 'user_id': [1, 2]},
+            {'public', 'user_id', 'username'},
+        ),
+    ],
+)
+def test_get_changed_elastic_fields(changes, expected):
+    assert _get_changed_elastic_fields(changes) == expected
@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+from neo4japp.utils.json_stream import iter_json_array
+
+
+def _chunked(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 1024 * 1024])
+def test_iter_json_array(chunk_size):
+    pages = [
+        {'pageNo': 1, 'pageText': 'Homo sapiens ', 'tokens': [{'pgIdx': 0}]},
+        {'pageNo': 2, 'pageText': 'β-actin 12.5e3', 'tokens': []},
+    ]
+    other: dict = {}
+    data = json.dumps({'version': 12, 'pages': pages, 'done': True}).encode('utf-8')
+
+    assert list(iter_json_array(_chunked(data, chunk_size), 'pages', other)) == pages
+    assert other == {'version': 12, 'done': True}
+
+
+def test_iter_json_array_empty():
+    assert list(iter_json_array([b'{"pages": []}'], 'pages')) == []
+    assert list(iter_json_array([b'{}'], 'pages')) == []
+
+
+def test_iter_json_array_truncated():
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'{"pages": [{"pageNo": 1}, {"pag'], 'pages'))
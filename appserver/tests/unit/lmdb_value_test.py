@@ -0,0 +1,40 @@
+import pytest
+
+from neo4japp.exceptions import ServerException
+from neo4japp.services.annotations.constants import LMDBValueFormat
+from neo4japp.services.annotations.utils.lmdb import (
+    LMDB_BINARY_VALUE_PREFIX,
+    create_ner_type_gene,
+    create_ner_type_species,
+    decode_lmdb_value,
+    encode_lmdb_value,
+)
+
+
+@pytest.mark.parametrize(
+    'value_format', [LMDBValueFormat.JSON.value, LMDBValueFormat.BINARY.value]
+)
+@pytest.mark.parametrize(
+    'entity',
+    [
+        create_ner_type_gene(name='TP53', synonym='p53'),
+        create_ner_type_species(
+            id='9606', category='Eukaryota', name='Homo sapiens', synonym='human'
+        ),
+        create_ner_type_gene(name='β-actin', synonym='ACTB'),
+    ],
+)
+def test_lmdb_value_round_trip(value_format, entity):
+    assert decode_lmdb_value(encode_lmdb_value(entity, value_format)) == entity
+
+
+def test_lmdb_json_value_is_unchanged():
+    entity = create_ner_type_gene(name='TP53', synonym='p53')
+    assert encode_lmdb_value(entity).startswith(b'{')
+
+
+def test_lmdb_binary_value_of_other_python_version():
+    entity = create_ner_type_gene(name='TP53', synonym='p53')
+    value = encode_lmdb_value(entity, LMDBValueFormat.BINARY.value)
+    with pytest.raises(ServerException):
+        decode_lmdb_value(LMDB_BINARY_VALUE_PREFIX + bytes([2, 7]) + value[3:])
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from scipy.stats import mannwhitneyu
+
+from neo4japp.services.annotations.sorted_annotation_service import (
+    mannwhitneyu_greater,
+)
+
+# files x annotation ids, 0 where the id does not occur
+COUNTS = np.array(
+    [
+        [3, 0, 1, 0, 2],
+        [1, 0, 0, 4, 2],
+        [0, 1, 1, 0, 0],
+        [5, 0, 2, 1, 1],
+        [2, 0, 0, 0, 1],
+        [0, 2, 1, 3, 0],
+        [1, 0, 0, 0, 1],
+        [4, 1, 3, 0, 0],
+        [0, 0, 1, 2, 1],
+        [2, 0, 0, 0, 3],
+    ]
+)
+
+
+def test_mannwhitneyu_greater_with_zeros():
+    files, keys = np.nonzero(COUNTS)
+    pvalues = mannwhitneyu_greater(
+        COUNTS[files, keys], keys, np.full(COUNTS.shape[1], COUNTS.shape[0])
+    )
+
+    for key in range(COUNTS.shape[1]):
+        mask = np.zeros(COUNTS.shape, dtype=bool)
+        mask[:, key] = True
+        expected = mannwhitneyu(COUNTS[mask], COUNTS[~mask], alternative='greater')
+        assert pvalues[key] == pytest.approx(expected.pvalue)
+
+
+def test_mannwhitneyu_greater_per_group():
+    values = np.array([1, 3, 2, 2, 1, 4, 1, 1, 2, 3, 1, 2, 1, 2, 5, 1, 1, 2])
+    codes = np.array([0, 1, 2, 0, 0, 1, 2, 2, 0, 1, 0, 2, 0, 1, 1, 2, 0, 2])
+    pvalues = mannwhitneyu_greater(values, codes, np.bincount(codes))
+
+    for group in range(3):
+        expected = mannwhitneyu(
+            values[codes == group], values[codes != group], alternative='greater'
+        )
+        assert pvalues[group] == pytest.approx(expected.pvalue)
+
+
+def test_mannwhitneyu_greater_identical_values():
+    pvalues = mannwhitneyu_greater(np.ones(4), np.array([0, 1, 0, 1]), np.array([2, 2]))
+    assert list(pvalues) == [1, 1]
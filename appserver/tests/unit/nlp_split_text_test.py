@@ -0,0 +1,43 @@
+import pytest
+
+from neo4japp.services.annotations.utils.nlp import split_text
+
+
+@pytest.mark.parametrize(
+    'text',
+    [
+        '',
+        'Short text.',
+        'First sentence. Second sentence! Third one? And the last one.',
+        'A line\nanother line\n\nand a paragraph.',
+        'averyveryverylongwordwithoutanyspaceorsentenceend and more words',
+    ],
+)
+def test_split_text_covers_the_text(text):
+    windows = split_text(text, 20)
+
+    assert ''.join(window for _, window in windows) == text
+    for offset, window in windows:
+        assert len(window) <= 20
+        assert text[offset : offset + len(window)] == window
+
+
+def test_split_text_cuts_after_sentences():
+    windows = split_text('First sentence. Second sentence. Third.', 20)
+
+    assert [window for _, window in windows] == [
+        'First sentence. ',
+        'Second sentence. ',
+        'Third.',
+    ]
+
+
+def test_split_text_falls_back_to_whitespace():
+    windows = split_text('one two three four five six', 10)
+
+    assert [window for _, window in windows] == [
+        'one two ',
+        'three ',
+        'four five ',
+        'six',
+    ]
@@ -0,0 +1,44 @@
+from math import inf
+
+import pytest
+
+from neo4japp.services.annotations.annotation_service import OrganismLocationIndex
+
+POSITIONS = [(0, 5), (10, 40), (12, 14), (50, 55), (90, 99)]
+
+
+def closest_distance(positions, lo, hi):
+    return min(
+        (lo - p_hi if lo > p_hi else p_lo - hi for p_lo, p_hi in positions),
+        default=inf,
+    )
+
+
+@pytest.mark.parametrize(
+    'lo, hi', [(0, 2), (7, 8), (20, 25), (45, 47), (60, 70), (100, 101)]
+)
+def test_closest_distance(lo, hi):
+    index = OrganismLocationIndex({'9606': POSITIONS}, {'9606': len(POSITIONS)})
+
+    assert index.closest_distance('9606', lo, hi) == closest_distance(POSITIONS, lo, hi)
+
+
+@pytest.mark.parametrize(
+    'lo, hi', [(0, 2), (7, 8), (20, 25), (45, 47), (60, 70), (100, 101)]
+)
+def test_closest_distance_above_only(lo, hi):
+    index = OrganismLocationIndex({'9606': POSITIONS}, {'9606': len(POSITIONS)})
+    above = [p for p in POSITIONS if p < (lo, hi)]
+
+    assert index.closest_distance('9606', lo, hi, above_only=True) == closest_distance(
+        above, lo, hi
+    )
+
+
+def test_most_frequent():
+    index = OrganismLocationIndex(
+        {'9606': [(0, 5)], '562': [(10, 12)]}, {'9606': 1, '562': 3}
+    )
+
+    assert index.most_frequent == '562'
+    assert OrganismLocationIndex({}, {}).most_frequent is None
@@ -3,6 +3,7 @@ import pytest
 from decimal import Decimal
 from enum import Enum
 
+from neo4japp.utils.collections import chunked
 from neo4japp.utils.string import (
     camel_to_snake,
     camel_to_snake_dict,
@@ -66,3 +67,16 @@ class MockEnum(Enum):
 )
 def test_can_encode_to_str(data_input, expected_output):
     assert encode_to_str(data_input) == expected_output
+
+
+@pytest.mark.parametrize(
+    "seq, n, expected",
+    [
+        ([], 2, []),
+        ([1, 2, 3], 2, [[1, 2], [3]]),
+        (range(4), 2, [[0, 1], [2, 3]]),
+        ((x for x in 'abc'), 5, [['a', 'b', 'c']]),
+    ],
+)
+def test_chunked(seq, n, expected):
+    assert list(chunked(seq, n)) == expected
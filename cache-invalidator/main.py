@@ -1,20 +1,56 @@
 from arango import ArangoClient
 from arango.database import StandardDatabase
 from arango.http import DefaultHTTPClient
+from array import array
 from collections import defaultdict
+from contextlib import contextmanager
+import hashlib
 import json
 import logging
 import os
 import redis
+import sys
 import time
-from typing import Any, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Union
 
 
-SUCCESSFUL_SLEEP_TIME = 3600 * 24  # refresh cached data this often
+# check the KG for changes this often, only what changed is recomputed
+SUCCESSFUL_SLEEP_TIME = 3600
 ERROR_INITIAL_SLEEP_TIME = 60  # if error occurs, try again sooner
 ERROR_SLEEP_TIME_MULTIPLIER = 2  # on subsequent errors, sleep longer
 ERROR_MAX_SLEEP_TIME = 3600 * 6  # but not longer than this
 CACHE_EXPIRATION_TIME = 3600 * 24 * 14  # expire cached data
+GO_INDEX_FORMAT = '1'  # must match the statistical-enrichment reader
+
+# state of the last refresh, kept in redis so that restarts do not recompute
+FINGERPRINTS_KEY = 'cache_invalidator:fingerprints'
+GO_ORGANISMS_KEY = 'cache_invalidator:go_organisms'
+TIMINGS_KEY = 'cache_invalidator:timings'
+
+KG_STATISTICS_DOMAINS = {
+    'literature': 'Literature',
+    'go': 'GO',
+    'pubmed': 'PubMed',
+    'mesh': 'MESH',
+    'uniprot': 'UniProt',
+    'chebi': 'CHEBI',
+    'enzyme': 'Enzyme',
+    'regulondb': 'RegulonDB',
+    'string': 'String',
+    'kegg': 'KEGG',
+    'lifelike': 'Lifelike',
+}
+BIOCYC_SUB_DOMAINS = [
+    'db_HumanCyc',
+    'db_PseudomonasCyc',
+    'db_YeastCyc',
+    'db_BsubCyc',
+    'db_EcoCyc',
+]
+KG_STATISTICS_COLLECTIONS = [*KG_STATISTICS_DOMAINS, 'ncbi', 'taxonomy', 'biocyc']
+# collections the names of the precalculated GO terms and genes come from,
+# changes to go_link are tracked per organism
+GO_NAME_COLLECTIONS = ['go', 'taxonomy', 'ncbi', 'biocyc']
 
 DEFAULT_LOG_LEVEL = logging.DEBUG
 
@@ -37,21 +73,111 @@ def _get_redis_connection_url():
     return f'{connection_prefix}://:{password}@{host}:{port}/0'
 
 
-def _cache_data(key, value):
-    # Establish Redis Connection
-    redis_server = redis.Redis(
-        connection_pool=redis.BlockingConnectionPool.from_url(
-            _get_redis_connection_url()
+_redis_server: Optional[redis.Redis] = None
+
+
+def _get_redis() -> redis.Redis:
+    """Returns the connection of the daemon, shared by every refresh."""
+    global _redis_server
+    if _redis_server is None:
+        _redis_server = redis.Redis(
+            connection_pool=redis.BlockingConnectionPool.from_url(
+                _get_redis_connection_url()
+            )
         )
-    )
+    return _redis_server
+
+
+def _cache_data(pipe, key, value):
+    pipe.set(key, json.dumps(value), ex=CACHE_EXPIRATION_TIME)
+
+
+def _cache_hash(pipe, key, mapping: Dict[str, Any]):
+    # in a transaction, readers never see a partial hash
+    pipe.delete(key)
+    pipe.hset(key, mapping=mapping)
+    pipe.expire(key, CACHE_EXPIRATION_TIME)
+
+
+def _keep_cached(keys: Iterable[str]):
+    """Extends the expiration of cached data that is still up to date."""
+    pipe = _get_redis().pipeline(transaction=False)
+    for key in keys:
+        pipe.expire(key, CACHE_EXPIRATION_TIME)
+    return pipe.execute()
+
+
+def _exists(keys: Iterable[str]) -> List[bool]:
+    pipe = _get_redis().pipeline(transaction=False)
+    for key in keys:
+        pipe.exists(key)
+    return [bool(exists) for exists in pipe.execute()]
+
+
+@contextmanager
+def _timed(step: str):
+    """Logs the duration of a refresh step, the last ones are kept in redis."""
+    start = time.monotonic()
     try:
-        redis_server.set(key, json.dumps(value))
-        redis_server.expire(key, CACHE_EXPIRATION_TIME)
-    except:
-        redis_server.connection_pool.disconnect()
-        raise
-    else:
-        redis_server.connection_pool.disconnect()
+        yield
+    finally:
+        elapsed = time.monotonic() - start
+        logger.info(f'{step} took {elapsed:.1f}s')
+        try:
+            _get_redis().hset(
+                TIMINGS_KEY, mapping={step: f'{elapsed:.3f}', f'{step}_at': time.time()}
+            )
+        except redis.RedisError as err:
+            logger.warning(f'Could not record timing of {step}: {err}')
+
+
+def _int32_bytes(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _dump_go_index(go_terms: List[dict]) -> Dict[str, Any]:
+    """Serializes the GO terms of an organism for the statistical-enrichment:
+    the gene names are stored once, and the genes of term `t` are the
+    `indices[indptr[t]:indptr[t + 1]]` gene names (little endian int32 arrays).
+    The version is a hash of the content, unchanged data keeps the in-memory
+    copies of the readers valid.
+    """
+    gene_ids: Dict[str, int] = {}
+    terms = []
+    indptr = array('i', [0])
+    indices = array('i')
+    for go_term in go_terms:
+        terms.append([go_term['goId'], go_term['goTerm'], go_term['goLabel']])
+        for gene_name in go_term['geneNames']:
+            indices.append(gene_ids.setdefault(gene_name, len(gene_ids)))
+        indptr.append(len(indices))
+
+    index: Dict[str, Union[str, bytes]] = {
+        'format': GO_INDEX_FORMAT,
+        'genes': json.dumps(list(gene_ids)),
+        'terms': json.dumps(terms),
+        'indptr': _int32_bytes(indptr),
+        'indices': _int32_bytes(indices),
+    }
+    version = hashlib.sha1()
+    for field in ('genes', 'terms', 'indptr', 'indices'):
+        value = index[field]
+        version.update(value.encode('utf-8') if isinstance(value, str) else value)
+    index['version'] = version.hexdigest()
+    return index
+
+
+def _collections_fingerprint(arango_db: StandardDatabase, names: List[str]) -> str:
+    """Hash of the revisions of the collections, changed by any write to them."""
+    revisions = ','.join(
+        f'{name}:{arango_db.collection(name).revision()}'
+        if arango_db.has_collection(name)
+        else f'{name}:'
+        for name in names
+    )
+    return hashlib.sha1(revisions.encode('utf-8')).hexdigest()
 
 
 def _create_arango_client(hosts=None) -> ArangoClient:
@@ -164,31 +290,18 @@ def _cache_kg_statistics():
     statistics = defaultdict(lambda: defaultdict())
     try:
         arango_db = _get_db(arango_client)
-        logger.info('Kg Statistics Query start...')
-        other_domains = {
-            'literature': 'Literature',
-            'go': 'GO',
-            'pubmed': 'PubMed',
-            'mesh': 'MESH',
-            'uniprot': 'UniProt',
-            'chebi': 'CHEBI',
-            'enzyme': 'Enzyme',
-            'regulondb': 'RegulonDB',
-            'string': 'String',
-            'kegg': 'KEGG',
-            'lifelike': 'Lifelike',
-        }
-
-        biocyc_sub_domains = [
-            'db_HumanCyc',
-            'db_PseudomonasCyc',
-            'db_YeastCyc',
-            'db_BsubCyc',
-            'db_EcoCyc',
-        ]
+        fingerprint = _collections_fingerprint(arango_db, KG_STATISTICS_COLLECTIONS)
+        redis_server = _get_redis()
+        up_to_date = (
+            redis_server.hget(FINGERPRINTS_KEY, 'kg_statistics') == fingerprint.encode()
+        )
+        if up_to_date and _keep_cached(['kg_statistics'])[0]:
+            logger.info('Kg Statistics are up to date')
+            return
 
+        logger.info('Kg Statistics Query start...')
         logger.info('Getting stats for all domains aside from BioCyc and NCBI...')
-        for collection_name, display_name in other_domains.items():
+        for collection_name, display_name in KG_STATISTICS_DOMAINS.items():
             stats = _execute_arango_query(
                 arango_db, _entity_count_in_domain_query(collection_name)
             )
@@ -213,7 +326,7 @@ def _cache_kg_statistics():
         biocyc_stats = _execute_arango_query(
             arango_db,
             _entity_count_in_biocyc_query(),
-            biocyc_sub_domains=biocyc_sub_domains,
+            biocyc_sub_domains=BIOCYC_SUB_DOMAINS,
         )
         for entity_row in biocyc_stats:
             statistics['BioCyc'][entity_row.get('entity')] = entity_row.get('count')
@@ -222,28 +335,29 @@ def _cache_kg_statistics():
         entities_count_in_biocyc_subdomains = _execute_arango_query(
             arango_db,
             _entity_count_in_biocyc_subdomain_query(),
-            biocyc_sub_domains=biocyc_sub_domains,
+            biocyc_sub_domains=BIOCYC_SUB_DOMAINS,
         )
         for domain_row in entities_count_in_biocyc_subdomains:
             domain = domain_row.get('domain').split('_')[1]
             statistics[domain] = defaultdict(lambda: defaultdict())
             for entity_row in domain_row.get('entities'):
                 statistics[domain][entity_row.get('entity')] = entity_row.get('count')
-    except:
-        arango_client.close()
-        raise
-    else:
+    finally:
         arango_client.close()
-        logger.info('Kg Statistics Query finished with data:')
-        logger.info(json.dumps(statistics, indent=4))
-        _cache_data('kg_statistics', statistics)
+
+    logger.info('Kg Statistics Query finished with data:')
+    logger.info(json.dumps(statistics, indent=4))
+    pipe = redis_server.pipeline()
+    _cache_data(pipe, 'kg_statistics', statistics)
+    pipe.hset(FINGERPRINTS_KEY, 'kg_statistics', fingerprint)
+    pipe.execute()
 
 
 def _get_organism_genes_go_terms_query() -> str:
     return '''
         LET go_links_grouped_by_organism = (
             FOR link IN go_link
-                FILTER link.tax_id != null
+                FILTER link.tax_id IN @organisms
                 COLLECT organism = link.tax_id INTO links
                 RETURN {
                     'organism': organism,
@@ -277,73 +391,140 @@ def _get_organism_genes_go_terms_query() -> str:
     '''
 
 
+def _go_organisms_fingerprint_query() -> str:
+    return '''
+        FOR link IN go_link
+            FILTER link.tax_id != null
+            COLLECT organism = link.tax_id INTO revisions = link._rev
+            RETURN {
+                'organism': organism,
+                'fingerprint': MD5(CONCAT_SEPARATOR(',', SORTED(revisions)))
+            }
+    '''
+
+
+def _go_index_key(organism_id) -> str:
+    return f'GO_index_for_{organism_id}'
+
+
 def _precalculate_go():
     logger.info('Precalculating GO...')
     arango_client = _create_arango_client()
+    redis_server = _get_redis()
 
     try:
         arango_db = _get_db(arango_client)
-        results = _execute_arango_query(
-            arango_db,
-            query=_get_organism_genes_go_terms_query(),
-            # Normally would make a global for this but it's very unlikely we'll ever re-use this
-            # value.
-            batch_size=5,
+        names_fingerprint = _collections_fingerprint(arango_db, GO_NAME_COLLECTIONS)
+        links_fingerprint = _collections_fingerprint(arango_db, ['go_link'])
+        last_names_fingerprint, last_links_fingerprint = redis_server.hmget(
+            FINGERPRINTS_KEY, ['go_names', 'go_links']
+        )
+        names_changed = last_names_fingerprint != names_fingerprint.encode()
+        cached = {
+            organism.decode(): fingerprint.decode()
+            for organism, fingerprint in redis_server.hgetall(GO_ORGANISMS_KEY).items()
+        }
+
+        if not names_changed and last_links_fingerprint == links_fingerprint.encode():
+            expired = [
+                organism
+                for organism, exists in zip(
+                    cached, _keep_cached(map(_go_index_key, cached))
+                )
+                if not exists
+            ]
+            if not expired:
+                logger.info('GO is up to date')
+                return
+            # only the expired indexes need to be recalculated
+            current = {organism: cached[organism] for organism in expired}
+            removed = []
+        else:
+            current = {
+                row['organism']: row['fingerprint']
+                for row in _execute_arango_query(
+                    arango_db, _go_organisms_fingerprint_query()
+                )
+            }
+            removed = [organism for organism in cached if organism not in current]
+
+        if names_changed:
+            changed = list(current)
+        else:
+            exists = _exists(map(_go_index_key, current))
+            changed = [
+                organism
+                for organism, index_exists in zip(current, exists)
+                if not index_exists or cached.get(organism) != current[organism]
+            ]
+        unchanged = current.keys() - set(changed)
+        _keep_cached(map(_go_index_key, unchanged))
+        logger.info(
+            f'GO of {len(changed)} out of {len(current)} organisms changed, '
+            f'{len(removed)} removed'
         )
 
-        for row in results:
-            organism = row['organism']
-            go_terms = row['go_terms']
-            logger.info(f'Caching GO for {organism["name"]} ({organism["id"]})')
-            _cache_data(f'GO_for_{organism["id"]}', go_terms)
-    except:
+        if removed:
+            pipe = redis_server.pipeline()
+            pipe.delete(*map(_go_index_key, removed))
+            pipe.hdel(GO_ORGANISMS_KEY, *removed)
+            pipe.execute()
+
+        if changed:
+            results = _execute_arango_query(
+                arango_db,
+                query=_get_organism_genes_go_terms_query(),
+                # Normally would make a global for this but it's very unlikely we'll ever re-use
+                # this value.
+                batch_size=5,
+                organisms=changed,
+            )
+            for row in results:
+                organism = row['organism']
+                go_terms = row['go_terms']
+                logger.info(f'Caching GO for {organism["name"]} ({organism["id"]})')
+                pipe = redis_server.pipeline()
+                _cache_hash(
+                    pipe, _go_index_key(organism['id']), _dump_go_index(go_terms)
+                )
+                pipe.hset(GO_ORGANISMS_KEY, organism['id'], current[organism['id']])
+                pipe.execute()
+
+        # only recorded once every organism is cached, so that a failed
+        # refresh is retried in full
+        redis_server.hset(
+            FINGERPRINTS_KEY,
+            mapping={'go_names': names_fingerprint, 'go_links': links_fingerprint},
+        )
+    finally:
         arango_client.close()
-        raise
-    arango_client.close()
 
 
 def main():
     next_error_sleep_time = ERROR_INITIAL_SLEEP_TIME
-    kg_statistics_successful = False
-    precalculate_go_successful = False
-    time_slept_since_reset = 0
     while True:
-        if time_slept_since_reset >= SUCCESSFUL_SLEEP_TIME:
-            kg_statistics_successful = False
-            precalculate_go_successful = False
-        try:
-            if not kg_statistics_successful:
-                _cache_kg_statistics()
-                kg_statistics_successful = True
-        except Exception as err:
-            logger.error(err)
-            kg_statistics_successful = False
-        finally:
+        successful = True
+        for step in (_cache_kg_statistics, _precalculate_go):
             try:
-                if not precalculate_go_successful:
-                    _precalculate_go()
-                    precalculate_go_successful = True
+                with _timed(step.__name__.lstrip('_')):
+                    step()
             except Exception as err:
                 logger.error(err)
-                precalculate_go_successful = False
-            else:
-                if kg_statistics_successful and precalculate_go_successful:
-                    next_error_sleep_time = ERROR_INITIAL_SLEEP_TIME
-                    logger.info(
-                        f'Going to sleep for {SUCCESSFUL_SLEEP_TIME} seconds...'
-                    )
-                    time.sleep(SUCCESSFUL_SLEEP_TIME)
-                    time_slept_since_reset += SUCCESSFUL_SLEEP_TIME
-                else:
-                    logger.info(
-                        f'Error occured, will try again in {next_error_sleep_time} seconds'
-                    )
-                    time.sleep(next_error_sleep_time)
-                    time_slept_since_reset += next_error_sleep_time
-                    next_error_sleep_time = min(
-                        ERROR_MAX_SLEEP_TIME,
-                        next_error_sleep_time * ERROR_SLEEP_TIME_MULTIPLIER,
-                    )
+                successful = False
+
+        if successful:
+            next_error_sleep_time = ERROR_INITIAL_SLEEP_TIME
+            logger.info(f'Going to sleep for {SUCCESSFUL_SLEEP_TIME} seconds...')
+            time.sleep(SUCCESSFUL_SLEEP_TIME)
+        else:
+            logger.info(
+                f'Error occured, will try again in {next_error_sleep_time} seconds'
+            )
+            time.sleep(next_error_sleep_time)
+            next_error_sleep_time = min(
+                ERROR_MAX_SLEEP_TIME,
+                next_error_sleep_time * ERROR_SLEEP_TIME_MULTIPLIER,
+            )
 
 
 if __name__ == "__main__":
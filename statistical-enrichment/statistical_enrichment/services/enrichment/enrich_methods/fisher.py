@@ -27,19 +27,29 @@ def fisher(geneNames, GOterms, related_go_terms_count):
 
     query = pd.unique(geneNames)
 
-    M = df['geneNames'].explode().nunique()
+    # one row per gene of each GO term, indexed by the row of the term
+    go_genes = df['geneNames'].explode()
+    M = go_genes.nunique()
     N = len(query)
 
-    def f(go):
-        matching_gene_names = list(set(go['geneNames']).intersection(query))
-        go['p-value'] = fisher_p(len(matching_gene_names), M, len(go['geneNames']), N)
-        if pd.isnull(go['p-value']):
-            go['p-value'] = None
-        go['gene'] = f"{go['goTerm']} ({go['goId']})"
-        go['geneNames'] = matching_gene_names
-        return go
+    # distinct genes of the query in each GO term
+    in_query = go_genes[go_genes.isin(query)]
+    in_query = (
+        in_query[~in_query.reset_index().duplicated().to_numpy()]
+        .groupby(level=0)
+        .agg(list)
+    )
+    matching = pd.Series(
+        [in_query.get(i, []) for i in df.index], index=df.index, dtype=object
+    )
 
-    df = df.apply(f, axis=1).sort_values(by='p-value')
+    # every test at once, hypergeom is vectorized
+    df['p-value'] = fisher_p(matching.map(len), M, df['geneNames'].map(len), N)
+    df['gene'] = df['goTerm'].astype(str) + ' (' + df['goId'].astype(str) + ')'
+    df['geneNames'] = matching
+
+    df = df.sort_values(by='p-value')
 
     add_q_value(df, related_go_terms_count)
+    df['p-value'] = df['p-value'].astype(object).where(df['p-value'].notnull(), None)
     return df.to_dict(orient='records')
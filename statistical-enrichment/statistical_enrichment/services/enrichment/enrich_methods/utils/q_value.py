@@ -1,16 +1,38 @@
-from statsmodels.stats.multitest import fdrcorrection
-import pandas as pd
 import numpy as np
 
 
+def fdr_correction(p_values, tests_count, alpha=0.05):
+    """
+    Benjamini/Hochberg correction of the p-values, as
+    `statsmodels.stats.multitest.fdrcorrection(..., method='indep')` of the
+    p-values padded with ones up to `tests_count` tests, without padding them:
+    q-values are capped to 1, which the padded tests would never go under.
+    Undefined (NaN) p-values get an undefined q-value.
+
+    :param p_values: p-values of the tests that were run
+    :param tests_count: total number of tests, including the ones not run
+    :param alpha: family-wise error rate
+    :return: rejected, q-values (in the order of `p_values`)
+    """
+    p_values = np.asarray(p_values, dtype=float)
+    tests_count = max(tests_count or 0, len(p_values))
+
+    # NaN are sorted last
+    order = np.argsort(p_values, kind='mergesort')
+    order = order[: np.count_nonzero(~np.isnan(p_values))]
+    ranks = np.arange(1, len(order) + 1)
+    # q_(i) = min over j >= i of p_(j) * m / j
+    scaled = p_values[order] * tests_count / ranks
+    q_sorted = np.minimum.accumulate(scaled[::-1])[::-1]
+    q_values = np.full(len(p_values), np.nan)
+    q_values[order] = np.minimum(q_sorted, 1)
+    return q_values <= alpha, q_values
+
+
 def add_q_value(df, related_go_terms_count, inplace=True):
-    p_values = df['p-value']
-    extended_p_values = p_values.append(
-        pd.Series(np.ones(related_go_terms_count - len(p_values)))
-    )
-    r = fdrcorrection(extended_p_values, method='indep')
+    r = fdr_correction(df['p-value'], related_go_terms_count)
     if inplace:
-        df['rejected'] = r[0][: len(p_values)]
-        df['q-value'] = r[1][: len(p_values)]
+        df['rejected'] = r[0]
+        df['q-value'] = r[1]
     else:
         return r
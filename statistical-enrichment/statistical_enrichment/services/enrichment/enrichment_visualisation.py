@@ -2,29 +2,22 @@ from arango import ArangoClient
 from flask import current_app
 from functools import partial
 import json
-import pandas as pd
-from typing import List
+from typing import Dict, List, Tuple
 
 from ..arangodb import execute_arango_query, get_db
 from .enrich_methods import fisher
-from ..rcache import redis_cached, redis_server
+from .go_index import get_go_index
+from ..rcache import DEFAULT_CACHE_SETTINGS, redis_cached, redis_server
 
 
 def enrich_go(arango_client: ArangoClient, gene_names: List[str], analysis, organism):
     if analysis == 'fisher':
-        GO_terms = redis_server.get(f"GO_for_{organism.id}")
-        if GO_terms is not None:
-            df = pd.read_json(GO_terms)
-            go_count = len(df)
-            mask = ~df.geneNames.map(set(gene_names).isdisjoint)
-            go = df[mask]
+        go_index = get_go_index(organism.id)
+        if go_index is not None:
+            go_count = len(go_index)
+            go = go_index.get_go_terms(gene_names)
         else:
-            go = redis_cached(
-                f"get_go_terms_{organism}_{','.join(gene_names)}_x",
-                partial(get_go_terms, arango_client, organism.id, gene_names),
-                load=json.loads,
-                dump=json.dumps,
-            )
+            go = get_go_terms(arango_client, organism.id, gene_names)
             go_count = redis_cached(
                 f"go_term_count_{organism.id}",
                 partial(get_go_term_count, arango_client, organism.id),
@@ -35,18 +28,66 @@ def enrich_go(arango_client: ArangoClient, gene_names: List[str], analysis, orga
     raise NotImplementedError
 
 
+def _gene_go_terms_key(tax_id, gene_name: str) -> str:
+    return f'go_terms_for_gene_{tax_id}_{gene_name}'
+
+
 def get_go_terms(arango_client: ArangoClient, tax_id, gene_names: List[str]):
-    result = execute_arango_query(
-        db=get_db(arango_client),
-        query=go_term_query(),
-        gene_names=gene_names,
-        tax_id=tax_id,
+    """Returns the GO terms linked to any of the genes, each with the names
+    of all the genes of the organism linked to it.
+
+    The terms of each gene are cached separately, so that only the genes
+    missing from the cache are queried in Arango.
+    """
+    gene_names = list(dict.fromkeys(gene_names))
+    cached = redis_server.mget(
+        [_gene_go_terms_key(tax_id, gene_name) for gene_name in gene_names]
     )
+    go_terms_per_gene = {
+        gene_name: json.loads(value)
+        for gene_name, value in zip(gene_names, cached)
+        if value is not None
+    }
+
+    missing = [
+        gene_name for gene_name in gene_names if gene_name not in go_terms_per_gene
+    ]
+    if missing:
+        queried: Dict[str, List[dict]] = {gene_name: [] for gene_name in missing}
+        for row in execute_arango_query(
+            db=get_db(arango_client),
+            query=go_term_query(),
+            gene_names=missing,
+            tax_id=tax_id,
+        ):
+            queried[row['geneName']].extend(row['goTerms'])
+
+        pipe = redis_server.pipeline(transaction=False)
+        for gene_name, go_terms in queried.items():
+            pipe.set(
+                _gene_go_terms_key(tax_id, gene_name),
+                json.dumps(go_terms),
+                ex=DEFAULT_CACHE_SETTINGS['ex'],
+            )
+        pipe.execute()
+        go_terms_per_gene.update(queried)
+
+    # same term reached from several genes, merged in an order
+    # independent of the request
+    result: Dict[Tuple, dict] = {}
+    for gene_name in sorted(go_terms_per_gene):
+        for go_term in go_terms_per_gene[gene_name]:
+            key = (go_term['goId'], go_term['goTerm'], json.dumps(go_term['goLabel']))
+            merged = result.setdefault(key, {**go_term, 'geneNames': []})
+            merged['geneNames'].extend(go_term['geneNames'])
+    for go_term in result.values():
+        go_term['geneNames'] = list(dict.fromkeys(go_term['geneNames']))
+
     if not result:
         current_app.logger.warning(
             f'Could not find related GO terms for organism id: {tax_id}'
         )
-    return result
+    return list(result.values())
 
 
 def get_go_term_count(arango_client: ArangoClient, tax_id):
@@ -124,14 +165,19 @@ def go_term_query():
                     }
             )
         )
-        FOR result IN results
-            COLLECT id = result.goId, term = result.goTerm, label = result.goLabel INTO genes = result.geneNames
-            RETURN DISTINCT {
-                "goId": id,
-                "goTerm": term,
-                "goLabel": label,
-                "geneNames": UNIQUE(FLATTEN(genes))
-            }
+        RETURN {
+            "geneName": original_gene.name,
+            "goTerms": (
+                FOR result IN results
+                    COLLECT id = result.goId, term = result.goTerm, label = result.goLabel INTO genes = result.geneNames
+                    RETURN DISTINCT {
+                        "goId": id,
+                        "goTerm": term,
+                        "goLabel": label,
+                        "geneNames": UNIQUE(FLATTEN(genes))
+                    }
+            )
+        }
     """
 
 
@@ -0,0 +1,105 @@
+""" Per organism GO annotation index, precalculated by the cache-invalidator """
+import json
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..rcache import redis_server
+
+# must match the cache-invalidator
+GO_INDEX_FORMAT = b'1'
+
+
+def go_index_key(tax_id) -> str:
+    return f'GO_index_for_{tax_id}'
+
+
+class GOIndex:
+    """GO terms of an organism and the genes linked to them.
+
+    The membership is stored as CSR arrays in both directions: the genes of
+    term `t` are `indices[indptr[t]:indptr[t + 1]]` (as written by the
+    cache-invalidator, duplicates included) and the terms of gene `g` are
+    `gene_terms[gene_indptr[g]:gene_indptr[g + 1]]`.
+    """
+
+    def __init__(
+        self,
+        genes: List[str],
+        terms: List[list],
+        indptr: np.ndarray,
+        indices: np.ndarray,
+    ):
+        self.genes = np.array(genes, dtype=object)
+        self.gene_ids = {name: i for i, name in enumerate(genes)}
+        # [goId, goTerm, goLabel] of each term
+        self.terms = terms
+        self.indptr = indptr
+        self.indices = indices
+
+        # inverse of the term -> genes CSR
+        term_of_link = np.repeat(np.arange(len(terms)), np.diff(indptr))
+        self.gene_terms = term_of_link[np.argsort(indices, kind='stable')]
+        self.gene_indptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(indices, minlength=len(genes))))
+        )
+
+    def __len__(self):
+        return len(self.terms)
+
+    @classmethod
+    def loads(cls, fields: Dict[bytes, bytes]) -> 'GOIndex':
+        return cls(
+            json.loads(fields[b'genes']),
+            json.loads(fields[b'terms']),
+            np.frombuffer(fields[b'indptr'], dtype='<i4'),
+            np.frombuffer(fields[b'indices'], dtype='<i4'),
+        )
+
+    def get_go_terms(self, gene_names: List[str]) -> pd.DataFrame:
+        """Returns the GO terms linked to any of the genes, in the
+        format of the GO term query."""
+        gene_ids = [self.gene_ids[name] for name in gene_names if name in self.gene_ids]
+        gene_terms = [
+            self.gene_terms[self.gene_indptr[g] : self.gene_indptr[g + 1]]
+            for g in gene_ids
+        ]
+        term_ids = np.unique(
+            np.concatenate(gene_terms) if gene_terms else np.array([], dtype=int)
+        )
+        df = pd.DataFrame(
+            [self.terms[t] for t in term_ids], columns=['goId', 'goTerm', 'goLabel']
+        )
+        df['geneNames'] = [
+            self.genes[self.indices[self.indptr[t] : self.indptr[t + 1]]].tolist()
+            for t in term_ids
+        ]
+        return df
+
+
+_lock = Lock()
+_go_indexes: Dict[str, Tuple[bytes, GOIndex]] = {}
+
+
+def get_go_index(tax_id) -> Optional[GOIndex]:
+    """Returns the GO index of the organism, or None if it has not been
+    precalculated. Indexes are kept in memory until their version changes."""
+    key = go_index_key(tax_id)
+    version = redis_server.hget(key, 'version')
+    if version is None:
+        return None
+
+    with _lock:
+        cached = _go_indexes.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    fields = redis_server.hgetall(key)
+    if fields.get(b'format') != GO_INDEX_FORMAT or b'version' not in fields:
+        return None
+    index = GOIndex.loads(fields)
+    with _lock:
+        _go_indexes[key] = (fields[b'version'], index)
+    return index
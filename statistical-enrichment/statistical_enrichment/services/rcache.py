@@ -1,6 +1,8 @@
 """ Redis Cache """
+import hashlib
 import os
 import redis
+from typing import Iterable
 
 REDIS_HOST = os.environ.get('REDIS_HOST')
 REDIS_PORT = os.environ.get('REDIS_PORT')
@@ -17,6 +19,12 @@ redis_server = redis.Redis(
 )
 
 
+def hash_set(values: Iterable[str]) -> str:
+    """Digest of a set of strings for cache keys: independent of the order
+    and duplicates of the values, and short whatever their number."""
+    return hashlib.sha256('\n'.join(sorted(set(values))).encode('utf-8')).hexdigest()
+
+
 # Helper method to use redis cache
 #   If:
 #       load and dump defined - returns result_provider() results as is
@@ -7,7 +7,7 @@ from .auth import login_exempt
 from .database import get_or_create_arango_client
 from .schemas import EnrichmentSchema
 from .services.enrichment.enrichment_visualisation import enrich_go
-from .services.rcache import redis_cached
+from .services.rcache import hash_set, redis_cached
 
 
 @app.route('/', methods=['GET', 'POST'])
@@ -29,7 +29,8 @@ def enrich_with_go_terms(args):
     gene_names = args['geneNames']
     organism = args['organism']
     analysis = args['analysis']
-    cache_id = '_'.join(['enrich_go', ','.join(gene_names), analysis, str(organism)])
+    # the enrichment does not depend on the order of the genes
+    cache_id = '_'.join(['enrich_go', hash_set(gene_names), analysis, str(organism)])
     arango_client = get_or_create_arango_client()
     return redis_cached(
         cache_id,